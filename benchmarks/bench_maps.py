@@ -0,0 +1,105 @@
+"""
+Benchmarks for map lookup and Tk-free sector overlay rendering
+"""
+
+
+def bench_get_map_image_exact(benchmark, map_manager):
+    assert benchmark(map_manager.get_map_image, "Haddonfield")
+
+
+def bench_get_map_image_partial(benchmark, map_manager):
+    assert benchmark(map_manager.get_map_image, "macmillan")
+
+
+def bench_get_map_image_placeholder(benchmark, map_manager):
+    assert benchmark(map_manager.get_map_image, "Unknown Map")
+
+
+def bench_create_sector_overlay(benchmark, map_renderer):
+    from PIL import Image
+
+    base_image = Image.new('RGB', map_renderer.base_size, color='#2C2C2C')
+    overlay = benchmark(map_renderer.create_sector_overlay, base_image, 3)
+    assert overlay.size == base_image.size
+
+
+def bench_get_sector_at_position(benchmark, map_renderer):
+    positions = [(x, y) for x in range(0, 800, 40) for y in range(0, 600, 40)]
+
+    def run():
+        return [map_renderer.get_sector_at_position(x, y) for x, y in positions]
+
+    assert any(benchmark(run))
+
+
+def bench_open_map_image_file(benchmark, map_manager):
+    image_path = map_manager.get_map_image("Haddonfield")
+    assert benchmark(map_manager.open_map_image, image_path).size == (800, 600)
+
+
+def bench_open_map_image_pack(benchmark, map_manager, tmp_path):
+    from map_pack import build_map_pack, MapPack
+
+    pack_path = tmp_path / "maps.dbdpack"
+    build_map_pack(pack_path, maps_dir=map_manager.maps_dir,
+                   maps_config=map_manager.maps_config, compression="raw")
+    map_manager.map_pack = MapPack(pack_path)
+
+    image_path = map_manager.get_map_image("Haddonfield")
+    assert benchmark(map_manager.open_map_image, image_path).size == (800, 600)
+
+
+def bench_prepare_map_progressive(benchmark, map_renderer, tmp_path):
+    # The loader thread's work for one map: JPEG draft preview, then the
+    # tile pyramid and the fit view's tiles
+    from PIL import Image
+    from map_renderer import MapSource
+
+    image_path = tmp_path / "map.jpg"
+    Image.new('RGB', (1600, 1200), color='#2C2C2C').save(image_path, quality=90)
+    previews = []
+
+    pyramid, tiles = benchmark(map_renderer.prepare_map, MapSource(str(image_path)),
+                               on_preview=previews.append)
+    assert (previews[0].size == pyramid.extent(map_renderer.base_size, 1.0)
+            == (800, 600))
+    assert len(tiles) == 12
+
+
+def bench_render_zoomed_view(benchmark, map_renderer):
+    # Cache misses after a wheel notch: every visible tile at a new zoom
+    from PIL import Image
+    from map_tiles import TilePyramid, visible_tiles
+
+    pyramid = TilePyramid(Image.new('RGB', (4096, 3072), color='#2C2C2C'))
+    zoom = 2.0
+    view = (400, 300, 1200, 900)
+
+    def run():
+        return [map_renderer.render_tile(pyramid, zoom, box, 3, cache_layers=False)
+                for _, _, box in visible_tiles(
+                    view, pyramid.extent(map_renderer.base_size, zoom))]
+
+    assert len(benchmark(run)) == 12
+
+
+def bench_render_selection_change(benchmark, map_renderer):
+    # A callout on a loaded map: only the tiles showing the selected sector
+    # are rendered again, over their cached fill and label layers
+    from PIL import Image
+    from map_tiles import TilePyramid, visible_tiles
+
+    pyramid = TilePyramid(Image.new('RGB', (1600, 1200), color='#2C2C2C'))
+    tiles = [box for _, _, box in visible_tiles(
+        (0, 0) + map_renderer.base_size,
+        pyramid.extent(map_renderer.base_size, 1.0))]
+    for box in tiles:
+        map_renderer.render_tile(pyramid, 1.0, box)
+    sectors = map_renderer.sectors
+    selected = sectors[len(sectors) // 2]['number']
+
+    def run():
+        return [map_renderer.render_tile(pyramid, 1.0, box, selected)
+                for box in tiles if map_renderer.sector_in_box(selected, box)]
+
+    assert benchmark(run)
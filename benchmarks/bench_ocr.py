@@ -0,0 +1,54 @@
+"""
+Benchmarks for OCRDetector preprocessing and map name normalization
+"""
+
+
+def bench_preprocess_image(benchmark, ocr_detector, banner_corpus):
+    image = banner_corpus[0]
+    result = benchmark(ocr_detector.preprocess_image, image)
+    assert result.mode == 'L'
+
+
+def bench_preprocess_corpus(benchmark, ocr_detector, banner_corpus):
+    def run():
+        return [ocr_detector.preprocess_image(image) for image in banner_corpus]
+
+    assert len(benchmark(run)) == len(banner_corpus)
+
+
+def bench_normalize_direct_hit(benchmark, ocr_detector):
+    assert benchmark(ocr_detector.normalize_map_name,
+                     "HADDONFIELD") == "Haddonfield"
+
+
+def bench_normalize_garbled(benchmark, ocr_detector):
+    # Falls through both mapping passes
+    result = benchmark(ocr_detector.normalize_map_name, "Xq7 lmnqp Zzz")
+    assert result == "Xq7 Lmnqp Zzz"
+
+
+def bench_classify_match_state(benchmark, ocr_detector, banner_corpus):
+    # Runs on every captured frame, ahead of any tesseract call
+    state = benchmark(ocr_detector.state_classifier.classify, banner_corpus[0])
+    assert state == "loading"
+
+
+def bench_localize_text(benchmark, ocr_detector, banner_corpus):
+    from text_localizer import localize_text
+
+    image = ocr_detector.preprocess_image(banner_corpus[0])
+    result = benchmark(localize_text, image)
+    # Far fewer pixels than the full banner reach Tesseract
+    assert result.width * result.height < image.width * image.height
+
+
+def bench_lexicon_decode_garbled(benchmark, ocr_detector):
+    from lexicon_decoder import LexiconDecoder, positions_from_text
+
+    entries = dict(ocr_detector.map_mappings)
+    entries.update({name: name for name in ocr_detector.map_mappings.values()})
+    decoder = LexiconDecoder(entries)
+    # Two misread glyphs and trailing noise, beyond normalize_map_name()
+    positions = positions_from_text("HADD0NF1ELD xx")
+    name, confidence = benchmark(decoder.decode, positions)
+    assert name == "Haddonfield"
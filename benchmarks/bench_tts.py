@@ -0,0 +1,13 @@
+"""
+Benchmarks for the TTSHandler enqueue path
+"""
+
+
+def bench_speak_enqueue(benchmark, tts_handler):
+    benchmark(tts_handler.speak, "Killer in sector 3")
+    assert tts_handler.speech_queue.qsize() == 1
+
+
+def bench_speak_callout(benchmark, tts_handler):
+    benchmark(tts_handler.speak_callout, 9, "rescue")
+    assert tts_handler.speech_queue.get_nowait() == "Rescue in 9"
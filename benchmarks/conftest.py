@@ -0,0 +1,125 @@
+"""
+Shared fixtures for the benchmark suite: a synthetic banner corpus and
+components configured against temporary files, so the suite runs without
+a screen, tesseract or a TTS driver.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+# Add src directory to Python path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+# pytest-benchmark's default storage, relative to the working directory
+DEFAULT_STORAGE = "file://./.benchmarks"
+
+from ocr_detector import OCRDetector  # noqa: E402
+from map_manager import MapManager  # noqa: E402
+from map_renderer import MapRenderer  # noqa: E402
+from sector_layout import parse_sector_layout  # noqa: E402
+from tts_handler import TTSHandler  # noqa: E402
+
+
+def pytest_configure(config):
+    """Keep baselines in benchmarks/.baselines from any working directory
+
+    Runs before pytest-benchmark opens its storage; a --benchmark-storage
+    given on the command line is left alone.
+    """
+    if config.getoption("benchmark_storage") == DEFAULT_STORAGE:
+        config.option.benchmark_storage = "file://" + str(
+            Path(__file__).parent / ".baselines")
+
+
+BANNER_TEXTS = ["HADDONFIELD", "SPRINGWOOD", "MACMILLAN ESTATE",
+                "AUTOHAVEN WRECKERS", "COLDWIND FARM", "RED FOREST"]
+
+
+def render_banner(text, size=(350, 100), seed=0):
+    """Render a noisy light-on-dark banner like the in-game map title"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, color=(rng.randint(10, 40),) * 3)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    draw.text((10, size[1] // 3), text, fill=(230, 230, 230), font=font)
+
+    for _ in range(200):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.point((x, y), fill=(rng.randint(0, 255),) * 3)
+    return image.filter(ImageFilter.GaussianBlur(radius=0.6))
+
+
+@pytest.fixture(scope="session")
+def banner_corpus():
+    """A small list of synthetic banner screenshots"""
+    return [render_banner(text, seed=i) for i, text in enumerate(BANNER_TEXTS)]
+
+
+@pytest.fixture
+def ocr_detector(tmp_path):
+    """OCRDetector backed by a default config in a temp directory"""
+    return OCRDetector(config_path=tmp_path / "ocr_config.json")
+
+
+@pytest.fixture
+def map_manager(tmp_path):
+    """MapManager with a default config and a few real image files"""
+    maps_dir = tmp_path / "maps"
+    manager = MapManager(maps_dir=maps_dir,
+                         config_path=tmp_path / "maps_config.json")
+    for info in list(manager.maps_config["maps"].values())[:5]:
+        Image.new('RGB', (800, 600), color='#2C2C2C').save(
+            maps_dir / info["filename"])
+    manager.create_placeholder_image()
+    return manager
+
+
+def make_sector_layout(columns=8, rows=6, seed=0):
+    """A maps_config.json style layout of irregular pentagons on a grid"""
+    rng = random.Random(seed)
+    entries = []
+    for row in range(rows):
+        for column in range(columns):
+            left, top = column / columns, row / rows
+            width, height = 1 / columns, 1 / rows
+            corners = [(0.1, 0.05), (0.9, 0.1), (0.95, 0.6), (0.5, 0.95), (0.05, 0.7)]
+            entries.append({
+                "name": f"Area {len(entries) + 1}",
+                "points": [[round(left + width * (x + rng.uniform(-0.04, 0.04)), 4),
+                            round(top + height * (y + rng.uniform(-0.04, 0.04)), 4)]
+                           for x, y in corners]
+            })
+    return parse_sector_layout(entries)
+
+
+@pytest.fixture(params=["clock", "numpad", "custom"])
+def map_renderer(request):
+    """MapRenderer for an 800x600 view in each sector mode, "custom" with
+    48 sectors"""
+    layout = make_sector_layout() if request.param == "custom" else None
+    return MapRenderer(request.param, layout, base_size=(800, 600))
+
+
+class NullEngine:
+    """Stand-in TTS engine so speak() exercises the queue path only"""
+
+    def say(self, text):
+        pass
+
+    def runAndWait(self):
+        pass
+
+
+@pytest.fixture
+def tts_handler(monkeypatch):
+    """TTSHandler whose engine is a no-op and whose worker never starts"""
+    monkeypatch.setattr(TTSHandler, "initialize_tts", lambda self: None)
+    handler = TTSHandler(use_process=False)
+    handler.tts_engine = NullEngine()
+    handler.is_running = True
+    return handler
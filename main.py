@@ -4,7 +4,7 @@ Dead by Daylight Communication App
 Main entry point for the application
 """
 
-from dbd_app import DbDCommunicationApp
+import argparse
 import sys
 import os
 import logging
@@ -14,36 +14,458 @@ from pathlib import Path
 src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
 
+from startup_profile import profiler  # noqa: E402
 
-def setup_logging():
+
+def setup_logging(console_stream=None):
     """Setup logging configuration"""
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
+    from logging_config import load_logging_config, setup_queued_logging
+
+    # Handlers run on a listener thread, callers only enqueue records
+    setup_queued_logging(load_logging_config(), console_stream=console_stream)
+
+
+def float_list(value):
+    """Comma-separated floats, for argparse"""
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def int_list(value):
+    """Comma-separated integers, for argparse"""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    from callout_relay import CALLOUT_TYPES
+
+    parser = argparse.ArgumentParser(
+        description="Dead by Daylight Communication App")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="log an import/init timing breakdown once all "
+                             "components are ready")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="periodically write pipeline metrics to this "
+                             "JSON file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="seconds between metrics snapshots (default: 10)")
+
+    parser.add_argument("--detection-daemon", action="store_true",
+                        help="take map detections from a running detection "
+                             "daemon instead of capturing in the GUI")
+    parser.add_argument("--detection-socket", metavar="ADDRESS",
+                        help="detection daemon Unix socket path or HOST:PORT "
+                             "(default: dbd-detection.sock in the temp dir)")
+    parser.add_argument("--relay", action="store_true",
+                        help="share callouts with teammates' instances over "
+                             "UDP multicast")
+    parser.add_argument("--relay-port", type=int, default=47999,
+                        help="multicast port for --relay (default: 47999)")
+    parser.add_argument("--relay-tcp-listen", type=int, metavar="PORT",
+                        help="also accept relay peers on this TCP port")
+    parser.add_argument("--relay-tcp-connect", metavar="HOST:PORT",
+                        help="relay through a TCP hub where multicast is blocked")
+
+    subparsers = parser.add_subparsers(dest="command")
+
+    headless = subparsers.add_parser(
+        "headless", help="run map detection without a GUI and emit events")
+    headless.add_argument("--socket", metavar="HOST:PORT",
+                          help="publish JSONL events on a local TCP socket "
+                               "instead of stdout")
+    headless.add_argument("--interval", type=float, default=2.0,
+                          help="seconds between detections (default: 2)")
+    headless.add_argument("--config", default="config/ocr_config.json",
+                          help="OCR config path")
+
+    daemon = subparsers.add_parser(
+        "daemon", help="run one shared detection loop for several subscribers")
+    daemon.add_argument("--socket", metavar="ADDRESS",
+                        help="Unix socket path or HOST:PORT to publish on "
+                             "(default: dbd-detection.sock in the temp dir)")
+    daemon.add_argument("--interval", type=float, default=2.0,
+                        help="seconds between detections (default: 2)")
+    daemon.add_argument("--config", default="config/ocr_config.json",
+                        help="OCR config path")
+
+    subscribe = subparsers.add_parser(
+        "subscribe", help="print a detection daemon's events as JSON lines")
+    subscribe.add_argument("--socket", metavar="ADDRESS",
+                           help="daemon address (default: as for 'daemon')")
+
+    batch = subparsers.add_parser(
+        "batch", help="label a folder of screenshots with detected map names")
+    batch.add_argument("image_dir", help="directory of screenshots to label")
+    batch.add_argument("--output", default="batch_results.jsonl",
+                       help="JSONL results file (default: batch_results.jsonl)")
+    batch.add_argument("--checkpoint",
+                       help="checkpoint file (default: <output>.checkpoint)")
+    batch.add_argument("--workers", type=int,
+                       help="worker processes (default: CPU count)")
+    batch.add_argument("--chunk-size", type=int, default=16,
+                       help="images per work item (default: 16)")
+    batch.add_argument("--config", default="config/ocr_config.json",
+                       help="OCR config path")
+
+    corpus = subparsers.add_parser(
+        "corpus", help="render a labelled synthetic map-banner corpus")
+    corpus.add_argument("output_dir", help="directory for images and manifest")
+    corpus.add_argument("--variants", type=int, default=20,
+                        help="banners per map (default: 20)")
+    corpus.add_argument("--seed", type=int, default=0,
+                        help="random seed (default: 0)")
+    corpus.add_argument("--workers", type=int,
+                        help="worker processes (default: CPU count)")
+    corpus.add_argument("--maps-config", default="config/maps_config.json",
+                        help="maps config path")
+
+    tune = subparsers.add_parser(
+        "tune", help="search preprocessing settings on a labelled corpus")
+    tune.add_argument("corpus_dir", help="corpus directory with manifest.jsonl")
+    tune.add_argument("--config", default="config/ocr_config.json",
+                      help="OCR config path")
+    tune.add_argument("--samples", type=int,
+                      help="random candidates to try (default: full grid)")
+    tune.add_argument("--seed", type=int, default=0,
+                      help="random seed for --samples (default: 0)")
+    tune.add_argument("--contrast", type=float_list, metavar="LIST",
+                      help="contrast factors, e.g. 1.5,2,2.5")
+    tune.add_argument("--brightness", type=float_list, metavar="LIST",
+                      help="brightness factors")
+    tune.add_argument("--blur", type=float_list, metavar="LIST",
+                      help="Gaussian blur radii, 0 for no blur")
+    tune.add_argument("--psm", type=int_list, metavar="LIST",
+                      help="Tesseract page segmentation modes, e.g. 7,8")
+    tune.add_argument("--max-latency", type=float, metavar="MS",
+                      help="choose the most accurate setting within this "
+                           "mean latency")
+    tune.add_argument("--min-accuracy", type=float,
+                      help="choose the fastest setting reaching this accuracy")
+    tune.add_argument("--workers", type=int,
+                      help="worker processes (default: CPU count)")
+    tune.add_argument("--chunk-size", type=int, default=8,
+                      help="images per work item (default: 8)")
+    tune.add_argument("--report", metavar="PATH",
+                      help="write every candidate's scores to this JSON file")
+    tune.add_argument("--write", action="store_true",
+                      help="save the chosen settings to the OCR config")
+
+    pack = subparsers.add_parser(
+        "pack-maps", help="bundle map images and metadata into one map pack")
+    pack.add_argument("output", help="pack file to write, e.g. maps/maps.dbdpack")
+    pack.add_argument("--maps-dir", default="maps", help="map images directory")
+    pack.add_argument("--maps-config", default="config/maps_config.json",
+                      help="maps config path")
+    pack.add_argument("--size", default="800x600",
+                      help="stored image size WxH (default: 800x600)")
+    pack.add_argument("--compression", choices=("zlib", "raw"), default="zlib",
+                      help="blob encoding (default: zlib)")
+
+    relay = subparsers.add_parser(
+        "relay", help="print teammates' relayed callouts, or send test ones")
+    relay.add_argument("--send", type=int, metavar="SECTOR",
+                       help="send this sector instead of listening")
+    relay.add_argument("--map", default="", help="map name for --send")
+    relay.add_argument("--type", default="sector", choices=CALLOUT_TYPES,
+                       help="callout type for --send (default: sector)")
+    relay.add_argument("--count", type=int, default=1,
+                       help="callouts to send (default: 1)")
+
+    return parser.parse_args(argv)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_dir / "dbd_app.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+
+def detection_address(args):
+    """Detection daemon address for the GUI, or None to detect in-process"""
+    if not (args.detection_daemon or args.detection_socket):
+        return None
+    if args.detection_socket:
+        return args.detection_socket
+
+    from detection_daemon import DEFAULT_SOCKET_PATH
+    return DEFAULT_SOCKET_PATH
+
+
+def relay_options(args):
+    """CalloutRelay keyword arguments from the global relay flags"""
+    if not (args.relay or args.relay_tcp_listen or args.relay_tcp_connect
+            or args.command == "relay"):
+        return None
+
+    tcp_connect = None
+    if args.relay_tcp_connect:
+        host, _, port = args.relay_tcp_connect.rpartition(":")
+        tcp_connect = (host or "127.0.0.1", int(port))
+
+    return {
+        "port": args.relay_port,
+        # A TCP-only setup skips multicast unless --relay asks for it too
+        "use_udp": args.relay or not (args.relay_tcp_listen or tcp_connect),
+        "tcp_listen_port": args.relay_tcp_listen,
+        "tcp_connect": tcp_connect
+    }
+
+
+def run_headless(args):
+    """Run the detection loop without tkinter, emitting JSONL events"""
+    from ocr_detector import OCRDetector
+    from detection_service import DetectionService, JsonlEmitter, SocketEmitter
+    from frame_pipeline import FramePipeline
+
+    if args.socket:
+        host, _, port = args.socket.rpartition(":")
+        emitter = SocketEmitter(host or "127.0.0.1", int(port))
+    else:
+        emitter = JsonlEmitter(sys.stdout)
+
+    detector = OCRDetector(config_path=args.config, capture_backend="imagegrab")
+    pipeline = FramePipeline.from_config(detector)
+    service = DetectionService(pipeline or detector, interval=args.interval,
+                               on_event=emitter,
+                               stall_timeout=detector.config.get("watchdog_timeout"))
+
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
+    finally:
+        if pipeline:
+            pipeline.stop()
+        emitter.close()
+    return 0
+
+
+def run_daemon(args):
+    """Run the shared detection daemon"""
+    from ocr_detector import OCRDetector
+    from detection_daemon import DetectionDaemon, DEFAULT_SOCKET_PATH
+    from frame_pipeline import FramePipeline
+
+    detector = OCRDetector(config_path=args.config, capture_backend="imagegrab")
+    pipeline = FramePipeline.from_config(detector)
+    daemon = DetectionDaemon(pipeline or detector,
+                             address=args.socket or DEFAULT_SOCKET_PATH,
+                             interval=args.interval,
+                             stall_timeout=detector.config.get("watchdog_timeout"))
+    try:
+        daemon.run()
+    finally:
+        if pipeline:
+            pipeline.stop()
+    return 0
+
+
+def run_subscribe(args):
+    """Log a detection daemon's events to stdout"""
+    import time
+    from detection_daemon import DetectionSubscriber, DEFAULT_SOCKET_PATH
+    from detection_service import JsonlEmitter
+
+    subscriber = DetectionSubscriber(JsonlEmitter(sys.stdout),
+                                     address=args.socket or DEFAULT_SOCKET_PATH)
+    subscriber.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+    return 0
+
+
+def run_batch(args):
+    """Label a screenshot folder on a process pool"""
+    from batch_ocr import BatchOCR
+
+    batch = BatchOCR(args.image_dir, args.output,
+                     checkpoint_path=args.checkpoint, config_path=args.config,
+                     workers=args.workers, chunk_size=args.chunk_size)
+    summary = batch.run()
+
+    print(f"Processed {summary['processed']} images "
+          f"({summary['skipped']} skipped, {summary['errors']} errors) "
+          f"in {summary['elapsed_s']}s")
+    print(f"Throughput: {summary['images_per_s']} images/s, "
+          f"{summary['images_per_s_per_core']} images/s per core")
+    return 0
+
+
+def run_corpus(args):
+    """Render a synthetic banner corpus with a ground-truth manifest"""
+    from corpus_generator import CorpusGenerator
+
+    generator = CorpusGenerator(args.output_dir,
+                                maps_config_path=args.maps_config,
+                                variants=args.variants, seed=args.seed,
+                                workers=args.workers)
+    try:
+        manifest_path = generator.generate()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Manifest written to {manifest_path}")
+    return 0
+
+
+def run_tune(args):
+    """Search preprocessing settings and report the speed/accuracy front"""
+    from ocr_detector import OCRDetector
+    from preprocess_tuner import PreprocessTuner, choose, pareto_front
+
+    space = {name: values for name, values in (
+        ("contrast_factor", args.contrast), ("brightness_factor", args.brightness),
+        ("blur_radius", args.blur), ("psm", args.psm)) if values}
+    tuner = PreprocessTuner(args.corpus_dir, config_path=args.config, space=space,
+                            samples=args.samples, seed=args.seed,
+                            workers=args.workers, chunk_size=args.chunk_size)
+
+    ocr_detector = OCRDetector(config_path=args.config, capture_backend="imagegrab")
+    results = tuner.run(ocr_detector.config)
+    front = pareto_front(results)
+    chosen = choose(front, args.max_latency, args.min_accuracy)
+
+    print(f"Pareto front ({len(front)} of {len(results)} settings):")
+    print(f"{'accuracy':>8} {'mean ms':>8} {'p95 ms':>8}  settings")
+    for result in front + [r for r in results if r["current"] and r not in front]:
+        params = result["params"]
+        marks = (" <- chosen" if result is chosen else "") + \
+                (" (current)" if result["current"] else "")
+        print(f"{result['accuracy']:>8.1%} {result['latency_ms']:>8.1f} "
+              f"{result['p95_ms']:>8.1f}  contrast={params['contrast_factor']} "
+              f"brightness={params['brightness_factor']} "
+              f"blur={params['blur_radius']} psm={params['psm']}{marks}")
+
+    if args.report:
+        tuner.write_report(args.report, results, front, chosen)
+        print(f"Report written to {args.report}")
+    if args.write and chosen:
+        # A broken tesseract scores every setting 0%, never save that
+        if not chosen["accuracy"] or chosen["errors"]:
+            print(f"Error: not saving settings with {chosen['accuracy']:.1%} "
+                  f"accuracy and {chosen['errors']} OCR errors", file=sys.stderr)
+            return 1
+        tuner.write_config(ocr_detector, chosen)
+        print(f"Chosen settings saved to {args.config}")
+    return 0
+
+
+def run_pack_maps(args):
+    """Build a map pack from the maps directory and config"""
+    from map_manager import MapManager
+    from map_pack import build_map_pack
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    manager = MapManager(maps_dir=args.maps_dir, config_path=args.maps_config)
+
+    # Pack whatever the active backend knows about, not just the JSON file
+    maps_config = dict(manager.maps_config)
+    maps_config["maps"] = {name: manager.get_map_info(name)
+                           for name in manager.get_available_maps()}
+    maps_config.pop("map_pack", None)
+
+    count = build_map_pack(args.output, maps_dir=args.maps_dir,
+                           maps_config=maps_config, size=(width, height),
+                           compression=args.compression)
+    print(f"Packed {count} images into {args.output}")
+    return 0
+
+
+def run_relay(args):
+    """Listen for relayed callouts, or send test callouts"""
+    import time
+    from callout_relay import CalloutRelay
+
+    def print_callout(callout):
+        latency_ms = (time.time_ns() // 1000 - callout.timestamp_us) / 1000
+        print(f"{callout.map_name or '-'}: {callout.callout_type} "
+              f"{callout.sector} from {callout.sender_id:08x} "
+              f"#{callout.sequence} ({latency_ms:.2f} ms)", flush=True)
+
+    relay = CalloutRelay(on_callout=print_callout, **relay_options(args))
+    try:
+        if args.send is None:
+            while True:
+                time.sleep(1)
+        for _ in range(args.count):
+            relay.send_callout(args.map, args.send, args.type)
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        relay.close()
+    return 0
+
+
+def start_metrics_writer(args):
+    """Start periodic metrics snapshots if requested"""
+    if not args.metrics_file:
+        return None
+
+    from metrics import registry, SnapshotWriter
+
+    writer = SnapshotWriter(registry, args.metrics_file,
+                            interval=args.metrics_interval)
+    writer.start()
+    return writer
 
 
 def main():
     """Main entry point"""
+    metrics_writer = None
     try:
+        args = parse_args()
+        metrics_writer = start_metrics_writer(args)
+
+        if args.command == "headless":
+            # stdout carries the event stream, so logs go to stderr
+            setup_logging(console_stream=sys.stderr)
+            sys.exit(run_headless(args))
+
+        if args.command in ("daemon", "subscribe"):
+            setup_logging(console_stream=sys.stderr)
+            sys.exit(run_daemon(args) if args.command == "daemon"
+                     else run_subscribe(args))
+
+        if args.command == "batch":
+            setup_logging()
+            sys.exit(run_batch(args))
+
+        if args.command == "corpus":
+            setup_logging()
+            sys.exit(run_corpus(args))
+
+        if args.command == "tune":
+            setup_logging()
+            sys.exit(run_tune(args))
+
+        if args.command == "pack-maps":
+            setup_logging()
+            sys.exit(run_pack_maps(args))
+
+        if args.command == "relay":
+            setup_logging(console_stream=sys.stderr)
+            sys.exit(run_relay(args))
+
         setup_logging()
         logger = logging.getLogger(__name__)
         logger.info("Starting DbD Communication App")
 
+        # Imported here so the timing covers tkinter and the app modules
+        with profiler.measure("import", "dbd_app"):
+            from dbd_app import DbDCommunicationApp
+
         # Create and run the application
-        app = DbDCommunicationApp()
+        app = DbDCommunicationApp(startup_report=args.startup_report,
+                                  relay_options=relay_options(args),
+                                  detection_address=detection_address(args))
         app.run()
 
     except Exception as e:
-        logging.error(f"Fatal error: {e}", exc_info=True)
+        logging.error("Fatal error: %s", e, exc_info=True)
         sys.exit(1)
+    finally:
+        if metrics_writer:
+            metrics_writer.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Batch map labelling of screenshot folders on a process pool
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from PIL import Image
+
+from logging_config import configure_worker_logging, worker_logging_settings
+
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp"}
+
+# One detector per worker process, created by _init_worker()
+_worker_detector = None
+
+
+def _init_worker(config_path, log_settings=None):
+    """Process pool initializer: build the worker's OCRDetector once"""
+    global _worker_detector
+    configure_worker_logging(log_settings)
+    from ocr_detector import OCRDetector
+
+    _worker_detector = OCRDetector(config_path=config_path,
+                                   capture_backend="imagegrab")
+    _worker_detector.load_backends(capture=False)
+
+
+def _label_chunk(paths):
+    """Run preprocess -> OCR -> map name on a chunk of image paths"""
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            with Image.open(path) as image:
+                # OCR failures become error results, not "no map" ones
+                raw_text, map_name, confidence = _worker_detector.recognize(
+                    image, strict=True)
+            results.append({
+                "path": path,
+                "raw_text": raw_text,
+                "map": map_name,
+                "confidence": round(confidence, 3),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+            })
+        except Exception as e:
+            results.append({"path": path, "error": str(e)})
+    return results
+
+
+class BatchOCR:
+    """Labels a directory of screenshots with detected map names"""
+
+    def __init__(self, image_dir, output_path, checkpoint_path=None,
+                 config_path="config/ocr_config.json", workers=None, chunk_size=16):
+        self.logger = logging.getLogger(__name__)
+        self.image_dir = Path(image_dir)
+        self.output_path = Path(output_path)
+        self.checkpoint_path = Path(checkpoint_path or f"{output_path}.checkpoint")
+        self.config_path = config_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+
+    def find_images(self):
+        """List image files under the input directory in a stable order"""
+        return sorted(
+            str(path) for path in self.image_dir.rglob("*")
+            if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file())
+
+    def load_checkpoint(self):
+        """Read the set of image paths labelled successfully"""
+        if not self.checkpoint_path.exists():
+            return set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    def compact_output(self, done):
+        """Rewrite the output with one record per checkpointed path
+
+        Drops error results, which are retried, and results written before
+        a crash but never checkpointed, which are processed again.
+        """
+        if not self.output_path.exists():
+            return
+
+        records = {}
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line of a crashed run
+                if record.get("path") in done and "error" not in record:
+                    records[record["path"]] = record
+
+        temp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.output_path)
+
+    def run(self):
+        """Process every pending image and return a throughput summary"""
+        images = self.find_images()
+        done = self.load_checkpoint()
+        self.compact_output(done)
+        pending = [path for path in images if path not in done]
+
+        self.logger.info("Batch OCR: %d images, %d already done, %d workers",
+                         len(images), len(images) - len(pending), self.workers)
+
+        chunks = [pending[i:i + self.chunk_size]
+                  for i in range(0, len(pending), self.chunk_size)]
+        processed = 0
+        errors = 0
+        start = time.perf_counter()
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.output_path, 'a', encoding='utf-8') as output, \
+                open(self.checkpoint_path, 'a', encoding='utf-8') as checkpoint, \
+                ProcessPoolExecutor(max_workers=self.workers,
+                                    initializer=_init_worker,
+                                    initargs=(self.config_path,
+                                              worker_logging_settings())) as executor:
+            # Keep a bounded number of chunks in flight so results stream out
+            remaining = iter(chunks)
+            in_flight = set()
+
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    chunk = next(remaining, None)
+                    if chunk is None:
+                        break
+                    in_flight.add(executor.submit(_label_chunk, chunk))
+
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results = future.result()
+                    for result in results:
+                        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        errors += "error" in result
+                    output.flush()
+
+                    # Only checkpoint successful results once they are on
+                    # disk, so failed images are retried on resume
+                    checkpoint.writelines(result["path"] + "\n" for result in results
+                                          if "error" not in result)
+                    checkpoint.flush()
+
+                    processed += len(results)
+                    self.logger.info("Batch OCR progress: %d/%d",
+                                     processed, len(pending))
+
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        summary = {
+            "processed": processed,
+            "skipped": len(images) - len(pending),
+            "errors": errors,
+            "elapsed_s": round(elapsed, 3),
+            "images_per_s": round(rate, 2),
+            "images_per_s_per_core": round(rate / self.workers, 2)
+        }
+        self.logger.info("Batch OCR finished: %s", summary)
+        return summary
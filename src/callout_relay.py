@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Team callout relay between app instances over UDP multicast, with TCP fallback
+"""
+
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+from metrics import registry
+
+
+# magic, version, callout type, sector, sender id, sequence, timestamp (us)
+MESSAGE_HEADER = struct.Struct("!2sBBBIIQB")
+MESSAGE_MAGIC = b"DC"
+MESSAGE_VERSION = 1
+MAX_MAP_NAME_BYTES = 255
+
+CALLOUT_TYPES = ("sector", "killer", "rescue", "gen", "totem")
+
+DEFAULT_GROUP = "239.255.42.99"
+DEFAULT_PORT = 47999
+
+# Recent sequence numbers remembered per sender, and senders remembered,
+# for dropping callouts that arrive over more than one path
+RECENT_SEQUENCES = 64
+MAX_SENDERS = 64
+
+# A TCP peer that cannot take a frame within this long is dropped
+SEND_TIMEOUT = 0.5
+
+Callout = namedtuple(
+    "Callout", ["map_name", "sector", "callout_type", "sender_id", "sequence",
+                "timestamp_us"])
+
+
+def encode_callout(callout):
+    """Pack a callout into its compact binary form (22 bytes + map name)"""
+    name = callout.map_name.encode('utf-8')[:MAX_MAP_NAME_BYTES]
+    header = MESSAGE_HEADER.pack(
+        MESSAGE_MAGIC, MESSAGE_VERSION, CALLOUT_TYPES.index(callout.callout_type),
+        callout.sector, callout.sender_id, callout.sequence,
+        callout.timestamp_us, len(name))
+    return header + name
+
+
+def decode_callout(data):
+    """Unpack a binary callout, or return None if it is not one"""
+    if len(data) < MESSAGE_HEADER.size:
+        return None
+
+    (magic, version, type_index, sector, sender_id, sequence,
+     timestamp_us, name_length) = MESSAGE_HEADER.unpack_from(data)
+    if magic != MESSAGE_MAGIC or version != MESSAGE_VERSION:
+        return None
+    if type_index >= len(CALLOUT_TYPES):
+        return None
+
+    name = data[MESSAGE_HEADER.size:MESSAGE_HEADER.size + name_length]
+    return Callout(name.decode('utf-8', errors='replace'), sector,
+                   CALLOUT_TYPES[type_index], sender_id, sequence, timestamp_us)
+
+
+class CalloutRelay:
+    """Sends local callouts to teammates and delivers theirs to a callback
+
+    UDP multicast with loopback lets any number of instances on one machine
+    or LAN share the same group and port.  Where multicast is blocked, one
+    instance can listen on a TCP port and others connect to it; the hub
+    forwards each frame to every other connection and bridges between its
+    TCP peers and the multicast group.  A callout seen twice (same sender
+    and sequence) is delivered once.
+
+    Frames are sent by a relay thread fed from a queue, so neither the
+    caller (the Tk thread) nor the receive loops wait on a slow peer.
+    """
+
+    def __init__(self, on_callout=None, group=DEFAULT_GROUP, port=DEFAULT_PORT,
+                 use_udp=True, tcp_listen_port=None, tcp_connect=None):
+        self.logger = logging.getLogger(__name__)
+        self.on_callout = on_callout
+        self.group = group
+        self.port = port
+        self.sender_id = struct.unpack("!I", os.urandom(4))[0]
+        self.sequence = 0
+        self.recent = {}  # sender id -> deque of recent sequences
+        self.lock = threading.Lock()
+        self.running = True
+
+        # (frame, TCP peer to skip, also send over UDP), None to stop
+        self.send_queue = queue.SimpleQueue()
+
+        self.udp_socket = self.open_udp_socket() if use_udp else None
+
+        self.tcp_server = None
+        self.tcp_peers = []
+        if tcp_listen_port is not None:
+            self.tcp_server = socket.create_server(("", tcp_listen_port))
+            self.start_thread(self._accept_loop, "relay-tcp-accept")
+        if tcp_connect:
+            self.add_tcp_peer(socket.create_connection(tcp_connect, timeout=5))
+        self.start_thread(self._send_loop, "relay-send")
+
+    def start_thread(self, target, name, *args):
+        """Start a daemon thread for a receive loop"""
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def open_udp_socket(self):
+        """Join the multicast group with loopback enabled"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.port))
+
+        membership = struct.pack("4s4s", socket.inet_aton(self.group),
+                                 socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+        self.start_thread(self._udp_loop, "relay-udp", sock)
+        self.logger.info("Callout relay joined %s:%s", self.group, self.port)
+        return sock
+
+    def add_tcp_peer(self, sock):
+        """Track a TCP connection and start reading frames from it"""
+        # Bounds sendall() on the relay thread; reads retry on timeout
+        sock.settimeout(SEND_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.lock:
+            self.tcp_peers.append(sock)
+        self.start_thread(self._tcp_loop, "relay-tcp", sock)
+
+    def send_callout(self, map_name, sector, callout_type="sector"):
+        """Queue a local callout for teammates; never blocks on the network"""
+        with self.lock:
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+            sequence = self.sequence
+
+        callout = Callout(map_name or "", int(sector), callout_type,
+                          self.sender_id, sequence, time.time_ns() // 1000)
+        data = encode_callout(callout)
+        self.send_queue.put((data, None, True))
+
+        registry.counter("relay.sent").inc()
+        registry.counter("relay.bytes_sent").inc(len(data))
+        return callout
+
+    def _send_loop(self):
+        """Relay thread: send queued frames over UDP and to the TCP peers"""
+        while True:
+            item = self.send_queue.get()
+            if item is None:
+                break
+            data, exclude, use_udp = item
+            if use_udp and self.udp_socket:
+                try:
+                    self.udp_socket.sendto(data, (self.group, self.port))
+                except OSError as e:
+                    self.logger.warning("Error sending callout over UDP: %s", e)
+            self.send_tcp_frame(data, exclude)
+
+    def send_tcp_frame(self, data, exclude=None):
+        """Send a message to every TCP peer (the header carries its length)
+
+        A peer that errors or stalls past SEND_TIMEOUT is dropped.
+        """
+        with self.lock:
+            peers = list(self.tcp_peers)
+
+        for peer in peers:
+            if peer is exclude:
+                continue
+            try:
+                peer.sendall(data)
+            except OSError as e:
+                self.logger.warning("Dropping relay peer: %s", e)
+                self.drop_tcp_peer(peer)
+
+    def drop_tcp_peer(self, sock):
+        """Forget a closed TCP connection"""
+        with self.lock:
+            if sock in self.tcp_peers:
+                self.tcp_peers.remove(sock)
+        sock.close()
+
+    def is_duplicate(self, callout):
+        """Record a callout's sequence; True if it was already seen"""
+        with self.lock:
+            sequences = self.recent.pop(callout.sender_id, None)
+            if sequences is None:
+                sequences = deque(maxlen=RECENT_SEQUENCES)
+                if len(self.recent) >= MAX_SENDERS:
+                    del self.recent[next(iter(self.recent))]
+            # Most recently heard senders stay at the end
+            self.recent[callout.sender_id] = sequences
+
+            if callout.sequence in sequences:
+                return True
+            sequences.append(callout.sequence)
+            return False
+
+    def forward(self, data, source, sock=None):
+        """On the hub, pass a new frame on to the other transport and peers"""
+        self.send_queue.put((data, sock, source == "tcp"))
+
+    def deliver(self, data, source="udp", sock=None):
+        """Decode an incoming message and hand it to the callback
+
+        sock is the TCP connection the frame came from, if any.
+        """
+        callout = decode_callout(data)
+        if callout is None or callout.sender_id == self.sender_id:
+            return None
+        if self.is_duplicate(callout):
+            registry.counter("relay.duplicates").inc()
+            return None
+
+        if self.tcp_server:
+            self.forward(data, source, sock)
+
+        latency = time.time_ns() // 1000 - callout.timestamp_us
+        registry.histogram("relay.latency").observe(max(latency, 0) / 1_000_000)
+        registry.counter(f"relay.received_{source}").inc()
+
+        if self.on_callout:
+            try:
+                self.on_callout(callout)
+            except Exception as e:
+                self.logger.error("Error handling relayed callout: %s", e)
+        return callout
+
+    def _udp_loop(self, sock):
+        while self.running:
+            try:
+                data, _ = sock.recvfrom(MESSAGE_HEADER.size + MAX_MAP_NAME_BYTES)
+            except OSError:
+                break
+            self.deliver(data)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                sock, address = self.tcp_server.accept()
+            except OSError:
+                break
+            self.logger.info("Relay peer connected over TCP: %s", address)
+            self.add_tcp_peer(sock)
+
+    def _tcp_loop(self, sock):
+        while self.running:
+            try:
+                header = self.recv_exact(sock, MESSAGE_HEADER.size)
+                if header is None:
+                    break
+                name = self.recv_exact(sock, header[-1])
+                if name is None:
+                    break
+            except OSError:
+                break
+
+            self.deliver(header + name, source="tcp", sock=sock)
+
+        self.drop_tcp_peer(sock)
+
+    def recv_exact(self, sock, size):
+        """Read exactly size bytes, or None if the peer or relay closed"""
+        chunks = []
+        while size:
+            try:
+                chunk = sock.recv(size)
+            except socket.timeout:
+                # The timeout is there for sends; an idle peer is fine
+                if not self.running:
+                    return None
+                continue
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        """Stop all receive loops and close sockets"""
+        self.running = False
+        self.send_queue.put(None)
+        if self.udp_socket:
+            self.udp_socket.close()
+        if self.tcp_server:
+            self.tcp_server.close()
+        with self.lock:
+            peers, self.tcp_peers = self.tcp_peers, []
+        for peer in peers:
+            peer.close()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Debounced, atomic JSON config persistence
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Stores with possibly pending writes; flushed once at interpreter exit
+_live_stores = weakref.WeakSet()
+
+
+def _flush_live_stores():
+    for store in list(_live_stores):
+        store.flush()
+
+
+atexit.register(_flush_live_stores)
+
+
+class ConfigStore:
+    """Holds a JSON config dict and writes it back lazily and atomically
+
+    Mutations only mark the store dirty; the file is rewritten once the
+    store has been quiet for `debounce` seconds, on flush(), or at
+    interpreter exit.  Writes go to a temp file that replaces the original,
+    so a crash mid-write never leaves a truncated config behind.  A failed
+    write keeps the store dirty and is retried after another debounce.
+    """
+
+    def __init__(self, path, default_factory, label="config", debounce=1.0):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.default_factory = default_factory
+        self.label = label
+        self.debounce = debounce
+
+        self.data = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+        # Orders whole writes, so an older snapshot never replaces a newer one
+        self.write_lock = threading.Lock()
+        self.timer = None
+        self.transaction_depth = 0
+
+        _live_stores.add(self)
+
+    def load(self):
+        """Load the config file, creating it from defaults if missing"""
+        try:
+            if self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            else:
+                data = self.default_factory()
+                self.dirty = True
+        except Exception as e:
+            self.logger.error("Error loading %s: %s", self.label, e)
+            data = self.default_factory()
+
+        with self.lock:
+            self.data = data
+        if self.dirty:
+            self.flush()
+        return self.data
+
+    def update(self, data):
+        """Replace the config contents and schedule a save"""
+        with self.lock:
+            if data is not self.data:
+                self.data.clear()
+                self.data.update(data)
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """Record a mutation of self.data and restart the debounce timer"""
+        with self.lock:
+            self.dirty = True
+            if self.transaction_depth:
+                return
+
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    @contextmanager
+    def transaction(self):
+        """Batch several mutations into one save, rolling back on error"""
+        with self.lock:
+            snapshot = copy.deepcopy(self.data) if not self.transaction_depth else None
+            self.transaction_depth += 1
+
+        try:
+            yield self.data
+        except Exception:
+            with self.lock:
+                if snapshot is not None:
+                    self.data.clear()
+                    self.data.update(snapshot)
+            raise
+        finally:
+            with self.lock:
+                self.transaction_depth -= 1
+                if not self.transaction_depth and self.dirty:
+                    self.mark_dirty()
+
+    def flush(self):
+        """Write pending changes to disk now
+
+        The data is copied under the lock and serialized outside it, so
+        mutations are never blocked on disk I/O.
+        """
+        with self.write_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty:
+                    return
+                snapshot = copy.deepcopy(self.data)
+                self.dirty = False
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(
+                    dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, self.path)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+            except Exception as e:
+                self.logger.error("Error saving %s: %s", self.label, e)
+                self.mark_dirty()
+
+    def close(self):
+        """Write pending changes and stop tracking the store for exit"""
+        self.flush()
+        _live_stores.discard(self)
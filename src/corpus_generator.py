@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Synthetic map-banner corpus generator for offline OCR measurements
+"""
+
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+
+# Tried in order, whatever is installed gets used
+FONT_CANDIDATES = [
+    "arial.ttf", "arialbd.ttf", "times.ttf", "verdana.ttf",
+    "DejaVuSans.ttf", "DejaVuSans-Bold.ttf", "DejaVuSerif.ttf",
+    "LiberationSans-Regular.ttf", "LiberationSans-Bold.ttf",
+    "LiberationSerif-Regular.ttf"
+]
+
+BANNER_SIZE = (400, 100)
+FONT_SIZES = (18, 22, 26, 30, 36)
+SCALES = (0.5, 0.75, 1.0, 1.25, 1.5)
+BACKGROUNDS = ("solid", "gradient", "texture")
+
+
+def available_fonts():
+    """Return the candidate fonts that can be loaded on this machine"""
+    fonts = []
+    for name in FONT_CANDIDATES:
+        try:
+            ImageFont.truetype(name, 12)
+            fonts.append(name)
+        except OSError:
+            continue
+    return fonts or ["default"]
+
+
+def load_font(name, size):
+    """Load a font by name, falling back to Pillow's bundled font"""
+    if name == "default":
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(name, size)
+
+
+def noise_image(rng, size, amplitude):
+    """Uniform grey noise around mid-grey, drawn from rng for determinism"""
+    noise = Image.frombytes('L', size, rng.randbytes(size[0] * size[1]))
+    return noise.point(lambda v: 128 + (v - 128) * amplitude // 128)
+
+
+def render_background(rng, size, kind):
+    """Render a dark banner background of the given kind"""
+    base = rng.randint(5, 60)
+    if kind == "gradient":
+        top, bottom = base, min(255, base + rng.randint(20, 80))
+        column = Image.linear_gradient('L').resize((1, size[1]))
+        column = column.point(lambda v: top + (bottom - top) * v // 255)
+        return column.resize(size).convert('RGB')
+    if kind == "texture":
+        noise = noise_image(rng, size, rng.randint(10, 40))
+        return noise.point(lambda v: base + v // 6).convert('RGB')
+    return Image.new('RGB', size, color=(base, base, base))
+
+
+def render_sample(spec):
+    """Render one banner image from a sample spec and save it"""
+    rng = random.Random(spec["seed"])
+    size = BANNER_SIZE
+
+    image = render_background(rng, size, spec["background"])
+    draw = ImageDraw.Draw(image)
+    font = load_font(spec["font"], spec["font_size"])
+
+    # Centre the title, light text with a dark stroke like the game banner
+    bbox = draw.textbbox((0, 0), spec["text"], font=font)
+    text_x = (size[0] - (bbox[2] - bbox[0])) // 2 + rng.randint(-10, 10)
+    text_y = (size[1] - (bbox[3] - bbox[1])) // 2 + rng.randint(-5, 5)
+    shade = rng.randint(200, 255)
+    draw.text((text_x, text_y), spec["text"], font=font,
+              fill=(shade, shade, shade - rng.randint(0, 30)),
+              stroke_width=rng.choice((0, 1, 2)), stroke_fill=(0, 0, 0))
+
+    if spec["noise"] > 0:
+        noise = noise_image(rng, size, spec["noise"]).convert('RGB')
+        image = Image.blend(image, noise, 0.15)
+    if spec["blur"] > 0:
+        image = image.filter(ImageFilter.GaussianBlur(radius=spec["blur"]))
+    if spec["scale"] != 1.0:
+        scaled = (round(size[0] * spec["scale"]), round(size[1] * spec["scale"]))
+        image = image.resize(scaled, Image.Resampling.BILINEAR)
+
+    # JPEG artifacts come from the saved file itself
+    image.save(spec["path"], quality=spec["jpeg_quality"])
+    return spec
+
+
+def render_chunk(specs):
+    """Render a chunk of samples in a worker process"""
+    return [render_sample(spec) for spec in specs]
+
+
+class CorpusGenerator:
+    """Renders every configured map name as varied banner images"""
+
+    def __init__(self, output_dir, maps_config_path="config/maps_config.json",
+                 variants=20, seed=0, workers=None, chunk_size=32):
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = Path(output_dir)
+        self.maps_config_path = Path(maps_config_path)
+        self.variants = variants
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+
+    def load_map_names(self):
+        """Read the map names from maps_config.json
+
+        The file is only read, never created.  Raises ValueError if it is
+        missing, unreadable or lists no maps.
+        """
+        try:
+            with open(self.maps_config_path, 'r', encoding='utf-8') as f:
+                maps = json.load(f).get("maps", {})
+        except (OSError, ValueError, AttributeError) as e:
+            raise ValueError(f"Cannot read map names from {self.maps_config_path}: {e}") from e
+        if not maps:
+            raise ValueError(f"No maps configured in {self.maps_config_path}")
+        return sorted(maps)
+
+    def build_specs(self, map_names, fonts):
+        """Derive every sample's parameters from the seed alone"""
+        specs = []
+        for map_index, map_name in enumerate(map_names):
+            for variant in range(self.variants):
+                index = map_index * self.variants + variant
+                rng = random.Random(f"{self.seed}:{map_name}:{variant}")
+                specs.append({
+                    "index": index,
+                    "path": str(self.output_dir / f"banner_{index:06d}.jpg"),
+                    "map": map_name,
+                    "text": map_name.upper() if rng.random() < 0.7 else map_name,
+                    "font": rng.choice(fonts),
+                    "font_size": rng.choice(FONT_SIZES),
+                    "scale": rng.choice(SCALES),
+                    "background": rng.choice(BACKGROUNDS),
+                    "noise": rng.choice((0, 0, 10, 25, 40)),
+                    "blur": rng.choice((0, 0, 0.5, 1.0, 1.5)),
+                    "jpeg_quality": rng.choice((30, 50, 70, 85, 95)),
+                    "seed": rng.getrandbits(32)
+                })
+        return specs
+
+    def generate(self):
+        """Render the corpus and write manifest.jsonl, returning its path"""
+        map_names = self.load_map_names()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        fonts = available_fonts()
+        specs = self.build_specs(map_names, fonts)
+
+        self.logger.info("Rendering %d banners with %d fonts on %d workers",
+                         len(specs), len(fonts), self.workers)
+
+        chunks = [specs[i:i + self.chunk_size]
+                  for i in range(0, len(specs), self.chunk_size)]
+        manifest_path = self.output_dir / "manifest.jsonl"
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor, \
+                open(manifest_path, 'w', encoding='utf-8') as manifest:
+            # map() keeps chunk order, so the manifest is deterministic too
+            for rendered in executor.map(render_chunk, chunks):
+                for spec in rendered:
+                    entry = dict(spec, file=Path(spec["path"]).name)
+                    del entry["path"]
+                    manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        self.logger.info("Corpus written to %s", self.output_dir)
+        return manifest_path
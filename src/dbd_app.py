@@ -5,39 +5,169 @@ DbD Communication App - Main Application Class
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
+import importlib
 import logging
 from pathlib import Path
 
-from ocr_detector import OCRDetector
-from map_manager import MapManager
-from gui_interface import MapGUI
-from tts_handler import TTSHandler
+from startup_profile import profiler
+
+with profiler.measure("import", "app modules"):
+    from ocr_detector import OCRDetector
+    from map_manager import MapManager
+    from gui_interface import MapGUI
+    from map_tiles import TileCache
+    from tts_handler import TTSHandler
+    from detection_service import DetectionService
+    from detection_daemon import DetectionSubscriber
+    from frame_pipeline import FramePipeline
+    from metrics import registry
+    from callout_relay import CalloutRelay
 
 
 class DbDCommunicationApp:
     """Main application class for DbD Communication App"""
 
-    def __init__(self):
+    def __init__(self, startup_report=False, relay_options=None,
+                 detection_address=None):
         self.logger = logging.getLogger(__name__)
+        self.startup_report = startup_report
+        # Subscribe to a detection daemon here instead of running OCR locally
+        self.detection_address = detection_address
         self.root = tk.Tk()
         self.root.title("DbD Communication App")
         self.root.geometry("800x600")
 
-        # Initialize components
-        self.ocr_detector = OCRDetector()
-        self.map_manager = MapManager()
-        self.tts_handler = TTSHandler()
+        # Components are created in the background, see start_component_init()
+        self.ocr_detector = None
+        self.map_manager = None
+        self.tts_handler = None
         self.map_gui = None
+        # Decodes and renders maps so loading never blocks the Tk thread
+        self.map_loader = ThreadPoolExecutor(max_workers=1,
+                                             thread_name_prefix="map-loader")
+        # Tile pyramids of recently shown maps, used only on the map loader
+        self.map_pyramids = TileCache(capacity=2)
+        self.component_factories = {
+            "map_manager": MapManager,
+            "tts_handler": TTSHandler
+        }
+        # A detection daemon does the OCR, so there is no local detector
+        if not self.detection_address:
+            self.component_factories["ocr_detector"] = OCRDetector
+        self.components_pending = set(self.component_factories)
+        self.component_futures = {}
 
         # Application state
         self.current_map = None
         self.detection_active = False
-        self.detection_thread = None
+        self.detection_service = None
+        self.frame_pipeline = None
+        self.health_job = None
+
+        if self.startup_report:
+            # The callout comes after the report, so it gets its own line
+            profiler.on_mark("first_callout", self.report_first_callout)
 
+        self.start_component_init()
         self.setup_main_interface()
 
+        # Team callout relay, enabled from the command line
+        self.callout_relay = None
+        if relay_options is not None:
+            self.start_callout_relay(relay_options)
+
+        self.root.update_idletasks()
+        profiler.mark("first_window")
+
+    def start_component_init(self):
+        """Create OCR (unless a daemon detects), map and TTS components
+        concurrently off the UI thread"""
+        executor = ThreadPoolExecutor(
+            max_workers=len(self.component_factories),
+            thread_name_prefix="component-init")
+
+        for name, factory in self.component_factories.items():
+            self.component_futures[name] = executor.submit(
+                self.init_component, name, factory)
+
+        executor.shutdown(wait=False)
+        # Tk is only touched from its own thread, so poll the futures there
+        self.root.after(20, self.poll_components)
+
+    def poll_components(self):
+        """Attach finished components, and poll again while any are pending"""
+        for name, future in list(self.component_futures.items()):
+            if future.done():
+                del self.component_futures[name]
+                self.on_component_ready(name, future)
+
+        if self.component_futures:
+            self.root.after(20, self.poll_components)
+
+    def init_component(self, name, factory):
+        """Build one component and warm up the backends it will need"""
+        with profiler.measure("init", name):
+            component = factory()
+
+        if name == "ocr_detector":
+            with profiler.measure("import", "pyautogui + pytesseract"):
+                component.load_backends()
+        elif name == "map_manager":
+            # Hotkeys are registered when the first map opens
+            with profiler.measure("import", "keyboard"):
+                importlib.import_module("keyboard")
+        return component
+
+    def on_component_ready(self, name, future):
+        """Attach a finished component and update the ready indicator"""
+        try:
+            setattr(self, name, future.result())
+        except Exception as e:
+            self.logger.error("Error initializing %s: %s", name, e)
+
+        self.components_pending.discard(name)
+
+        if name == "ocr_detector" and self.ocr_detector:
+            self.detection_button.state(["!disabled"])
+        elif name == "map_manager" and self.map_manager:
+            self.map_combo.config(values=self.map_manager.get_available_maps())
+            self.load_map_button.state(["!disabled"])
+
+        # Once both exist, the OCR lexicon follows the map list
+        if name in ("ocr_detector", "map_manager") and self.ocr_detector \
+                and self.map_manager:
+            self.map_manager.add_change_listener(self.sync_ocr_lexicon)
+            self.sync_ocr_lexicon()
+
+        ready = len(self.component_factories) - len(self.components_pending)
+        if self.components_pending:
+            self.ready_label.config(
+                text=f"Loading components ({ready}/{len(self.component_factories)})...")
+            return
+
+        failed = [name for name in self.component_factories
+                  if getattr(self, name) is None]
+        if failed:
+            self.ready_label.config(
+                text=f"Ready (unavailable: {', '.join(failed)})")
+        else:
+            self.ready_label.config(text="All components ready")
+
+        profiler.mark("components_ready")
+        if self.startup_report:
+            for line in profiler.report():
+                self.logger.info(line)
+
+    def report_first_callout(self, offset):
+        """Log time-to-first-callout for --startup-report"""
+        self.logger.info("Startup report: first_callout at %.1f ms since launch",
+                         offset * 1000)
+
+    def sync_ocr_lexicon(self):
+        """Regenerate the Tesseract lexicon from the current maps"""
+        self.ocr_detector.update_lexicon(self.map_manager.get_lexicon_names())
+
     def setup_main_interface(self):
         """Setup the main control interface"""
         # Main frame
@@ -61,6 +191,14 @@ class DbDCommunicationApp:
                                            font=("Arial", 10, "italic"))
         self.current_map_label.grid(row=1, column=0, sticky="w")
 
+        self.ready_label = ttk.Label(
+            status_frame,
+            text=f"Loading components (0/{len(self.component_factories)})...")
+        self.ready_label.grid(row=2, column=0, sticky="w")
+
+        self.health_label = ttk.Label(status_frame, text="")
+        self.health_label.grid(row=3, column=0, sticky="w")
+
         # Control buttons frame
         control_frame = ttk.LabelFrame(
             main_frame, text="Controls", padding="10")
@@ -71,6 +209,9 @@ class DbDCommunicationApp:
         self.detection_button = ttk.Button(control_frame, text="Start Detection",
                                            command=self.toggle_detection)
         self.detection_button.grid(row=0, column=0, padx=(0, 10))
+        if not self.detection_address:
+            # Enabled once the OCR detector is ready
+            self.detection_button.state(["disabled"])
 
         # Manual map selection
         ttk.Label(control_frame, text="Manual map:").grid(
@@ -78,12 +219,13 @@ class DbDCommunicationApp:
 
         self.map_var = tk.StringVar()
         self.map_combo = ttk.Combobox(control_frame, textvariable=self.map_var,
-                                      values=self.map_manager.get_available_maps(),
-                                      state="readonly", width=25)
+                                      values=[], state="readonly", width=25)
         self.map_combo.grid(row=0, column=2, padx=(0, 10))
 
-        ttk.Button(control_frame, text="Load Map",
-                   command=self.load_selected_map).grid(row=0, column=3)
+        self.load_map_button = ttk.Button(control_frame, text="Load Map",
+                                          command=self.load_selected_map)
+        self.load_map_button.grid(row=0, column=3)
+        self.load_map_button.state(["disabled"])
 
         # Settings frame
         settings_frame = ttk.LabelFrame(
@@ -95,17 +237,27 @@ class DbDCommunicationApp:
         ttk.Label(settings_frame, text="Sector Mode:").grid(
             row=0, column=0, sticky="w")
 
-        self.sector_mode = tk.StringVar(value="clock")
+        # "map" uses a map's own sectors from maps_config.json, and the
+        # clock for maps without a layout
+        self.sector_mode = tk.StringVar(value="map")
         ttk.Radiobutton(settings_frame, text="12-Hour Clock", variable=self.sector_mode,
                         value="clock").grid(row=0, column=1, sticky="w", padx=(10, 0))
         ttk.Radiobutton(settings_frame, text="9-Zone Numpad", variable=self.sector_mode,
                         value="numpad").grid(row=0, column=2, sticky="w", padx=(10, 0))
+        ttk.Radiobutton(settings_frame, text="Map Layout", variable=self.sector_mode,
+                        value="map").grid(row=0, column=3, sticky="w", padx=(10, 0))
 
         # TTS enable/disable
         self.tts_enabled = tk.BooleanVar(value=True)
         ttk.Checkbutton(settings_frame, text="Enable Text-to-Speech",
                         variable=self.tts_enabled).grid(row=1, column=0, columnspan=3, sticky="w", pady=(5, 0))
 
+        # Pipeline stats panel toggle
+        self.stats_visible = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Show Pipeline Stats",
+                        variable=self.stats_visible,
+                        command=self.toggle_stats_panel).grid(row=2, column=0, columnspan=3, sticky="w", pady=(5, 0))
+
         # Instructions
         instructions_frame = ttk.LabelFrame(
             main_frame, text="Instructions", padding="10")
@@ -120,11 +272,60 @@ class DbDCommunicationApp:
         ttk.Label(instructions_frame, text=instructions_text,
                   justify="left").grid(row=0, column=0, sticky="w")
 
+        # Stats panel, only gridded and refreshed while enabled
+        self.stats_frame = ttk.LabelFrame(main_frame, text="Stats", padding="10")
+        self.stats_label = ttk.Label(self.stats_frame, font=("Courier", 9),
+                                     justify="left")
+        self.stats_label.grid(row=0, column=0, sticky="w")
+
         # Configure grid weights
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
 
+    def start_callout_relay(self, relay_options):
+        """Connect to teammates' instances for shared callouts"""
+        try:
+            self.callout_relay = CalloutRelay(
+                on_callout=self.on_relay_callout, **relay_options)
+        except Exception as e:
+            self.logger.error("Error starting callout relay: %s", e)
+
+    def on_relay_callout(self, callout):
+        """Forward a teammate's callout from the relay thread to Tk"""
+        self.root.after(0, self.show_relay_callout, callout)
+
+    def show_relay_callout(self, callout):
+        """Highlight and speak a teammate's callout"""
+        self.logger.info("Teammate callout: %s %s on %s", callout.callout_type,
+                         callout.sector, callout.map_name)
+
+        if self.map_gui and callout.map_name in ("", self.map_gui.map_name):
+            self.map_gui.show_remote_callout(callout.sector, callout.callout_type)
+        elif self.tts_handler and self.tts_enabled.get():
+            self.tts_handler.speak_callout(callout.sector, callout.callout_type)
+
+    def on_local_callout(self, map_name, sector_number):
+        """Share a local callout with teammates"""
+        if self.callout_relay:
+            self.callout_relay.send_callout(map_name, sector_number)
+
+    def toggle_stats_panel(self):
+        """Show or hide the pipeline stats panel"""
+        if self.stats_visible.get():
+            self.stats_frame.grid(row=5, column=0, columnspan=2, sticky="ew")
+            self.refresh_stats()
+        else:
+            self.stats_frame.grid_remove()
+
+    def refresh_stats(self):
+        """Redraw the stats panel once per second while it is visible"""
+        if not self.stats_visible.get():
+            return
+
+        self.stats_label.config(text="\n".join(registry.format_lines()))
+        self.root.after(1000, self.refresh_stats)
+
     def toggle_detection(self):
         """Toggle OCR detection on/off"""
         if not self.detection_active:
@@ -139,29 +340,72 @@ class DbDCommunicationApp:
         self.status_label.config(
             text="Detection active - monitoring for maps...")
 
-        self.detection_thread = threading.Thread(
-            target=self.detection_loop, daemon=True)
-        self.detection_thread.start()
+        if self.detection_address:
+            self.detection_service = DetectionSubscriber(
+                self.on_detection_event, address=self.detection_address).start()
+            return
+
+        # With the frame pipeline this thread only waits on its result queue
+        self.frame_pipeline = FramePipeline.from_config(self.ocr_detector)
+        if self.frame_pipeline:
+            self.frame_pipeline.start()
+
+        self.detection_service = DetectionService(
+            self.frame_pipeline or self.ocr_detector, interval=2.0,
+            on_event=self.on_detection_event,
+            stall_timeout=self.ocr_detector.config.get("watchdog_timeout", 10.0))
+        self.detection_service.current_map = self.current_map
+        self.detection_service.start()
+        self.refresh_health()
 
     def stop_detection(self):
         """Stop OCR detection"""
         self.detection_active = False
+        if isinstance(self.detection_service, DetectionSubscriber):
+            self.detection_service.close()
+        elif self.detection_service:
+            self.detection_service.stop()
+        if self.frame_pipeline:
+            self.frame_pipeline.stop()
+            self.frame_pipeline = None
         self.detection_button.config(text="Start Detection")
         self.status_label.config(text="Detection stopped")
 
-    def detection_loop(self):
-        """Main detection loop running in background thread"""
-        while self.detection_active:
-            try:
-                detected_map = self.ocr_detector.detect_map()
-                if detected_map and detected_map != self.current_map:
-                    self.logger.info(f"New map detected: {detected_map}")
-                    self.root.after(0, self.on_map_detected, detected_map)
-
-            except Exception as e:
-                self.logger.error(f"Error in detection loop: {e}")
-
-            time.sleep(2)  # Check every 2 seconds
+    def on_detection_event(self, event):
+        """Forward detection events from the background thread to Tk"""
+        if event["event"] == "map_changed":
+            self.root.after(0, self.on_map_detected, event["map"])
+        elif event["event"] == "match_state_changed":
+            self.root.after(0, self.on_match_state_changed, event["state"])
+        elif event["event"] == "state" and event.get("map"):
+            # A daemon's snapshot on connect, possibly of a map seen earlier
+            self.root.after(0, self.on_daemon_state, event["map"])
+
+    def refresh_health(self):
+        """Show OCR deadline and watchdog counters in the Status frame"""
+        timeouts = registry.counter("ocr.timeouts").value
+        restarts = (registry.counter("detection.watchdog_restarts").value
+                    + registry.counter("pipeline.restarts").value)
+        tts_errors = registry.counter("tts.errors").value
+        self.health_label.config(
+            text=f"OCR timeouts: {timeouts}   Detection restarts: {restarts}"
+                 f"   TTS errors: {tts_errors}")
+
+        if self.health_job:
+            self.root.after_cancel(self.health_job)
+        self.health_job = (self.root.after(1000, self.refresh_health)
+                           if self.detection_active else None)
+
+    def on_match_state_changed(self, match_state):
+        """Show the screen classifier's current label"""
+        if self.detection_active:
+            self.status_label.config(
+                text=f"Detection active - screen: {match_state or 'unknown'}")
+
+    def on_daemon_state(self, map_name):
+        """Catch up with the map a detection daemon already knows about"""
+        if map_name != self.current_map:
+            self.on_map_detected(map_name)
 
     def on_map_detected(self, map_name):
         """Handle when a new map is detected"""
@@ -177,6 +421,10 @@ class DbDCommunicationApp:
 
     def load_map(self, map_name):
         """Load and display a map with sectors"""
+        if self.map_manager is None:
+            self.logger.warning("Map manager not ready, cannot load %s", map_name)
+            return
+
         try:
             map_image_path = self.map_manager.get_map_image(map_name)
             if map_image_path:
@@ -184,22 +432,42 @@ class DbDCommunicationApp:
                 if self.map_gui:
                     self.map_gui.close()
 
-                # Create new map GUI
+                # Create new map GUI; the image is decoded and rendered on
+                # the map loader.  With a map pack the packed copy is shown,
+                # and the source file is only decoded once zoomed into
+                open_image = open_detail = None
+                map_pack = self.map_manager.map_pack
+                if map_pack and Path(map_image_path).name in map_pack:
+                    open_image = self.map_manager.open_map_image
+                    open_detail = self.map_manager.open_full_map_image
+
+                sector_mode = self.sector_mode.get()
+                sector_layout = None
+                if sector_mode == "map":
+                    sector_layout = self.map_manager.get_sector_layout(map_name)
+                    sector_mode = "custom" if sector_layout else "clock"
+
                 self.map_gui = MapGUI(
                     map_image_path=map_image_path,
+                    open_image=open_image,
+                    open_detail=open_detail,
+                    pyramid_cache=self.map_pyramids,
+                    loader=self.map_loader,
                     map_name=map_name,
-                    sector_mode=self.sector_mode.get(),
-                    tts_handler=self.tts_handler if self.tts_enabled.get() else None
+                    sector_mode=sector_mode,
+                    sector_layout=sector_layout,
+                    tts_handler=self.tts_handler if self.tts_enabled.get() else None,
+                    on_callout=self.on_local_callout
                 )
                 self.map_gui.show()
 
-                self.logger.info(f"Loaded map: {map_name}")
+                self.logger.info("Loaded map: %s", map_name)
             else:
                 messagebox.showwarning("Map Not Found",
                                        f"Map image for '{map_name}' not found.")
 
         except Exception as e:
-            self.logger.error(f"Error loading map {map_name}: {e}")
+            self.logger.error("Error loading map %s: %s", map_name, e)
             messagebox.showerror("Error", f"Failed to load map: {e}")
 
     def run(self):
@@ -209,7 +477,7 @@ class DbDCommunicationApp:
             self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
             self.root.mainloop()
         except Exception as e:
-            self.logger.error(f"Error running application: {e}")
+            self.logger.error("Error running application: %s", e)
             raise
 
     def on_closing(self):
@@ -217,4 +485,13 @@ class DbDCommunicationApp:
         self.stop_detection()
         if self.map_gui:
             self.map_gui.close()
+        self.map_loader.shutdown(wait=False, cancel_futures=True)
+        if self.tts_handler:
+            self.tts_handler.shutdown()
+        if self.callout_relay:
+            self.callout_relay.close()
+        if self.ocr_detector:
+            self.ocr_detector.flush_config()
+        if self.map_manager:
+            self.map_manager.flush()
         self.root.destroy()
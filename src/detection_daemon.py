@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Standalone detection daemon publishing events to local subscribers
+
+One daemon owns the capture + tesseract loop; the GUI, headless loggers
+and overlays subscribe to its socket instead of running their own.  Each
+subscriber first receives a "state" snapshot, then every event as a
+JSON line.
+"""
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from detection_service import DetectionService, SocketEmitter
+
+
+DEFAULT_SOCKET_PATH = str(Path(tempfile.gettempdir()) / "dbd-detection.sock")
+
+
+def parse_address(address):
+    """Unix socket path, or (host, port) for "HOST:PORT" addresses"""
+    host, sep, port = str(address).rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return str(address)
+
+
+def open_listening_socket(address):
+    """Bind a listening socket, replacing a stale Unix socket file"""
+    if isinstance(address, tuple):
+        return socket.create_server(address)
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("Unix domain sockets are not available here, "
+                      "use a HOST:PORT address instead")
+
+    path = Path(address)
+    if path.exists():
+        # Refuse to steal the socket of a daemon that is still running
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+        else:
+            raise OSError(f"Detection daemon already running on {path}")
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen()
+    return server
+
+
+class StatePublisher(SocketEmitter):
+    """Socket emitter that greets each subscriber with the current state
+
+    Events are numbered with "seq" so subscribers can tell whether they
+    missed any after their snapshot.
+    """
+
+    def __init__(self, address=DEFAULT_SOCKET_PATH):
+        self.address_spec = parse_address(address)
+        self.sequence = 0
+        self.state = {
+            "event": "state",
+            "running": False,
+            "match_state": None,
+            "map": None,
+            "confidence": None,
+            "interval": None,
+            "seq": 0
+        }
+        super().__init__(server=open_listening_socket(self.address_spec))
+
+    def update_state(self, event):
+        """Fold an event into the snapshot sent to new subscribers"""
+        event_type = event["event"]
+        if event_type == "started":
+            self.state.update(running=True, interval=event.get("interval"))
+        elif event_type == "stopped":
+            self.state["running"] = False
+        elif event_type == "match_state_changed":
+            self.state["match_state"] = event["state"]
+        elif event_type in ("detection", "map_changed"):
+            self.state.update(map=event["map"], confidence=event.get("confidence"))
+
+    def on_connect(self, client):
+        state = dict(self.state, timestamp=time.time())
+        line = (json.dumps(state, ensure_ascii=False) + "\n").encode("utf-8")
+        return self.send_line(client, line)
+
+    def __call__(self, event):
+        with self.lock:
+            self.sequence += 1
+            event = dict(event, seq=self.sequence)
+            self.update_state(event)
+            self.state["seq"] = self.sequence
+
+            line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+            self.clients = [client for client in self.clients
+                            if self.send_line(client, line)]
+
+    def close(self):
+        super().close()
+        if isinstance(self.address_spec, str):
+            try:
+                os.unlink(self.address_spec)
+            except OSError:
+                pass
+
+
+class DetectionDaemon:
+    """Runs one DetectionService and publishes its events"""
+
+    def __init__(self, ocr_detector, address=DEFAULT_SOCKET_PATH, interval=2.0,
+                 stall_timeout=None):
+        self.logger = logging.getLogger(__name__)
+        self.publisher = StatePublisher(address)
+        self.service = DetectionService(ocr_detector, interval=interval,
+                                        on_event=self.publisher,
+                                        stall_timeout=stall_timeout)
+
+    def run(self):
+        """Detect until interrupted, then close the socket"""
+        try:
+            self.service.run()
+        except KeyboardInterrupt:
+            self.service.stop()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop detection and remove the socket"""
+        self.service.stop()
+        self.publisher.close()
+
+
+class DetectionSubscriber:
+    """Receives detection daemon events on a background thread
+
+    Reconnects after the daemon restarts; every (re)connect starts with a
+    fresh "state" event.
+    """
+
+    def __init__(self, on_event, address=DEFAULT_SOCKET_PATH, retry_interval=2.0):
+        self.logger = logging.getLogger(__name__)
+        self.on_event = on_event
+        self.address = parse_address(address)
+        self.retry_interval = retry_interval
+
+        self.sock = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name="detection-subscriber", daemon=True)
+
+    def start(self):
+        """Start receiving events"""
+        self.thread.start()
+        return self
+
+    def connect(self):
+        """Open a connection to the daemon"""
+        if isinstance(self.address, tuple):
+            return socket.create_connection(self.address, timeout=5)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.sock = self.connect()
+                self.sock.settimeout(None)
+                self.logger.info("Subscribed to detection daemon at %s", self.address)
+                self._read_events(self.sock.makefile('r', encoding='utf-8'))
+            except OSError as e:
+                if not self.stop_event.is_set():
+                    self.logger.debug("Detection daemon unavailable: %s", e)
+            finally:
+                if self.sock:
+                    self.sock.close()
+                    self.sock = None
+
+            self.stop_event.wait(self.retry_interval)
+
+    def _read_events(self, stream):
+        for line in stream:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                self.logger.warning("Ignoring malformed daemon event: %r", line)
+                continue
+
+            try:
+                self.on_event(event)
+            except Exception as e:
+                self.logger.error("Error in detection event subscriber: %s", e)
+
+    def close(self):
+        """Stop receiving and disconnect"""
+        self.stop_event.set()
+        sock = self.sock
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
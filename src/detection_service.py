@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Map detection loop and event emitters, independent of any GUI toolkit
+"""
+
+import json
+import logging
+import socket
+import sys
+import threading
+import time
+
+from metrics import registry
+
+
+class DetectionService:
+    """Runs OCRDetector periodically and reports map changes as events
+
+    Every successful tick emits a "detection" event carrying the match
+    confidence; "map_changed" follows only when the map differs, and
+    "match_state_changed" when the screen classifier's label changes.
+
+    With a stall_timeout, a watchdog thread replaces a detection thread
+    stuck in one tick for longer than that (emitting "watchdog_restart"),
+    so detection latency stays bounded even if a backend hangs.  The
+    stuck thread is abandoned and its late result discarded; the
+    detector's restart(), if it has one, runs first so the new thread does
+    not share a pool or classifier with the stuck one.
+    """
+
+    def __init__(self, ocr_detector, interval=2.0, on_event=None, stall_timeout=None):
+        self.logger = logging.getLogger(__name__)
+        self.ocr_detector = ocr_detector
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.listeners = [on_event] if on_event else []
+
+        self.current_map = None
+        self.match_state = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.watchdog_thread = None
+
+        # Bumped on every (re)start; a loop from an older generation exits
+        self.generation = 0
+        self.tick_started = None
+        self.lock = threading.Lock()
+        # One engine restart at a time
+        self.restart_lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """Register a callback that receives every event dict"""
+        self.listeners.append(callback)
+
+    def emit(self, event_type, **fields):
+        """Send an event to all listeners"""
+        event = {"event": event_type, "timestamp": time.time()}
+        event.update(fields)
+
+        for callback in self.listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error("Error in detection event listener: %s", e)
+
+    def start(self):
+        """Run the detection loop (and watchdog) in background threads"""
+        if self.thread and self.thread.is_alive() and not self.stop_event.is_set():
+            return
+
+        self.stop_event.clear()
+        self.emit("started", interval=self.interval)
+        self.start_loop()
+
+        if self.stall_timeout and not (
+                self.watchdog_thread and self.watchdog_thread.is_alive()):
+            self.watchdog_thread = threading.Thread(
+                target=self._watchdog, name="detection-watchdog", daemon=True)
+            self.watchdog_thread.start()
+
+    def start_loop(self):
+        """Start a detection thread for a new generation"""
+        with self.lock:
+            self.generation += 1
+            self.tick_started = None
+            self.thread = threading.Thread(
+                target=self._loop, args=(self.generation,), name="detection",
+                daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Ask the detection loop to exit after the current tick"""
+        self.stop_event.set()
+
+    def is_running(self):
+        """Check whether the detection loop is active"""
+        return not self.stop_event.is_set() and (
+            self.thread is None or self.thread.is_alive())
+
+    def run(self):
+        """Run detection until stop() is called or the caller is interrupted"""
+        self.start()
+        try:
+            while not self.stop_event.wait(0.5):
+                pass
+        finally:
+            self.stop()
+            self.thread.join(timeout=self.interval + 1)
+
+    def _loop(self, generation):
+        """Detection thread body"""
+        while not self.stop_event.is_set() and generation == self.generation:
+            self.tick_started = time.monotonic()
+            try:
+                detected_map = self.ocr_detector.detect_map()
+            except Exception as e:
+                self.logger.error("Error in detection loop: %s", e)
+                detected_map = None
+
+            if generation != self.generation:
+                # Replaced by the watchdog while stuck in detect_map()
+                self.logger.info("Abandoned detection thread finished late")
+                return
+            self.tick_started = None
+
+            try:
+                self.handle_detection(detected_map)
+            except Exception as e:
+                self.logger.error("Error in detection loop: %s", e)
+
+            self.stop_event.wait(self.interval)
+
+        if generation == self.generation:
+            self.emit("stopped")
+
+    def _watchdog(self):
+        """Replace a detection thread stuck in one tick past stall_timeout"""
+        while not self.stop_event.wait(min(1.0, self.stall_timeout / 4)):
+            started = self.tick_started
+            if started is None:
+                continue
+
+            stalled = time.monotonic() - started
+            if stalled > self.stall_timeout:
+                self.restart_stalled(stalled)
+
+    def restart_stalled(self, stalled):
+        """Abandon the stuck thread, restart the engine and detect again"""
+        with self.restart_lock:
+            self.logger.warning("Detection stalled for %.1fs, restarting", stalled)
+            registry.counter("detection.watchdog_restarts").inc()
+            self.emit("watchdog_restart", stalled_s=round(stalled, 2))
+
+            # Engines that can be restarted (e.g. the frame pipeline) start fresh
+            restart = getattr(self.ocr_detector, "restart", None)
+            if restart:
+                try:
+                    restart()
+                except Exception as e:
+                    self.logger.error("Error restarting detection engine: %s", e)
+
+            self.start_loop()
+
+    def tick(self):
+        """Run one detection and emit events for what changed"""
+        self.handle_detection(self.ocr_detector.detect_map())
+
+    def handle_detection(self, detected_map):
+        """Emit events for one detection result"""
+        match_state = getattr(self.ocr_detector, "match_state", None)
+        if match_state != self.match_state:
+            previous, self.match_state = self.match_state, match_state
+            self.emit("match_state_changed", state=match_state, previous=previous)
+
+        if not detected_map:
+            return
+
+        confidence = round(getattr(self.ocr_detector, "last_confidence", 0.0), 3)
+        self.emit("detection", map=detected_map, confidence=confidence)
+
+        if detected_map != self.current_map:
+            previous, self.current_map = self.current_map, detected_map
+            self.logger.info("New map detected: %s", detected_map)
+            self.emit("map_changed", map=detected_map, previous=previous,
+                      confidence=confidence)
+
+
+class JsonlEmitter:
+    """Writes events as JSON lines to a text stream"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def close(self):
+        """Nothing to release for a plain stream"""
+
+
+class SocketEmitter:
+    """Broadcasts events as JSON lines to clients of a local TCP socket"""
+
+    def __init__(self, host="127.0.0.1", port=8765, server=None):
+        self.logger = logging.getLogger(__name__)
+        self.clients = []
+        self.lock = threading.Lock()
+
+        # Subclasses may pass an already bound listening socket
+        self.server = server or socket.create_server((host, port))
+        self.address = self.server.getsockname()
+        self.accept_thread = threading.Thread(
+            target=self._accept_loop, name="event-socket", daemon=True)
+        self.accept_thread.start()
+
+        self.logger.info("Publishing detection events on %s", self.address)
+
+    def _accept_loop(self):
+        """Accept subscribers until the server socket is closed"""
+        while True:
+            try:
+                client, address = self.server.accept()
+            except OSError:
+                break
+
+            # A stalled subscriber is dropped instead of blocking detection
+            client.settimeout(1.0)
+            # Greeting under the lock so no event slips in between
+            with self.lock:
+                if self.on_connect(client) is not False:
+                    self.clients.append(client)
+            self.logger.info("Event subscriber connected: %s", address)
+
+    def on_connect(self, client):
+        """Hook for subclasses to greet a new subscriber
+
+        Returning False drops the client.
+        """
+
+    def send_line(self, client, line):
+        """Send one encoded line, returning False if the client is gone"""
+        try:
+            client.sendall(line)
+            return True
+        except OSError:
+            client.close()
+            return False
+
+    def __call__(self, event):
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            self.clients = [client for client in self.clients
+                            if self.send_line(client, line)]
+
+    def close(self):
+        """Close the server and all subscriber connections"""
+        self.server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
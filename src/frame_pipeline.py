@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Multiprocess capture -> OCR pipeline with a shared-memory frame ring
+
+A capture process grabs the OCR region, converts it to grayscale and
+writes it into the next slot of a shared-memory ring.  An OCR process
+always takes the newest slot, wraps it in a PIL image without copying
+and sends a small result dict back through a bounded queue.  Frames the
+OCR process could not get to are overwritten, so latency stays bounded
+by one OCR pass.
+"""
+
+import logging
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from logging_config import configure_worker_logging, worker_logging_settings
+from metrics import registry
+
+
+# Ring header, each part written by one process only: the newest complete
+# frame's sequence and slot (capture), then the slot being read, -1 for none (OCR)
+RING_HEADER = struct.Struct("<Qqq")
+LATEST_FIELDS = struct.Struct("<Qq")
+READING_FIELD = struct.Struct("<q")
+READING_OFFSET = LATEST_FIELDS.size
+# Slot header: frame sequence (0 while being written), width, height, capture time
+SLOT_HEADER = struct.Struct("<QIId")
+
+
+class FrameRing:
+    """Fixed-size grayscale frame slots in one shared-memory block
+
+    The writer never fills the slot the reader has claimed, zeroes a
+    slot's sequence before filling it and publishes the sequence
+    afterwards, so a reader can also detect a slot that changed under it.
+    """
+
+    def __init__(self, shm, slots, frame_bytes):
+        self.shm = shm
+        self.slots = slots
+        self.frame_bytes = frame_bytes
+        self.slot_size = SLOT_HEADER.size + frame_bytes
+        self.write_slot = -1
+
+    @classmethod
+    def create(cls, slots, frame_bytes):
+        """Allocate a new ring (in the owning process)"""
+        size = RING_HEADER.size + slots * (SLOT_HEADER.size + frame_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        RING_HEADER.pack_into(shm.buf, 0, 0, -1, -1)
+        return cls(shm, slots, frame_bytes)
+
+    @classmethod
+    def attach(cls, name, slots, frame_bytes):
+        """Open an existing ring from a worker process"""
+        return cls(shared_memory.SharedMemory(name=name), slots, frame_bytes)
+
+    def slot_offset(self, slot):
+        return RING_HEADER.size + slot * self.slot_size
+
+    def latest(self):
+        """(sequence, slot) of the newest complete frame; sequence 0 if none"""
+        return LATEST_FIELDS.unpack_from(self.shm.buf, 0)
+
+    def set_reading(self, slot):
+        """Claim a slot for reading (-1 to release it)"""
+        READING_FIELD.pack_into(self.shm.buf, READING_OFFSET, slot)
+
+    def write(self, sequence, image):
+        """Copy a grayscale image into a free slot and publish it"""
+        width, height = image.size
+        data = image.tobytes()
+        if len(data) > self.frame_bytes:
+            raise ValueError(f"Frame {width}x{height} does not fit the ring slots")
+
+        reading = READING_FIELD.unpack_from(self.shm.buf, READING_OFFSET)[0]
+        slot = (self.write_slot + 1) % self.slots
+        if slot == reading:
+            slot = (slot + 1) % self.slots
+        self.write_slot = slot
+
+        offset = self.slot_offset(slot)
+        SLOT_HEADER.pack_into(self.shm.buf, offset, 0, width, height, 0.0)
+        start = offset + SLOT_HEADER.size
+        self.shm.buf[start:start + len(data)] = data
+        SLOT_HEADER.pack_into(self.shm.buf, offset, sequence, width, height, time.time())
+        LATEST_FIELDS.pack_into(self.shm.buf, 0, sequence, slot)
+
+    def slot_sequence(self, slot):
+        """Sequence currently stored in a slot"""
+        return SLOT_HEADER.unpack_from(self.shm.buf, self.slot_offset(slot))[0]
+
+    def read(self, sequence, slot):
+        """Zero-copy view of a frame as (image, captured_at), or None if gone
+
+        The image borrows the shared buffer; drop it before closing the ring
+        and check slot_sequence() afterwards to detect a torn read.
+        """
+        from PIL import Image
+
+        offset = self.slot_offset(slot)
+        stored, width, height, captured_at = SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        if stored != sequence:
+            return None
+
+        start = offset + SLOT_HEADER.size
+        view = self.shm.buf[start:start + width * height]
+        image = Image.frombuffer("L", (width, height), view, "raw", "L", 0, 1)
+        return image, captured_at
+
+    def close(self):
+        self.shm.close()
+
+
+def _capture_main(ring_spec, config_path, capture_backend, interval,
+                  stop_event, frame_ready, log_settings=None):
+    """Capture process: grab the OCR region into the ring at a fixed rate"""
+    configure_worker_logging(log_settings)
+    from ocr_detector import OCRDetector
+
+    logger = logging.getLogger(__name__)
+    ring = FrameRing.attach(*ring_spec)
+    detector = OCRDetector(config_path=config_path, capture_backend=capture_backend)
+    # Frames are handed over, not archived
+    detector.config["save_screenshots"] = False
+
+    sequence = 0
+    try:
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            screenshot = detector.take_screenshot()
+            if screenshot is not None:
+                sequence += 1
+                try:
+                    ring.write(sequence, screenshot.convert('L'))
+                    frame_ready.set()
+                except ValueError as e:
+                    logger.error("Dropping frame: %s", e)
+
+            remaining = interval - (time.perf_counter() - started)
+            if remaining > 0:
+                stop_event.wait(remaining)
+    finally:
+        ring.close()
+
+
+def _ocr_main(ring_spec, config_path, stop_event, frame_ready, results,
+              log_settings=None):
+    """OCR process: read the newest frame, recognize it, report the result"""
+    configure_worker_logging(log_settings)
+    from ocr_detector import OCRDetector
+
+    ring = FrameRing.attach(*ring_spec)
+    detector = OCRDetector(config_path=config_path, capture_backend="imagegrab")
+    detector.load_backends(capture=False)
+
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            if not frame_ready.wait(0.5):
+                continue
+            # Cleared before reading so a frame published meanwhile re-arms it
+            frame_ready.clear()
+
+            sequence, slot = ring.latest()
+            if sequence <= processed:
+                continue
+
+            ring.set_reading(slot)
+            frame = ring.read(sequence, slot)
+            if frame is None:
+                ring.set_reading(-1)
+                continue
+            image, captured_at = frame
+
+            # Classification costs microseconds, OCR only where it can pay off
+            match_state = detector.state_classifier.classify(image)
+            gated = not detector.state_classifier.should_ocr(match_state)
+            would_gate = not detector.state_classifier.banner_possible(match_state)
+            raw_text, map_name, confidence = ("", None, 0.0) if gated \
+                else detector.recognize(image)
+            del image, frame
+            # Overwritten mid-read (claimed too late): the text may mix frames
+            torn = ring.slot_sequence(slot) != sequence
+            ring.set_reading(-1)
+
+            if torn:
+                map_name, confidence = None, 0.0
+            result = {
+                "sequence": sequence,
+                "match_state": match_state,
+                "gated": gated,
+                "would_gate": would_gate,
+                "dropped": sequence - processed - 1,
+                "torn": torn,
+                "raw_text": raw_text,
+                "map": map_name,
+                "confidence": confidence,
+                "captured_at": captured_at,
+                "finished_at": time.time()
+            }
+            processed = sequence
+
+            # Keep the queue short: the oldest unread result gives way
+            try:
+                results.put_nowait(result)
+            except queue.Full:
+                try:
+                    results.get_nowait()
+                except queue.Empty:
+                    pass
+                results.put_nowait(result)
+    finally:
+        ring.close()
+
+
+class FramePipeline:
+    """Owns the ring and the capture and OCR processes
+
+    Presents the detect_map()/last_confidence/match_state interface of
+    OCRDetector so DetectionService can use it unchanged; only queue reads
+    happen in the calling process.
+    """
+
+    def __init__(self, ocr_detector, interval=0.5, slots=4, result_queue_size=4,
+                 result_timeout=2.0):
+        self.logger = logging.getLogger(__name__)
+        self.ocr_detector = ocr_detector
+        self.interval = interval
+        self.slots = max(2, slots)
+        self.result_queue_size = result_queue_size
+        self.result_timeout = result_timeout
+
+        self.last_confidence = 0.0
+        self.last_sequence = 0
+        self.match_state = None
+        self.ring = None
+        self.processes = []
+        # Serializes start/stop/restart between the detection thread and
+        # the watchdog
+        self.lock = threading.RLock()
+
+        # Spawn rather than fork so the workers never inherit Tk or hook threads
+        self._context = multiprocessing.get_context("spawn")
+
+    @classmethod
+    def from_config(cls, ocr_detector):
+        """Pipeline per the "frame_pipeline" OCR config section, or None if off"""
+        options = ocr_detector.config.get("frame_pipeline", {})
+        if not options.get("enabled", False):
+            return None
+        if ocr_detector.capture_regions:
+            # The ring holds frames of the one screenshot_region
+            logging.getLogger(__name__).warning(
+                "Frame pipeline ignored: capture_regions are configured")
+            return None
+        return cls(ocr_detector, interval=options.get("interval", 0.5),
+                   slots=options.get("slots", 4))
+
+    def frame_bytes(self):
+        """Largest grayscale frame the configured region can produce"""
+        _, _, width, height = self.ocr_detector.screenshot_region
+        return max(1, int(width) * int(height))
+
+    def start(self):
+        """Allocate the ring and start the worker processes"""
+        with self.lock:
+            if not self.processes:
+                self._start()
+
+    def _start(self):
+        """start() body, called with the lock held"""
+        self.ring = FrameRing.create(self.slots, self.frame_bytes())
+        ring_spec = (self.ring.shm.name, self.ring.slots, self.ring.frame_bytes)
+        config_path = str(self.ocr_detector.config_path)
+        log_settings = worker_logging_settings()
+
+        # Workers read the config file, so pending edits go out first
+        self.ocr_detector.flush_config()
+
+        self.stop_event = self._context.Event()
+        self.frame_ready = self._context.Event()
+        self.results = self._context.Queue(maxsize=self.result_queue_size)
+
+        self.processes = [
+            self._context.Process(
+                target=_capture_main, name="frame-capture", daemon=True,
+                args=(ring_spec, config_path, self.ocr_detector.capture_backend,
+                      self.interval, self.stop_event, self.frame_ready,
+                      log_settings)),
+            self._context.Process(
+                target=_ocr_main, name="frame-ocr", daemon=True,
+                args=(ring_spec, config_path, self.stop_event, self.frame_ready,
+                      self.results, log_settings))
+        ]
+        for process in self.processes:
+            process.start()
+        self.logger.info("Frame pipeline started (%d slots of %d bytes)",
+                         self.slots, self.ring.frame_bytes)
+
+    def get_result(self, timeout=None):
+        """Newest OCR result dict, or None if none arrived within timeout"""
+        with self.lock:
+            if not self.processes:
+                self._start()
+            processes, results = self.processes, self.results
+
+        try:
+            result = results.get(timeout=timeout)
+        except queue.Empty:
+            if not all(process.is_alive() for process in processes):
+                with self.lock:
+                    # Unless the watchdog restarted them in the meantime
+                    if self.processes is processes:
+                        self.logger.warning("Frame pipeline worker exited, restarting")
+                        registry.counter("pipeline.restarts").inc()
+                        self.restart()
+            return None
+        except (OSError, ValueError):
+            # The queue was closed by a concurrent restart
+            return None
+
+        # Skip ahead to the newest result if several are waiting
+        while True:
+            try:
+                result = results.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                break
+
+        registry.counter("pipeline.frames_dropped").inc(result["dropped"])
+        if result["torn"]:
+            registry.counter("pipeline.frames_torn").inc()
+        registry.histogram("pipeline.latency").observe(
+            result["finished_at"] - result["captured_at"])
+        if result["gated"]:
+            registry.counter("ocr.gated").inc()
+        elif result["would_gate"]:
+            registry.counter("ocr.would_gate").inc()
+        self.match_state = result["match_state"]
+        self.last_sequence = result["sequence"]
+        return result
+
+    def detect_map(self):
+        """Map name from the newest pipeline result, like OCRDetector.detect_map"""
+        result = self.get_result(timeout=self.result_timeout)
+        if result is None or not result["map"]:
+            return None
+
+        self.last_confidence = result["confidence"]
+        registry.counter("ocr.maps_detected").inc()
+        return result["map"]
+
+    def restart(self):
+        """Replace both workers and the ring, e.g. after a hang or crash"""
+        with self.lock:
+            self.stop()
+            self._start()
+
+    def stop(self):
+        """Stop the workers and free the shared memory"""
+        with self.lock:
+            if self.processes:
+                self._stop()
+
+    def _stop(self):
+        """stop() body, called with the lock held"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+        self.results.close()
+        self.ring.close()
+        self.ring.shm.unlink()
+        self.ring = None
+        self.logger.info("Frame pipeline stopped")
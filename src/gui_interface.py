@@ -6,35 +6,80 @@ GUI Interface for Map Display with Sector Overlays
 import tkinter as tk
 from tkinter import ttk
 import logging
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import keyboard
+from PIL import ImageTk
 import math
 
+from map_renderer import MapRenderer, MapSource
+from map_tiles import TileCache, visible_tiles
+from metrics import registry
+from startup_profile import profiler
+
+
+# Zoom factor per mouse-wheel notch
+ZOOM_STEP = 2 ** 0.25
+# Zoom in to at least this, or to twice the source resolution if larger
+MIN_MAX_ZOOM = 4.0
+# Quiet time after the last resize event before the view re-renders
+RESIZE_DEBOUNCE_MS = 150
+
 
 class MapGUI:
     """GUI for displaying maps with clickable sectors"""
 
-    def __init__(self, map_image_path, map_name, sector_mode="clock", tts_handler=None):
+    def __init__(self, map_image_path, map_name, sector_mode="clock", tts_handler=None,
+                 map_image=None, on_callout=None, open_image=None, loader=None,
+                 sector_layout=None, open_preview=None, pyramid_cache=None,
+                 open_detail=None):
         self.logger = logging.getLogger(__name__)
-        self.map_image_path = map_image_path
+        self.source = MapSource(map_image_path, map_image, open_image, open_preview,
+                                open_detail)
+        # Executor that decodes and renders the map off the Tk thread; without
+        # one the map is loaded synchronously
+        self.loader = loader
+        # TileCache of tile pyramids by image path, shared across map windows
+        # and only used from the thread that loads maps
+        self.pyramid_cache = pyramid_cache
         self.map_name = map_name
-        self.sector_mode = sector_mode  # "clock" or "numpad"
+        self.sector_mode = sector_mode  # "clock", "numpad" or "custom"
+        # The map's own sectors for "custom", from MapManager.get_sector_layout
+        self.sector_layout = sector_layout or []
+        self.sector_names = {entry['number']: entry['name']
+                             for entry in self.sector_layout}
         self.tts_handler = tts_handler
+        self.on_callout = on_callout  # Called with (map_name, sector) after a local callout
 
         # GUI components
         self.window = None
         self.canvas = None
         self.image_tk = None
-        self.sectors = []
+        self.image_item = None  # Preview shown while the map loads
+
+        # Zoom and pan: the view's top-left corner in display pixels, which
+        # are base-view pixels times the zoom
+        self.pyramid = None
+        # Whether the source's detail image was requested, see load_detail()
+        self.detail_requested = False
+        self.tile_cache = TileCache()
+        self.tile_items = {}  # (column, row) -> canvas item
+        self.tile_photos = {}  # (column, row) -> PhotoImage on screen
+        self.zoom_step = 0
+        self.max_zoom_step = 0
+        self.view_x = 0
+        self.view_y = 0
+        self.pan_anchor = None
+        self.refresh_job = None
+        self.resize_job = None
 
         # Visual feedback state
         self.last_selected_sector = None
-        self.base_image = None  # Store the base image without selections
 
-        # Settings
+        # Settings; the canvas size follows the window, sectors scale with it
         self.canvas_width = 800
         self.canvas_height = 600
-        self.sector_alpha = 100  # Transparency for sector overlays
+        self.min_canvas_size = (320, 240)
+        self.preview_reduction = 4  # Preview is decoded at 1/4 size
+        # Sectors and tile rendering for the current canvas size
+        self.renderer = MapRenderer(sector_mode, self.sector_layout, self.base_size)
 
         self.setup_gui()
         self.setup_keyboard_bindings()
@@ -45,6 +90,8 @@ class MapGUI:
         self.window.title(f"DbD Map: {self.map_name}")
         self.window.geometry(
             f"{self.canvas_width + 50}x{self.canvas_height + 100}")
+        self.window.minsize(self.min_canvas_size[0] + 50,
+                            self.min_canvas_size[1] + 100)
 
         # Main frame
         main_frame = ttk.Frame(self.window, padding="10")
@@ -55,25 +102,29 @@ class MapGUI:
                                 font=("Arial", 14, "bold"))
         title_label.grid(row=0, column=0, pady=(0, 10))
 
-        # Canvas for map image
+        # Canvas for map image, stretched with the window
         self.canvas = tk.Canvas(main_frame, width=self.canvas_width,
-                                height=self.canvas_height, bg='black')
-        self.canvas.grid(row=1, column=0)
+                                height=self.canvas_height, bg='black',
+                                highlightthickness=0)
+        self.canvas.grid(row=1, column=0, sticky="nsew")
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
 
         # Info frame
         info_frame = ttk.Frame(main_frame)
         info_frame.grid(row=2, column=0, pady=(10, 0), sticky="ew")
 
-        mode_text = "12-Hour Clock" if self.sector_mode == "clock" else "9-Zone Numpad"
-        ttk.Label(info_frame, text=f"Mode: {mode_text}").grid(
-            row=0, column=0, sticky="w")
-
         if self.sector_mode == "clock":
-            ttk.Label(
-                info_frame, text="Keys: F1-F12 or click sectors").grid(row=1, column=0, sticky="w")
+            mode_text, keys_text = "12-Hour Clock", "F1-F12"
+        elif self.sector_mode == "custom":
+            mode_text = f"Map Layout ({len(self.sector_layout)} sectors)"
+            keys_text = "sector hotkeys"
         else:
-            ttk.Label(
-                info_frame, text="Keys: 1-9 or click sectors").grid(row=1, column=0, sticky="w")
+            mode_text, keys_text = "9-Zone Numpad", "1-9"
+        ttk.Label(info_frame, text=f"Mode: {mode_text}").grid(
+            row=0, column=0, sticky="w")
+        ttk.Label(
+            info_frame, text=f"Keys: {keys_text} or click sectors - wheel: zoom, "
+                             "right-drag: pan").grid(row=1, column=0, sticky="w")
 
         # Last callout display
         self.last_callout_var = tk.StringVar(value="Ready for callouts...")
@@ -84,251 +135,344 @@ class MapGUI:
         self.window.columnconfigure(0, weight=1)
         self.window.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(1, weight=1)
 
-        self.load_and_display_map()
+        if self.loader:
+            self.start_loading()
+        else:
+            self.load_and_display_map()
 
     def load_and_display_map(self):
         """Load map image and create sector overlays"""
         try:
-            # Load and resize image
-            image = Image.open(self.map_image_path)
-            image = image.resize(
-                (self.canvas_width, self.canvas_height), Image.Resampling.LANCZOS)
-
-            # Store base image for refreshing
-            self.base_image = image.copy()
-
-            # Create overlay with sectors
-            overlay_image = self.create_sector_overlay(image)
-
-            # Convert to Tkinter format
-            self.image_tk = ImageTk.PhotoImage(overlay_image)
-
-            # Display on canvas
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.image_tk)
-
-            # Bind click events
-            self.canvas.bind("<Button-1>", self.on_canvas_click)
-
-            self.logger.info("Map loaded and displayed: %s", self.map_name)
-
+            pyramid, tiles = self.renderer.prepare_map(
+                self.source, pyramids=self.pyramid_cache)
+            self.display_map(pyramid, tiles, self.renderer)
         except Exception as e:
             self.logger.error("Error loading map image: %s", e)
             self.show_error_message()
 
-    def create_sector_overlay(self, base_image, selected_sector=None):
-        """Create sector overlay on the map image"""
-        # Create a copy for drawing
-        overlay = base_image.copy()
-        draw = ImageDraw.Draw(overlay, 'RGBA')
-
-        # Try to load font
+    def start_loading(self):
+        """Decode and render on the loader; show progress on the canvas"""
+        self.canvas.create_text(self.canvas_width // 2, self.canvas_height // 2,
+                                text="Loading map...", fill='white',
+                                font=("Arial", 16), tags=("loading",))
+        self.loader.submit(self.load_in_background, self.base_size,
+                           self.preview_reduction)
+
+    def load_in_background(self, base_size, preview_reduction):
+        """Loader thread: render, then hand the images to the Tk thread
+
+        Everything is built into locals for the view size snapshotted when
+        the load started, with a renderer of its own; the Tk thread's
+        state is only touched through post().
+        """
+        if self.window is None:
+            return  # Closed before the load started
         try:
-            font = ImageFont.truetype("arial.ttf", 24)
-            small_font = ImageFont.truetype("arial.ttf", 16)
-        except OSError:
-            font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
+            renderer = MapRenderer(self.sector_mode, self.sector_layout, base_size)
+            pyramid, tiles = renderer.prepare_map(
+                self.source,
+                on_preview=lambda preview: self.post(self.display_preview, preview),
+                preview_reduction=preview_reduction, pyramids=self.pyramid_cache)
+            self.post(self.display_map, pyramid, tiles, renderer)
+        except Exception as e:
+            self.logger.error("Error loading map image: %s", e)
+            self.post(self.show_error_message)
+
+    def load_detail(self):
+        """Decode the detail image once the zoom goes past the pyramid's
+
+        Runs on the loader when there is one; the sharper pyramid is
+        handed to the Tk thread like a fresh load.
+        """
+        if (self.detail_requested or self.source.open_detail is None
+                or self.zoom <= self.pyramid.native_zoom(self.base_size)):
+            return
+        self.detail_requested = True
+        if self.loader:
+            self.loader.submit(self.load_detail_in_background, self.pyramid)
+        else:
+            self.load_detail_in_background(self.pyramid, post=False)
 
-        if self.sector_mode == "clock":
-            self.create_clock_sectors(draw, font, selected_sector)
+    def load_detail_in_background(self, pyramid, post=True):
+        """Loader thread: build the detail pyramid and hand it to Tk"""
+        if self.window is None:
+            return
+        try:
+            detail = self.renderer.build_detail_pyramid(
+                self.source, pyramid, self.pyramid_cache)
+        except Exception as e:
+            self.logger.error("Error loading map detail: %s", e)
+            return
+        if detail is None:
+            return
+        if post:
+            self.post(self.display_detail, detail)
+        else:
+            self.display_detail(detail)
+
+    def display_detail(self, pyramid):
+        """Swap in the sharper pyramid and render the view from it again"""
+        self.pyramid = pyramid
+        self.tile_cache.clear()
+        self.update_max_zoom()
+        self.refresh_view()
+
+    def post(self, callback, *args):
+        """Run a callback on the Tk thread unless the window has closed"""
+        window = self.window
+        if window is None:
+            return
+        try:
+            window.after(0, lambda: self.window and callback(*args))
+        except (RuntimeError, tk.TclError):
+            pass  # Window destroyed meanwhile
+
+    def show_canvas_image(self, image):
+        """Put a PIL image on the canvas, reusing the canvas image item"""
+        self.image_tk = ImageTk.PhotoImage(image)
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(
+                0, 0, anchor=tk.NW, image=self.image_tk)
         else:
-            self.create_numpad_sectors(draw, font, selected_sector)
-
-        return overlay
-
-    def create_clock_sectors(self, draw, font, selected_sector=None):
-        """Create 12-hour clock style sectors"""
-        center_x = self.canvas_width // 2
-        center_y = self.canvas_height // 2
-        radius = min(center_x, center_y) - 50
-
-        self.sectors = []
-
-        for i in range(12):
-            # Calculate angle (12 o'clock = 0 degrees, clockwise)
-            angle = (i * 30) - 90  # Start at 12 o'clock
-            angle_rad = math.radians(angle)
-
-            # Calculate sector boundaries
-            next_angle_rad = math.radians(angle + 30)
-
-            # Create sector points (triangle from center)
-            points = [
-                center_x, center_y,  # Center point
-                center_x + radius *
-                math.cos(angle_rad), center_y + radius * math.sin(angle_rad),
-                center_x + radius *
-                math.cos(next_angle_rad), center_y +
-                radius * math.sin(next_angle_rad)
-            ]
-
-            # Determine sector color based on selection
-            sector_num = 12 if i == 0 else i
-            is_selected = selected_sector == sector_num
-
-            if is_selected:
-                # Red color for selected sector
-                outline_color = 'red'
-                # More visible
-                fill_color = (255, 0, 0, self.sector_alpha + 50)
-                text_fill = 'white'
+            self.canvas.itemconfig(self.image_item, image=self.image_tk)
+        self.canvas.tag_raise("loading")
+
+    def display_preview(self, preview):
+        """Show the low-resolution preview until the map is ready"""
+        if self.pyramid is None:
+            self.show_canvas_image(preview)
+
+    def display_map(self, pyramid, tiles, renderer):
+        """Show the full-quality map and enable clicks, zoom and pan
+
+        renderer is the one that rendered the tiles; its caches are kept,
+        resized if the canvas changed size while the map loaded.
+        """
+        self.pyramid = pyramid
+        self.renderer = (renderer if renderer.base_size == self.base_size
+                         else renderer.resized(self.base_size))
+        self.update_max_zoom()
+
+        for key, tile in tiles.items():
+            self.tile_cache.put(key, ImageTk.PhotoImage(tile))
+
+        self.canvas.delete("loading")
+        if self.image_item is not None:
+            self.canvas.delete(self.image_item)
+            self.image_item = self.image_tk = None
+
+        # Also highlights a callout made while loading
+        self.refresh_view()
+
+        # Bind click, zoom and pan events
+        self.canvas.bind("<Button-1>", self.on_canvas_click)
+        for button in ("2", "3"):
+            self.canvas.bind(f"<ButtonPress-{button}>", self.on_pan_start)
+            self.canvas.bind(f"<B{button}-Motion>", self.on_pan_drag)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self.on_mouse_wheel)
+
+        self.logger.info("Map loaded and displayed: %s", self.map_name)
+
+    @property
+    def zoom(self):
+        """Display pixels per base-view pixel"""
+        return ZOOM_STEP ** self.zoom_step
+
+    @property
+    def base_size(self):
+        """Size of the map fitted to the canvas, i.e. at zoom 1"""
+        return (self.canvas_width, self.canvas_height)
+
+    def update_max_zoom(self):
+        """Zoom limit for the current map and canvas size"""
+        max_zoom = max(MIN_MAX_ZOOM, self.pyramid.native_zoom(self.base_size) * 2)
+        self.max_zoom_step = int(math.log(max_zoom) / math.log(ZOOM_STEP))
+        self.zoom_step = min(self.zoom_step, self.max_zoom_step)
+
+    def tile_key(self, column, row, box):
+        """Cache key of a tile; only tiles showing the selection depend on it
+
+        Keys include the view size, so switching back to a window size
+        seen before reuses its tiles instead of rendering them again.
+        """
+        selected = self.last_selected_sector
+        if selected is not None and not self.renderer.sector_in_box(
+                selected, box, self.zoom):
+            selected = None
+        return (self.base_size, self.zoom_step, column, row, selected)
+
+    def refresh_view(self):
+        """Place the visible tiles, rendering and uploading only new ones"""
+        self.refresh_job = None
+        if self.pyramid is None:
+            return
+
+        zoom = self.zoom
+        view = (self.view_x, self.view_y,
+                self.view_x + self.canvas_width, self.view_y + self.canvas_height)
+        items, photos = {}, {}
+        extent = self.pyramid.extent(self.base_size, zoom)
+        for column, row, box in visible_tiles(view, extent):
+            key = self.tile_key(column, row, box)
+            photo = self.tile_cache.get(key)
+            if photo is None:
+                photo = ImageTk.PhotoImage(
+                    self.renderer.render_tile(self.pyramid, zoom, box, key[-1]))
+                self.tile_cache.put(key, photo)
+
+            x, y = box[0] - self.view_x, box[1] - self.view_y
+            item = self.tile_items.pop((column, row), None)
+            if item is None:
+                item = self.canvas.create_image(x, y, anchor=tk.NW, image=photo,
+                                                tags=("tile",))
             else:
-                # Default yellow color
-                outline_color = 'yellow'
-                fill_color = (255, 255, 0, self.sector_alpha)
-                text_fill = 'white'
-
-            # Draw sector outline
-            draw.polygon(points, outline=outline_color,
-                         width=3, fill=fill_color)
-
-            # Calculate text position
-            text_angle_rad = math.radians(angle + 15)  # Middle of sector
-            text_radius = radius * 0.7
-            text_x = center_x + text_radius * math.cos(text_angle_rad)
-            text_y = center_y + text_radius * math.sin(text_angle_rad)
-
-            # Draw sector number
-            sector_num = 12 if i == 0 else i
-            bbox = draw.textbbox((0, 0), str(sector_num), font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            draw.text((text_x - text_width//2, text_y - text_height//2),
-                      str(sector_num), fill=text_fill, font=font, stroke_width=1, stroke_fill='black')
-
-            # Store sector info
-            self.sectors.append({
-                'number': sector_num,
-                'points': points,
-                'center': (text_x, text_y),
-                'hotkey': f'F{sector_num}'
-            })
-
-    def create_numpad_sectors(self, draw, font, selected_sector=None):
-        """Create 9-zone numpad style sectors"""
-        sector_width = self.canvas_width // 3
-        sector_height = self.canvas_height // 3
-
-        self.sectors = []
-
-        # Numpad layout (7-8-9 top row, 4-5-6 middle, 1-2-3 bottom)
-        numpad_layout = [
-            [7, 8, 9],
-            [4, 5, 6],
-            [1, 2, 3]
-        ]
-
-        for row in range(3):
-            for col in range(3):
-                sector_num = numpad_layout[row][col]
-
-                # Calculate sector boundaries
-                x1 = col * sector_width
-                y1 = row * sector_height
-                x2 = x1 + sector_width
-                y2 = y1 + sector_height
-
-                # Determine sector color based on selection
-                is_selected = selected_sector == sector_num
-
-                if is_selected:
-                    # Red color for selected sector
-                    outline_color = 'red'
-                    # More visible
-                    fill_color = (255, 0, 0, self.sector_alpha + 50)
-                    text_fill = 'white'
-                else:
-                    # Default yellow color
-                    outline_color = 'yellow'
-                    fill_color = (255, 255, 0, self.sector_alpha)
-                    text_fill = 'white'
-
-                # Draw sector outline
-                draw.rectangle([x1, y1, x2, y2], outline=outline_color, width=3,
-                               fill=fill_color)
-
-                # Calculate text position (center of sector)
-                text_x = x1 + sector_width // 2
-                text_y = y1 + sector_height // 2
-
-                # Draw sector number
-                bbox = draw.textbbox((0, 0), str(sector_num), font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-                draw.text((text_x - text_width//2, text_y - text_height//2),
-                          str(sector_num), fill=text_fill, font=font, stroke_width=2, stroke_fill='black')
-
-                # Store sector info
-                self.sectors.append({
-                    'number': sector_num,
-                    'bounds': (x1, y1, x2, y2),
-                    'center': (text_x, text_y),
-                    'hotkey': str(sector_num)
-                })
+                self.canvas.coords(item, x, y)
+                self.canvas.itemconfig(item, image=photo)
+            items[(column, row)] = item
+            # Evicted tiles stay alive while on screen
+            photos[(column, row)] = photo
+
+        for item in self.tile_items.values():
+            self.canvas.delete(item)
+        self.tile_items, self.tile_photos = items, photos
+
+    def schedule_refresh(self):
+        """Refresh once the pending events are handled
+
+        Bursts of wheel and drag events then cost one refresh.
+        """
+        if self.refresh_job is None:
+            self.refresh_job = self.canvas.after_idle(self.refresh_view)
+
+    def clamp_view(self, x, y):
+        """View position limited to the map's extent at the current zoom"""
+        width, height = self.pyramid.extent(self.base_size, self.zoom)
+        return (max(0, min(round(x), width - self.canvas_width)),
+                max(0, min(round(y), height - self.canvas_height)))
+
+    def to_base(self, x, y):
+        """Canvas position -> base-view coordinates used by the sectors"""
+        zoom = self.zoom
+        return (x + self.view_x) / zoom, (y + self.view_y) / zoom
+
+    def on_canvas_configure(self, event):
+        """Track the canvas size; re-render once a resize drag settles"""
+        size = (max(event.width, self.min_canvas_size[0]),
+                max(event.height, self.min_canvas_size[1]))
+        if self.resize_job is not None:
+            self.canvas.after_cancel(self.resize_job)
+            self.resize_job = None
+        if size != self.base_size:
+            self.resize_job = self.canvas.after(
+                RESIZE_DEBOUNCE_MS, self.apply_canvas_size, *size)
+
+    def apply_canvas_size(self, width, height):
+        """Rescale sectors and view to a new canvas size and re-render"""
+        self.resize_job = None
+        # The map point at the view centre stays there
+        center_x, center_y = self.to_base(self.canvas_width / 2, self.canvas_height / 2)
+        scale_x = width / self.canvas_width
+        scale_y = height / self.canvas_height
+
+        self.canvas_width, self.canvas_height = width, height
+        self.renderer = self.renderer.resized(self.base_size)
+        if self.pyramid is None:
+            return
+
+        self.update_max_zoom()
+        zoom = self.zoom
+        self.view_x, self.view_y = self.clamp_view(
+            center_x * scale_x * zoom - width / 2,
+            center_y * scale_y * zoom - height / 2)
+        self.refresh_view()
+
+    def on_pan_start(self, event):
+        self.pan_anchor = (event.x, event.y)
+
+    def on_pan_drag(self, event):
+        """Move the tiles with the pointer; new tiles follow when idle"""
+        if self.pan_anchor is None:
+            return
+        view_x, view_y = self.clamp_view(
+            self.view_x - (event.x - self.pan_anchor[0]),
+            self.view_y - (event.y - self.pan_anchor[1]))
+        self.pan_anchor = (event.x, event.y)
+
+        if (view_x, view_y) != (self.view_x, self.view_y):
+            self.canvas.move("tile", self.view_x - view_x, self.view_y - view_y)
+            self.view_x, self.view_y = view_x, view_y
+            self.schedule_refresh()
+
+    def on_mouse_wheel(self, event):
+        """Zoom one step in or out around the pointer"""
+        step = 1 if event.num == 4 or getattr(event, "delta", 0) > 0 else -1
+        self.zoom_at(self.zoom_step + step, event.x, event.y)
+
+    def zoom_at(self, zoom_step, x, y):
+        """Change the zoom step, keeping the map point under (x, y) in place"""
+        zoom_step = max(0, min(zoom_step, self.max_zoom_step))
+        if self.pyramid is None or zoom_step == self.zoom_step:
+            return
+
+        base_x, base_y = self.to_base(x, y)
+        self.zoom_step = zoom_step
+        self.view_x, self.view_y = self.clamp_view(
+            base_x * self.zoom - x, base_y * self.zoom - y)
+        self.load_detail()
+        self.schedule_refresh()
 
     def on_canvas_click(self, event):
         """Handle mouse clicks on canvas"""
-        x, y = event.x, event.y
-        clicked_sector = self.get_sector_at_position(x, y)
+        x, y = self.to_base(event.x, event.y)
+        clicked_sector = self.renderer.get_sector_at_position(x, y)
 
         if clicked_sector:
             self.make_callout(clicked_sector['number'])
 
-    def get_sector_at_position(self, x, y):
-        """Determine which sector was clicked"""
-        for sector in self.sectors:
-            if self.sector_mode == "clock":
-                # For clock sectors, check if point is in triangle
-                if self.point_in_triangle(x, y, sector['points']):
-                    return sector
-            else:
-                # For numpad sectors, check if point is in rectangle
-                bounds = sector['bounds']
-                if bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3]:
-                    return sector
-        return None
-
-    def point_in_triangle(self, x, y, triangle_points):
-        """Check if point is inside triangle using barycentric coordinates"""
-        # Triangle points: [x1, y1, x2, y2, x3, y3]
-        x1, y1, x2, y2, x3, y3 = triangle_points
-
-        # Calculate area of triangle
-        area = abs((x1 * (y2 - y3) + x2 * (y3 - y1) + x3 * (y1 - y2)) / 2.0)
-
-        # Calculate areas of sub-triangles
-        area1 = abs((x * (y2 - y3) + x2 * (y3 - y) + x3 * (y - y2)) / 2.0)
-        area2 = abs((x1 * (y - y3) + x * (y3 - y1) + x3 * (y1 - y)) / 2.0)
-        area3 = abs((x1 * (y2 - y) + x2 * (y - y1) + x * (y1 - y2)) / 2.0)
-
-        # Check if sum of areas equals original area (with small tolerance)
-        return abs(area - (area1 + area2 + area3)) < 1
-
     def setup_keyboard_bindings(self):
         """Setup global keyboard shortcuts"""
         try:
+            import keyboard
+
             if self.sector_mode == "clock":
                 # F1-F12 for clock mode
                 for i in range(1, 13):
                     keyboard.add_hotkey(
-                        f'f{i}', lambda sector=i: self.make_callout(sector))
+                        f'f{i}', lambda sector=i: self.on_hotkey(sector))
+            elif self.sector_mode == "custom":
+                # The layout's hotkeys, F1-F12 for sectors 1-12 by default
+                for entry in self.sector_layout:
+                    if entry['hotkey']:
+                        keyboard.add_hotkey(
+                            entry['hotkey'],
+                            lambda sector=entry['number']: self.on_hotkey(sector))
             else:
                 # 1-9 for numpad mode
                 for i in range(1, 10):
                     keyboard.add_hotkey(
-                        f'{i}', lambda sector=i: self.make_callout(sector))
+                        f'{i}', lambda sector=i: self.on_hotkey(sector))
 
         except Exception as e:
             self.logger.warning("Could not setup global hotkeys: %s", e)
 
+    @registry.timed("gui.hotkey_dispatch")
+    def on_hotkey(self, sector_number):
+        """Handle a global hotkey press"""
+        registry.counter("gui.hotkeys").inc()
+        self.make_callout(sector_number)
+
     def make_callout(self, sector_number):
         """Make a callout for the specified sector"""
         try:
             # Update visual feedback first
             self.update_sector_selection(sector_number)
 
-            callout_text = f"Sector {sector_number}"
+            callout_text = self.sector_names.get(sector_number,
+                                                 f"Sector {sector_number}")
             self.last_callout_var.set(f"Last callout: {callout_text}")
 
             # Text-to-speech if available
@@ -336,12 +480,31 @@ class MapGUI:
                 self.tts_handler.speak(callout_text)
 
             self.logger.info("Callout made: %s", callout_text)
+            profiler.mark("first_callout")
+
+            if self.on_callout:
+                self.on_callout(self.map_name, sector_number)
 
         except Exception as e:
             self.logger.error("Error making callout: %s", e)
 
+    def show_remote_callout(self, sector_number, callout_type="sector"):
+        """Highlight and speak a callout relayed from a teammate"""
+        try:
+            self.update_sector_selection(sector_number)
+            place = self.sector_names.get(sector_number, sector_number)
+            self.last_callout_var.set(
+                f"Teammate callout: {callout_type} {place}")
+
+            if self.tts_handler:
+                self.tts_handler.speak_callout(place, callout_type)
+
+        except Exception as e:
+            self.logger.error("Error showing teammate callout: %s", e)
+
     def show_error_message(self):
         """Show error message when map cannot be loaded"""
+        self.canvas.delete("loading")
         self.canvas.create_text(self.canvas_width//2, self.canvas_height//2,
                                 text="Error loading map image\\nCheck logs for details",
                                 fill='red', font=("Arial", 16), justify=tk.CENTER)
@@ -357,6 +520,7 @@ class MapGUI:
         """Close the map window"""
         try:
             # Remove keyboard bindings
+            import keyboard
             keyboard.unhook_all()
         except:
             pass
@@ -364,18 +528,14 @@ class MapGUI:
         if self.window:
             self.window.destroy()
             self.window = None
+        self.tile_cache.clear()
+        self.renderer.layer_cache.clear()
+        self.tile_photos = {}
 
     def update_sector_selection(self, sector_number):
         """Update visual feedback to show selected sector in red"""
-        if self.base_image:
-            # Store the selected sector
-            self.last_selected_sector = sector_number
-
-            # Recreate the overlay with the selected sector highlighted
-            overlay_image = self.create_sector_overlay(
-                self.base_image, sector_number)
-
-            # Update the display
-            self.image_tk = ImageTk.PhotoImage(overlay_image)
-            self.canvas.delete("all")  # Clear previous image
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.image_tk)
+        # Store the selected sector, also while loading (shown once loaded)
+        self.last_selected_sector = sector_number
+        if self.pyramid:
+            # Only tiles showing the old or new selection are rendered again
+            self.refresh_view()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Lexicon-constrained decoding of OCR symbol alternatives
+
+Tesseract's hOCR output with lstm_choice_mode=2 lists, for every recognized
+symbol, its alternative characters with confidences.  Instead of matching
+the top-1 string afterwards, a beam search walks a trie of the known map
+names over those alternatives, so a name is recovered even when several
+top-1 characters are wrong.  Misread, extra and missing symbols are
+scored as substitutions, deletions and insertions; text before and after
+the name is skipped at a small cost.
+"""
+
+import math
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+
+CONFIDENCE_PATTERN = re.compile(r"x_w?confs?\s+([\d.]+)")
+
+# Glyphs Tesseract commonly confuses, offered as weaker extra alternatives
+CONFUSIONS = {
+    "0": "o", "o": "0", "1": "il", "l": "1i", "i": "l1", "3": "e",
+    "4": "a", "5": "s", "s": "5", "6": "g", "7": "t", "8": "b", "b": "8",
+    "9": "g", "g": "9", "u": "v", "v": "u", "c": "e", "e": "c"
+}
+CONFUSION_WEIGHT = 0.5
+
+
+def fold_char(char):
+    """Lowercase alphanumeric form of a character, or "" ("É" -> "e")"""
+    decomposed = unicodedata.normalize('NFKD', char.lower())
+    return "".join(c for c in decomposed
+                   if not unicodedata.combining(c) and c.isalnum())
+
+
+def fold_key(text):
+    """Lexicon key of a name: folded alphanumerics only ("Léry's" -> "lerys")"""
+    return "".join(fold_char(char) for char in text)
+
+
+def _confidence(title, default=90.0):
+    match = CONFIDENCE_PATTERN.search(title or "")
+    return float(match.group(1)) if match else default
+
+
+class _HocrChoiceParser(HTMLParser):
+    """Collects per-symbol alternatives from Tesseract hOCR
+
+    Symbols come from ocr_symbol spans with ocrx_cinfo choices
+    (lstm_choice_mode=2); without them each ocrx_cinfo, or failing that
+    each character of an ocrx_word, is a single-choice symbol.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.words = []
+        self.stack = []
+        self.word = None
+        self.symbol = None
+        self.cinfo = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        css_class = attrs.get("class", "")
+        self.stack.append(css_class)
+
+        if css_class == "ocrx_word":
+            self.word = {"text": "", "confidence": _confidence(attrs.get("title")),
+                         "symbols": [], "cinfo": []}
+        elif css_class == "ocr_symbol" and self.word is not None:
+            self.symbol = []
+        elif css_class == "ocrx_cinfo" and self.word is not None:
+            self.cinfo = ["", _confidence(attrs.get("title"))]
+
+    def handle_endtag(self, tag):
+        css_class = self.stack.pop() if self.stack else ""
+
+        if css_class == "ocrx_cinfo" and self.cinfo is not None:
+            choice = tuple(self.cinfo)
+            if self.symbol is not None:
+                self.symbol.append(choice)
+            else:
+                self.word["cinfo"].append(choice)
+            self.cinfo = None
+        elif css_class == "ocr_symbol" and self.symbol is not None:
+            if self.symbol:
+                self.word["symbols"].append(self.symbol)
+            self.symbol = None
+        elif css_class == "ocrx_word" and self.word is not None:
+            self.words.append(self.word)
+            self.word = None
+
+    def handle_data(self, data):
+        if self.cinfo is not None:
+            self.cinfo[0] += data.strip()
+        elif self.word is not None and self.symbol is None:
+            self.word["text"] += data.strip()
+
+
+def parse_hocr_choices(hocr):
+    """(top-1 text, symbol positions) from hOCR bytes or text
+
+    Each position is a list of (char, probability) alternatives.
+    """
+    if isinstance(hocr, bytes):
+        hocr = hocr.decode('utf-8', errors='replace')
+
+    parser = _HocrChoiceParser()
+    parser.feed(hocr)
+
+    texts = []
+    positions = []
+    for word in parser.words:
+        if word["symbols"]:
+            symbols = word["symbols"]
+        elif word["cinfo"]:
+            symbols = [[choice] for choice in word["cinfo"]]
+        else:
+            symbols = [[(char, word["confidence"])] for char in word["text"]]
+
+        texts.append(word["text"] or "".join(symbol[0][0] for symbol in symbols))
+        positions.extend([(char, confidence / 100) for char, confidence in symbol]
+                         for symbol in symbols)
+
+    return " ".join(texts), positions
+
+
+def positions_from_text(text, probability=0.9):
+    """Single-choice positions for plain top-1 text"""
+    return [[(char, probability)] for char in text if not char.isspace()]
+
+
+class _TrieNode:
+    __slots__ = ("children", "value", "min_remaining")
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+        self.min_remaining = 0
+
+
+class LexiconDecoder:
+    """Beam search over symbol alternatives, constrained to a name trie"""
+
+    def __init__(self, entries=None, beam_width=64, substitute_prob=0.02,
+                 delete_prob=0.05, insert_prob=0.05, skip_prob=0.3,
+                 min_confidence=0.35):
+        self.beam_width = beam_width
+        self.substitute_cost = math.log(substitute_prob)
+        self.delete_cost = math.log(delete_prob)
+        self.insert_cost = math.log(insert_prob)
+        self.skip_cost = math.log(skip_prob)
+        self.min_confidence = min_confidence
+        self.set_entries(entries or {})
+
+    def set_entries(self, entries):
+        """Rebuild the trie from a {spelling: map name} dict"""
+        self.root = _TrieNode()
+        for spelling, value in entries.items():
+            key = fold_key(spelling)
+            if not key:
+                continue
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+            node.value = value
+        self._compute_remaining(self.root)
+
+    def _compute_remaining(self, node):
+        """Fewest characters from each node to a complete name"""
+        if node.value is not None:
+            node.min_remaining = 0
+        else:
+            node.min_remaining = math.inf
+        for child in node.children.values():
+            self._compute_remaining(child)
+            node.min_remaining = min(node.min_remaining, child.min_remaining + 1)
+
+    def decode(self, positions):
+        """Best (map name, confidence) for the positions, or (None, 0.0)"""
+        observed = []
+        for alternatives in positions:
+            folded = {}
+            for char, probability in alternatives:
+                char = fold_char(char)[:1]
+                if char:
+                    folded[char] = max(folded.get(char, 0.0), min(probability, 1.0))
+            for char, probability in list(folded.items()):
+                for similar in CONFUSIONS.get(char, ""):
+                    folded.setdefault(similar, probability * CONFUSION_WEIGHT)
+            if folded:
+                observed.append(folded)
+        if not observed or not self.root.children:
+            return None, 0.0
+
+        root = self.root
+        # node -> score for names in progress; value -> score for finished ones
+        beam = {root: 0.0}
+        finished = {}
+
+        for alternatives in observed:
+            candidates = {}
+
+            def add(node, score):
+                if score > candidates.get(node, -math.inf):
+                    candidates[node] = score
+
+            for node, score in beam.items():
+                # Before a name starts, symbols are skipped text
+                add(node, score + (self.skip_cost if node is root else self.delete_cost))
+                for char, child in node.children.items():
+                    probability = alternatives.get(char)
+                    add(child, score + (math.log(probability) if probability
+                                        else self.substitute_cost))
+
+            # One missed symbol per step: move on without consuming
+            for node, score in list(candidates.items()):
+                for child in node.children.values():
+                    add(child, score + self.insert_cost)
+
+            # Text after a finished name is skipped as well
+            finished = {value: score + self.skip_cost for value, score in finished.items()}
+            for node, score in candidates.items():
+                if node.value is not None and score > finished.get(node.value, -math.inf):
+                    finished[node.value] = score
+
+            best = sorted(candidates.items(), key=lambda item: item[1], reverse=True)
+            beam = dict(best[:self.beam_width])
+            beam.setdefault(root, candidates[root])
+
+        # Names cut short count their missing characters as insertions
+        for node, score in beam.items():
+            if node is not root and node.min_remaining < math.inf:
+                value = self._complete(node)
+                score += node.min_remaining * self.insert_cost
+                if score > finished.get(value, -math.inf):
+                    finished[value] = score
+
+        if not finished:
+            return None, 0.0
+        value, score = max(finished.items(), key=lambda item: item[1])
+        confidence = math.exp(score / len(observed))
+        if confidence < self.min_confidence:
+            return None, confidence
+        return value, confidence
+
+    @staticmethod
+    def _complete(node):
+        """Nearest complete name below a node"""
+        while node.value is None:
+            node = min(node.children.values(), key=lambda child: child.min_remaining)
+        return node.value
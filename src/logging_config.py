@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Non-blocking logging setup: queue handler, rotating file and rate limiting
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+# Listener queue and levels of the running setup, handed to worker processes
+_worker_settings = None
+
+
+def create_default_logging_config():
+    """Create default logging configuration"""
+    return {
+        "level": "INFO",
+        "file": "logs/dbd_app.log",
+        "max_bytes": 5 * 1024 * 1024,
+        "backup_count": 3,
+        "json_lines": False,
+        "rate_limit_seconds": 30.0,
+        "module_levels": {
+            # Per-logger overrides, e.g. "ocr_detector": "WARNING"
+        }
+    }
+
+
+def load_logging_config(config_path="config/logging_config.json"):
+    """Load logging configuration, creating the default file if missing"""
+    config_path = Path(config_path)
+    config = create_default_logging_config()
+    try:
+        if config_path.exists():
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+        else:
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2)
+    except Exception as e:
+        print(f"Error loading logging config: {e}", file=sys.stderr)
+    return config
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops repeats of the same message template within a time window
+
+    Records are keyed by logger, level and unformatted message, so an error
+    that fires on every loop iteration with a different argument is still
+    collapsed.  The next record let through reports how many were dropped.
+    At most max_keys templates are tracked; expired ones are pruned first.
+    """
+
+    def __init__(self, interval=30.0, min_level=logging.WARNING, max_keys=512):
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self.max_keys = max_keys
+        self.last_seen = {}  # key -> (last emitted time, suppressed count)
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.min_level or self.interval <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            last_time, suppressed = self.last_seen.get(key, (None, 0))
+            if last_time is not None and now - last_time < self.interval:
+                self.last_seen[key] = (last_time, suppressed + 1)
+                return False
+            self.last_seen[key] = (now, 0)
+            if len(self.last_seen) > self.max_keys:
+                self.prune(now)
+
+        if suppressed:
+            record.msg = f"{record.msg} (suppressed {suppressed} similar messages)"
+        return True
+
+    def prune(self, now):
+        """Forget expired templates, then the oldest ones over max_keys"""
+        self.last_seen = {key: value for key, value in self.last_seen.items()
+                          if now - value[0] < self.interval}
+        while len(self.last_seen) > self.max_keys:
+            del self.last_seen[next(iter(self.last_seen))]
+
+
+def setup_queued_logging(config, console_stream=None):
+    """Route all logging through a queue drained by a background listener
+
+    Returns the started QueueListener; it is also stopped at interpreter
+    exit so buffered records are flushed.  The queue is a multiprocessing
+    one, so worker processes can log into it (see worker_logging_settings()).
+    """
+    global _worker_settings
+    log_path = Path(config["file"])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if config.get("json_lines"):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=config["max_bytes"],
+        backupCount=config["backup_count"], encoding='utf-8')
+    stream_handler = logging.StreamHandler(console_stream or sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = multiprocessing.get_context("spawn").Queue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(config["rate_limit_seconds"]))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config["level"])
+
+    for name, level in config.get("module_levels", {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    _worker_settings = {
+        "queue": log_queue,
+        "level": config["level"],
+        "module_levels": dict(config.get("module_levels", {})),
+        "rate_limit_seconds": config["rate_limit_seconds"]
+    }
+    return listener
+
+
+def worker_logging_settings():
+    """Picklable settings for configure_worker_logging(), or None
+
+    None when queued logging is not set up in this process, in which case
+    workers keep Python's default (warnings to stderr).
+    """
+    return _worker_settings
+
+
+def configure_worker_logging(settings):
+    """Send a worker process's records to the parent's listener queue
+
+    Called first thing in a spawned worker or pool initializer, so its
+    records reach the same log file and console, rate limited the same way.
+    """
+    if settings is None:
+        return
+
+    queue_handler = logging.handlers.QueueHandler(settings["queue"])
+    queue_handler.addFilter(RateLimitFilter(settings["rate_limit_seconds"]))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings["level"])
+
+    for name, level in settings["module_levels"].items():
+        logging.getLogger(name).setLevel(level)
@@ -4,36 +4,111 @@ Map Manager for Dead by Daylight Maps
 """
 
 import logging
-import json
+from contextlib import contextmanager
 from pathlib import Path
 
+from config_store import ConfigStore
+from metrics import registry
+
 
 class MapManager:
     """Manages map images and metadata"""
 
-    def __init__(self, maps_dir="maps", config_path="config/maps_config.json"):
+    def __init__(self, maps_dir="maps", config_path="config/maps_config.json",
+                 storage=None, db_path=None, pack_path=None):
         self.logger = logging.getLogger(__name__)
         self.maps_dir = Path(maps_dir)
         self.config_path = Path(config_path)
+        self.config_store = ConfigStore(self.config_path, self.create_default_maps_config,
+                                        label="maps config")
+        # Called with no arguments whenever maps are added or removed; held
+        # back while a bulk_update() block is open
+        self.change_listeners = []
+        self.bulk_depth = 0
+        self.change_pending = False
         self.maps_config = self.load_maps_config()
 
+        # Optional SQLite registry ("storage": "sqlite" in maps_config.json),
+        # kept next to the config file unless db_path says otherwise
+        self.map_registry = None
+        if (storage or self.maps_config.get("storage", "json")) == "sqlite":
+            self.map_registry = self.open_map_registry(
+                db_path or self.config_path.with_name("maps.db"))
+
+        # Optional packed asset bundle ("map_pack": "maps/maps.dbdpack")
+        self.map_pack = None
+        pack_path = pack_path or self.maps_config.get("map_pack")
+        if pack_path:
+            self.map_pack = self.open_map_pack(pack_path)
+
+        # Maps shipped only in the pack become available as well
+        if self.map_pack:
+            self.add_pack_maps(self.map_pack.metadata.get("maps", {}))
+
         # Ensure maps directory exists
         self.maps_dir.mkdir(parents=True, exist_ok=True)
 
-    def load_maps_config(self):
-        """Load maps configuration"""
+    def add_change_listener(self, callback):
+        """Register a callback run after the set of maps changes"""
+        self.change_listeners.append(callback)
+
+    def notify_maps_changed(self):
+        """Run the change listeners, or defer them to the end of bulk_update()"""
+        if self.bulk_depth:
+            self.change_pending = True
+            return
+
+        for callback in self.change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error("Error in maps change listener: %s", e)
+
+    def get_lexicon_names(self):
+        """Every name a banner can show: map, realm and official names"""
+        names = set()
+        for map_name in self.get_available_maps():
+            info = self.get_map_info(map_name)
+            names.update((map_name, info.get("realm"), info.get("official_name")))
+        names.discard(None)
+        return names
+
+    def add_pack_maps(self, pack_maps):
+        """Register maps from a pack's metadata that are not configured yet"""
+        known = set(self.get_available_maps())
+        missing = {name: info for name, info in pack_maps.items() if name not in known}
+        if not missing:
+            return
+
+        if self.map_registry:
+            self.map_registry.import_maps(missing)
+        else:
+            self.maps_config.setdefault("maps", {}).update(missing)
+        self.logger.info("Added %d maps from map pack", len(missing))
+        self.notify_maps_changed()
+
+    def open_map_pack(self, pack_path):
+        """Open a map pack, or return None if it cannot be read"""
         try:
-            if self.config_path.exists():
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                # Create default config
-                default_config = self.create_default_maps_config()
-                self.save_maps_config(default_config)
-                return default_config
+            from map_pack import MapPack
+
+            return MapPack(pack_path)
         except Exception as e:
-            self.logger.error("Error loading maps config: %s", e)
-            return self.create_default_maps_config()
+            self.logger.error("Error opening map pack %s: %s", pack_path, e)
+            return None
+
+    def open_map_registry(self, db_path):
+        """Open the SQLite registry, importing the JSON maps on first run"""
+        from map_registry import SQLiteMapRegistry
+
+        map_registry = SQLiteMapRegistry(db_path)
+        if map_registry.is_empty():
+            map_registry.import_maps(self.maps_config.get("maps", {}))
+        return map_registry
+
+    def load_maps_config(self):
+        """Load maps configuration (created from defaults if missing)"""
+        return self.config_store.load()
 
     def create_default_maps_config(self):
         """Create default maps configuration"""
@@ -157,27 +232,104 @@ class MapManager:
         }
 
     def save_maps_config(self, config):
-        """Save maps configuration to file"""
+        """Save maps configuration (debounced, written atomically)"""
+        self.config_store.update(config)
+
+    @contextmanager
+    def bulk_update(self):
+        """Context manager batching add_map/remove_map calls into one save
+
+        Changes made inside the block are rolled back if it raises.  Change
+        listeners run once when the outermost block ends, committed or not.
+        """
+        transaction = (self.map_registry.transaction() if self.map_registry
+                       else self.config_store.transaction())
+        self.bulk_depth += 1
         try:
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.logger.error("Error saving maps config: %s", e)
+            with transaction as data:
+                yield data
+        finally:
+            self.bulk_depth -= 1
+            if not self.bulk_depth and self.change_pending:
+                self.change_pending = False
+                self.notify_maps_changed()
+
+    def flush(self):
+        """Write any pending config changes to disk now"""
+        self.config_store.flush()
 
     def get_available_maps(self):
         """Get list of available map names"""
+        if self.map_registry:
+            return self.map_registry.get_available_maps()
         return list(self.maps_config.get("maps", {}).keys())
 
+    def image_available(self, image_path):
+        """Check the map pack index first, then the filesystem"""
+        if self.map_pack and image_path.name in self.map_pack:
+            return True
+        return image_path.exists()
+
+    def open_map_image(self, image_path):
+        """Open a map image path returned by get_map_image as a PIL image
+
+        Packed images come back already resized, without touching disk.
+        """
+        image_path = Path(image_path)
+        if self.map_pack and image_path.name in self.map_pack:
+            with registry.timer("map.pack_load"):
+                return self.map_pack.get_image(image_path.name)
+        return self.open_map_file(image_path)
+
+    def open_full_map_image(self, image_path):
+        """Decode the source file behind a packed image, or None without one
+
+        Packed images are stored at the pack's view size; the map view
+        calls this only once the user zooms in past that resolution.
+        """
+        if not Path(image_path).exists():
+            return None
+        return self.open_map_file(image_path)
+
+    def open_map_file(self, image_path):
+        """Decode a map image file at full resolution"""
+        from PIL import Image
+
+        with registry.timer("map.file_load"):
+            with Image.open(image_path) as image:
+                image.load()
+                return image
+
+    def find_map_image_in_registry(self, map_name):
+        """Resolve a map image through the SQLite registry's indexes"""
+        for name in (self.map_registry.resolve(map_name),
+                     self.map_registry.find_partial(map_name)):
+            if not name:
+                continue
+            filename = self.map_registry.get_map_info(name).get("filename")
+            if filename:
+                image_path = self.maps_dir / filename
+                if self.image_available(image_path):
+                    return str(image_path)
+                self.logger.warning("Map image not found: %s", image_path)
+        return None
+
+    @registry.timed("map.lookup")
     def get_map_image(self, map_name):
         """Get path to map image file"""
-        maps = self.maps_config.get("maps", {})
+        if self.map_registry:
+            image_path = self.find_map_image_in_registry(map_name)
+            if image_path:
+                return image_path
+
+        # Registry lookups above replace the dict scans below
+        maps = {} if self.map_registry else self.maps_config.get("maps", {})
 
         if map_name in maps:
             filename = maps[map_name].get("filename")
             if filename:
                 image_path = self.maps_dir / filename
-                if image_path.exists():
+                if self.image_available(image_path):
                     return str(image_path)
                 else:
                     self.logger.warning("Map image not found: %s", image_path)
@@ -188,26 +340,74 @@ class MapManager:
                 filename = config.get("filename")
                 if filename:
                     image_path = self.maps_dir / filename
-                    if image_path.exists():
+                    if self.image_available(image_path):
                         return str(image_path)
 
         # Return placeholder if enabled
         if self.maps_config.get("placeholders", {}).get("enabled", False):
             placeholder_filename = self.maps_config["placeholders"]["default_image"]
             placeholder_path = self.maps_dir / placeholder_filename
-            if placeholder_path.exists():
+            if self.image_available(placeholder_path):
                 return str(placeholder_path)
 
         self.logger.error("No image found for map: %s", map_name)
         return None
 
     def get_map_info(self, map_name):
-        """Get detailed information about a map"""
-        maps = self.maps_config.get("maps", {})
-        return maps.get(map_name, {})
+        """Get detailed information about a map
+
+        Both backends return filename, realm, official_name and aliases
+        (lowercase, including the image's file stem), plus "sectors" when
+        maps_config.json gives the map a custom layout.
+        """
+        entry = self.maps_config.get("maps", {}).get(map_name, {})
+        if self.map_registry:
+            info = self.map_registry.get_map_info(map_name)
+        elif entry:
+            filename = entry.get("filename")
+            aliases = {alias.lower() for alias in entry.get("aliases", ())}
+            if filename:
+                aliases.add(Path(filename).stem.lower())
+            info = {
+                "filename": filename,
+                "realm": entry.get("realm"),
+                "official_name": entry.get("official_name"),
+                "aliases": sorted(aliases)
+            }
+        else:
+            info = {}
+
+        if info and entry.get("sectors"):
+            info["sectors"] = entry["sectors"]
+        return info
+
+    def get_sector_layout(self, map_name):
+        """A map's custom sectors from maps_config.json, or None
+
+        Layouts are edited by hand in the JSON file, so they are read from
+        it also when the SQLite registry holds the map metadata.
+        """
+        info = self.maps_config.get("maps", {}).get(map_name) or self.get_map_info(map_name)
+        entries = info.get("sectors")
+        if not entries:
+            return None
+
+        from sector_layout import parse_sector_layout
+
+        try:
+            return parse_sector_layout(entries)
+        except ValueError as e:
+            self.logger.error("Ignoring sector layout of %s: %s", map_name, e)
+            return None
 
     def add_map(self, map_name, filename, realm=None, official_name=None):
         """Add a new map to the configuration"""
+        if self.map_registry:
+            self.map_registry.add_map(map_name, filename, realm, official_name)
+            self.logger.info("Added new map: %s", map_name)
+            self.notify_maps_changed()
+            return
+
         maps = self.maps_config.setdefault("maps", {})
         maps[map_name] = {
             "filename": filename,
@@ -216,14 +416,23 @@ class MapManager:
         }
         self.save_maps_config(self.maps_config)
         self.logger.info("Added new map: %s", map_name)
+        self.notify_maps_changed()
 
     def remove_map(self, map_name):
         """Remove a map from the configuration"""
+        if self.map_registry:
+            removed = self.map_registry.remove_map(map_name)
+            if removed:
+                self.logger.info("Removed map: %s", map_name)
+                self.notify_maps_changed()
+            return removed
+
         maps = self.maps_config.get("maps", {})
         if map_name in maps:
             del maps[map_name]
             self.save_maps_config(self.maps_config)
             self.logger.info("Removed map: %s", map_name)
+            self.notify_maps_changed()
             return True
         return False
 
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Packed map asset bundles read through mmap
+
+Layout of a .dbdpack file:
+
+    8 bytes   magic b"DBDPACK1"
+    4 bytes   header length N (little-endian uint32)
+    N bytes   UTF-8 JSON header: {"version", "metadata", "entries"}
+    ...       image blobs; each entry gives its offset (from the end of the
+              header), length, size, mode and encoding
+
+Images are stored pre-resized as raw pixels or zlib-compressed raw pixels,
+keyed by their file name in maps_config.json, so a pack stands in for
+the maps/ directory.
+"""
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from PIL import Image
+
+
+MAGIC = b"DBDPACK1"
+PACK_VERSION = 1
+HEADER_PREFIX = struct.Struct("<8sI")
+
+
+class MapPack:
+    """Read-only view of a map pack; only touched entries are paged in"""
+
+    def __init__(self, path):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+
+        with open(self.path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = HEADER_PREFIX.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            self.mmap.close()
+            raise ValueError(f"Not a map pack: {self.path}")
+
+        header_start = HEADER_PREFIX.size
+        header = json.loads(
+            self.mmap[header_start:header_start + header_length].decode('utf-8'))
+        if header.get("version") != PACK_VERSION:
+            self.mmap.close()
+            raise ValueError(f"Unsupported map pack version: {header.get('version')}")
+
+        self.metadata = header.get("metadata", {})
+        self.entries = header["entries"]
+        self.data_start = header_start + header_length
+
+    def __contains__(self, filename):
+        return filename in self.entries
+
+    def get_image(self, filename):
+        """Decode one image, or return None if it is not in the pack"""
+        entry = self.entries.get(filename)
+        if entry is None:
+            return None
+
+        start = self.data_start + entry["offset"]
+        data = memoryview(self.mmap)[start:start + entry["length"]]
+        size = tuple(entry["size"])
+        try:
+            if entry["encoding"] == "zlib":
+                return Image.frombytes(entry["mode"], size, zlib.decompress(data))
+            # Raw entries are copied once out of the mapping
+            return Image.frombytes(entry["mode"], size, data)
+        finally:
+            data.release()
+
+    def close(self):
+        """Unmap the pack file"""
+        self.mmap.close()
+
+
+def build_map_pack(output_path, maps_dir="maps", maps_config=None,
+                   size=(800, 600), compression="zlib"):
+    """Write a map pack from a maps directory and maps_config dict
+
+    Blobs are streamed to a temp file while the index is built, so only one
+    image is in memory at a time; the finished pack replaces output_path
+    atomically.  Returns the number of images packed.
+    """
+    logger = logging.getLogger(__name__)
+    maps_dir = Path(maps_dir)
+    maps_config = maps_config or {}
+
+    filenames = [info.get("filename") for info in maps_config.get("maps", {}).values()]
+    placeholder = maps_config.get("placeholders", {}).get("default_image")
+    if placeholder:
+        filenames.append(placeholder)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    entries = {}
+    offset = 0
+    with tempfile.TemporaryFile(dir=output_path.parent) as blobs:
+        for filename in dict.fromkeys(name for name in filenames if name):
+            image_path = maps_dir / filename
+            if not image_path.exists():
+                logger.warning("Skipping missing map image: %s", image_path)
+                continue
+
+            with Image.open(image_path) as image:
+                image = image.convert('RGB')
+                if image.size != tuple(size):
+                    image = image.resize(tuple(size), Image.Resampling.LANCZOS)
+                data = image.tobytes()
+
+            if compression == "zlib":
+                data = zlib.compress(data, 6)
+            entries[filename] = {
+                "offset": offset,
+                "length": len(data),
+                "size": list(image.size),
+                "mode": image.mode,
+                "encoding": compression
+            }
+            blobs.write(data)
+            offset += len(data)
+
+        header = json.dumps({
+            "version": PACK_VERSION,
+            "metadata": maps_config,
+            "entries": entries
+        }, ensure_ascii=False).encode('utf-8')
+
+        fd, temp_path = tempfile.mkstemp(
+            dir=output_path.parent, prefix=output_path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER_PREFIX.pack(MAGIC, len(header)))
+                f.write(header)
+                blobs.seek(0)
+                shutil.copyfileobj(blobs, f)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    logger.info("Packed %d images into %s", len(entries), output_path)
+    return len(entries)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+SQLite storage backend for map metadata
+"""
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS realms (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS maps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    name_key TEXT NOT NULL,
+    realm_id INTEGER REFERENCES realms(id),
+    official_name TEXT
+);
+CREATE INDEX IF NOT EXISTS maps_name_key ON maps(name_key);
+CREATE INDEX IF NOT EXISTS maps_realm ON maps(realm_id);
+
+CREATE TABLE IF NOT EXISTS aliases (
+    alias_key TEXT PRIMARY KEY,
+    map_id INTEGER NOT NULL REFERENCES maps(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS aliases_map ON aliases(map_id);
+
+CREATE TABLE IF NOT EXISTS image_assets (
+    map_id INTEGER NOT NULL REFERENCES maps(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    PRIMARY KEY (map_id, kind)
+);
+"""
+
+# Sorts after any character a map name can contain, for prefix range scans
+PREFIX_END = "\U0010ffff"
+
+
+class SQLiteMapRegistry:
+    """Map metadata in SQLite with indexed name, alias and prefix lookups
+
+    Every mutation is a small incremental statement instead of a rewrite of
+    the whole registry.  Names, aliases and prefixes are matched
+    case-insensitively through lowercase key columns.
+    """
+
+    def __init__(self, db_path="config/maps.db"):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the init, UI and detection threads, serialized by the lock
+        self.lock = threading.RLock()
+        self.transaction_depth = 0
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Group mutations into one commit, rolled back if the block raises"""
+        with self.lock:
+            self.transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self.transaction_depth == 1:
+                    self.connection.rollback()
+                raise
+            else:
+                if self.transaction_depth == 1:
+                    self.connection.commit()
+            finally:
+                self.transaction_depth -= 1
+
+    def is_empty(self):
+        """Check whether the registry holds no maps yet"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM maps LIMIT 1").fetchone() is None
+
+    def import_maps(self, maps):
+        """Bulk-import a maps_config.json style {name: info} dict"""
+        with self.transaction():
+            for name, info in maps.items():
+                self._upsert_map(name, info.get("filename"), info.get("realm"),
+                                 info.get("official_name"), info.get("aliases", ()))
+        self.logger.info("Imported %d maps into %s", len(maps), self.db_path)
+
+    def _realm_id(self, realm):
+        """Get or create a realm row"""
+        if not realm:
+            return None
+        self.connection.execute(
+            "INSERT OR IGNORE INTO realms(name) VALUES (?)", (realm,))
+        return self.connection.execute(
+            "SELECT id FROM realms WHERE name = ?", (realm,)).fetchone()["id"]
+
+    def _upsert_map(self, name, filename, realm, official_name, aliases):
+        """Insert or update one map with its primary image and aliases
+
+        The map's aliases are replaced, so names dropped from the config
+        (or an old file stem) stop resolving.  Callers hold a transaction.
+        """
+        self.connection.execute(
+            "INSERT INTO maps(name, name_key, realm_id, official_name) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET realm_id = excluded.realm_id, "
+            "official_name = excluded.official_name",
+            (name, name.lower(), self._realm_id(realm), official_name))
+        map_id = self.connection.execute(
+            "SELECT id FROM maps WHERE name = ?", (name,)).fetchone()["id"]
+
+        if filename:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO image_assets(map_id, kind, filename) "
+                "VALUES (?, 'primary', ?)", (map_id, filename))
+
+            # The file stem is what OCR usually reads, e.g. "lery"
+            aliases = list(aliases) + [Path(filename).stem]
+
+        self.connection.execute("DELETE FROM aliases WHERE map_id = ?", (map_id,))
+        for alias in aliases:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO aliases(alias_key, map_id) VALUES (?, ?)",
+                (alias.lower(), map_id))
+        return map_id
+
+    def add_map(self, map_name, filename, realm=None, official_name=None, aliases=()):
+        """Add or update a map"""
+        with self.transaction():
+            self._upsert_map(map_name, filename, realm or map_name,
+                             official_name or map_name, aliases)
+
+    def remove_map(self, map_name):
+        """Remove a map with its aliases and assets"""
+        with self.transaction():
+            cursor = self.connection.execute(
+                "DELETE FROM maps WHERE name = ?", (map_name,))
+        return cursor.rowcount > 0
+
+    def add_alias(self, alias, map_name):
+        """Point an extra alias at an existing map"""
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT id FROM maps WHERE name = ?", (map_name,)).fetchone()
+            if row is None:
+                return False
+            self.connection.execute(
+                "INSERT OR REPLACE INTO aliases(alias_key, map_id) VALUES (?, ?)",
+                (alias.lower(), row["id"]))
+        return True
+
+    def set_image_asset(self, map_name, kind, filename, width=None, height=None):
+        """Record an image asset (e.g. a pre-resized variant) for a map"""
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT id FROM maps WHERE name = ?", (map_name,)).fetchone()
+            if row is None:
+                return False
+            self.connection.execute(
+                "INSERT OR REPLACE INTO image_assets VALUES (?, ?, ?, ?, ?)",
+                (row["id"], kind, filename, width, height))
+        return True
+
+    def get_image_assets(self, map_name):
+        """List a map's image assets as dicts"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT a.kind, a.filename, a.width, a.height FROM image_assets a "
+                "JOIN maps m ON m.id = a.map_id WHERE m.name = ? ORDER BY a.kind",
+                (map_name,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_available_maps(self):
+        """Get map names in insertion order"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name FROM maps ORDER BY id").fetchall()
+        return [row["name"] for row in rows]
+
+    def get_map_info(self, map_name):
+        """Get a map's info in the maps_config.json shape"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT m.id, r.name AS realm, m.official_name, a.filename "
+                "FROM maps m LEFT JOIN realms r ON r.id = m.realm_id "
+                "LEFT JOIN image_assets a ON a.map_id = m.id AND a.kind = 'primary' "
+                "WHERE m.name = ?", (map_name,)).fetchone()
+            if row is None:
+                return {}
+            aliases = self.connection.execute(
+                "SELECT alias_key FROM aliases WHERE map_id = ? ORDER BY alias_key",
+                (row["id"],)).fetchall()
+
+        return {
+            "filename": row["filename"],
+            "realm": row["realm"],
+            "official_name": row["official_name"],
+            "aliases": [alias["alias_key"] for alias in aliases]
+        }
+
+    def find_by_prefix(self, prefix, limit=20):
+        """Map names starting with prefix (case-insensitive), via the index"""
+        key = prefix.lower()
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name FROM maps WHERE name_key >= ? AND name_key < ? "
+                "ORDER BY name_key LIMIT ?", (key, key + PREFIX_END, limit)).fetchall()
+        return [row["name"] for row in rows]
+
+    def resolve(self, text):
+        """Resolve a name, alias or unique prefix to a canonical map name"""
+        key = text.lower()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT name FROM maps WHERE name_key = ?", (key,)).fetchone()
+            if row is None:
+                row = self.connection.execute(
+                    "SELECT m.name FROM aliases a JOIN maps m ON m.id = a.map_id "
+                    "WHERE a.alias_key = ?", (key,)).fetchone()
+        if row is not None:
+            return row["name"]
+
+        matches = self.find_by_prefix(text, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+    def find_partial(self, text):
+        """First map whose name contains, or is contained in, text"""
+        key = text.lower()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT name FROM maps WHERE instr(name_key, ?) > 0 "
+                "OR instr(?, name_key) > 0 ORDER BY id LIMIT 1", (key, key)).fetchone()
+        return row["name"] if row else None
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
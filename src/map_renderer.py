@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Tk-free map decoding, sector geometry and tile rendering
+
+MapGUI keeps the window, canvas and input handling; everything that only
+needs PIL lives here, so the loader thread and the benchmarks can use it
+without a display.
+"""
+
+import math
+
+from PIL import Image, ImageDraw, ImageFont
+
+from map_tiles import TileCache, TilePyramid, visible_tiles
+from metrics import registry
+from sector_layout import SectorIndex, polygon_centroid
+
+
+class MapSource:
+    """Where a map image comes from: a decoded image, a decoder or a file"""
+
+    def __init__(self, map_image_path, map_image=None, open_image=None,
+                 open_preview=None, open_detail=None):
+        self.map_image_path = map_image_path
+        self.map_image = map_image  # Already decoded image, e.g. from a map pack
+        # Decodes map_image_path, e.g. MapManager.open_map_image from a pack
+        self.open_image = open_image
+        # Decodes a small copy quickly
+        self.open_preview = open_preview
+        # Decodes a sharper image to zoom into, or returns None, e.g.
+        # MapManager.open_full_map_image for the source file behind a pack
+        self.open_detail = open_detail
+
+    def decode(self):
+        """Decode the map image at full resolution"""
+        if self.map_image is not None:
+            return self.map_image
+        if self.open_image:
+            return self.open_image(self.map_image_path)
+        with Image.open(self.map_image_path) as image:
+            image.load()
+            return image
+
+    def decode_detail(self):
+        """Decode the sharper image behind a packed one, or None"""
+        if self.open_detail is None:
+            return None
+        return self.open_detail(self.map_image_path)
+
+    def decode_draft(self, size):
+        """Decode a JPEG at reduced scale (about size), or None
+
+        JPEG decoders can skip detail while decoding (Image.draft), which
+        is much cheaper than decoding in full and shrinking afterwards.
+        With open_preview, its small copy is used instead.
+        """
+        if self.open_preview:
+            return self.open_preview(self.map_image_path)
+        if self.map_image is not None or self.open_image:
+            return None
+        with Image.open(self.map_image_path) as image:
+            if image.format != "JPEG" or not image.draft("RGB", size):
+                return None
+            image.load()
+            return image
+
+
+class MapRenderer:
+    """Sectors and tiles of one map view size, rendered with PIL only
+
+    Sector geometry is in base-view pixels, the map fitted to base_size.
+    A renderer never changes size; resized() returns a new one sharing the
+    label sprites and layer cache, whose keys include the size.
+    """
+
+    def __init__(self, sector_mode="clock", sector_layout=None, base_size=(800, 600),
+                 sector_alpha=100, label_sprites=None, layer_cache=None):
+        self.sector_mode = sector_mode  # "clock", "numpad" or "custom"
+        # The map's own sectors for "custom", from MapManager.get_sector_layout
+        self.sector_layout = sector_layout or []
+        self.base_size = tuple(base_size)
+        self.sector_alpha = sector_alpha  # Transparency for sector overlays
+        self.label_font = None
+        # (label, stroke width) -> (RGBA image, offset)
+        self.label_sprites = {} if label_sprites is None else label_sprites
+        # Sector fill and label layers per tile, kept across selections
+        self.layer_cache = TileCache(capacity=64) if layer_cache is None else layer_cache
+
+        self.sectors = []
+        self.build_sectors()
+        self.sector_index = SectorIndex(self.sectors)
+
+    def resized(self, base_size):
+        """A renderer for another view size, sharing this one's caches"""
+        return MapRenderer(self.sector_mode, self.sector_layout, base_size,
+                           self.sector_alpha, self.label_sprites, self.layer_cache)
+
+    def render_preview(self, image, reduction):
+        """Blocky full-view preview from an image reduced about reduction times"""
+        size = self.base_size
+        if image.width > size[0] // reduction * 2:
+            image = image.reduce(max(1, image.width * reduction // size[0]))
+        return image.convert("RGB").resize(size, Image.Resampling.BILINEAR)
+
+    def prepare_map(self, source, on_preview=None, preview_reduction=4, pyramids=None):
+        """(tile pyramid, first view's tiles) for a MapSource
+
+        on_preview, if given, first receives a quick low-resolution
+        preview to show while the pyramid and tiles render.  Tiles are
+        keyed like MapGUI.tile_key() keys for the fit view.  pyramids, a
+        TileCache keyed by image path, keeps pyramids across loads; a map
+        found there is neither previewed nor decoded again.
+        """
+        pyramid = pyramids.get(source.map_image_path) if pyramids is not None else None
+        if pyramid is None:
+            pyramid = self.build_pyramid(source, on_preview, preview_reduction)
+            if pyramids is not None:
+                pyramids.put(source.map_image_path, pyramid)
+        else:
+            registry.counter("map.pyramid_hits").inc()
+
+        view = (0, 0) + self.base_size
+        tiles = {(self.base_size, 0, column, row, None):
+                 self.render_tile(pyramid, 1.0, box)
+                 for column, row, box in visible_tiles(
+                     view, pyramid.extent(self.base_size, 1.0))}
+        return pyramid, tiles
+
+    def build_pyramid(self, source, on_preview=None, preview_reduction=4):
+        """Decode a MapSource into a TilePyramid, previewing it first"""
+        image = None
+        if on_preview:
+            with registry.timer("map.preview"):
+                draft = source.decode_draft((self.base_size[0] // preview_reduction,
+                                             self.base_size[1] // preview_reduction))
+                image = source.decode() if draft is None else None
+                on_preview(self.render_preview(draft or image, preview_reduction))
+
+        # Decode and reduce once; tiles are resampled from the levels
+        with registry.timer("map.image_load"):
+            if image is None:
+                image = source.decode()
+            return TilePyramid(image)
+
+    def build_detail_pyramid(self, source, pyramid, pyramids=None):
+        """TilePyramid of a MapSource's detail image, or None
+
+        None when there is no detail image or it is no larger than
+        pyramid's.  The new pyramid replaces the old one in pyramids.
+        """
+        with registry.timer("map.detail_load"):
+            image = source.decode_detail()
+            if image is None or image.width <= pyramid.size[0]:
+                return None
+            detail = TilePyramid(image)
+        if pyramids is not None:
+            pyramids.put(source.map_image_path, detail)
+        return detail
+
+    def render_tile(self, pyramid, zoom, box, selected_sector=None, cache_layers=True):
+        """One display-space tile of map and sectors, as a PIL image
+
+        The tile's sector layers are cached (unless cache_layers is false),
+        so a new selection only redraws the selected sector over them.
+        """
+        with registry.timer("gui.tile_render"):
+            tile = pyramid.render(self.base_size, zoom, box)
+            key = (self.base_size, zoom, box)
+            layers = self.layer_cache.get(key) if cache_layers else None
+            if layers is None:
+                layers = self.render_sector_layers(zoom, box)
+                if cache_layers:
+                    self.layer_cache.put(key, layers)
+            self.composite_sectors(tile, layers, selected_sector, zoom, box[:2])
+            return tile
+
+    def sector_in_box(self, sector_number, box, zoom=1.0):
+        """Whether a sector overlaps a display-space box at a zoom"""
+        sector = self.sector_index.get(sector_number)
+        if sector is None:
+            return False
+        left, top, right, bottom = sector['bbox']
+        return (left * zoom <= box[2] and right * zoom >= box[0]
+                and top * zoom <= box[3] and bottom * zoom >= box[1])
+
+    def get_sector_at_position(self, x, y):
+        """Sector at a base-view position, or None"""
+        return self.sector_index.sector_at(x, y)
+
+    def sector_font(self):
+        """Sector label font, loaded once"""
+        if self.label_font is None:
+            try:
+                self.label_font = ImageFont.truetype("arial.ttf", 24)
+            except OSError:
+                self.label_font = ImageFont.load_default()
+        return self.label_font
+
+    @registry.timed("gui.overlay_render")
+    def create_sector_overlay(self, base_image, selected_sector=None):
+        """Create sector overlay on the map image"""
+        # Create a copy for drawing
+        overlay = base_image.copy()
+
+        box = (0, 0) + overlay.size
+        self.composite_sectors(overlay, self.render_sector_layers(1.0, box),
+                               selected_sector)
+        return overlay
+
+    def render_sector_layers(self, zoom, box):
+        """(fills, labels) RGBA layers of the sectors in a display-space box
+
+        Both are drawn without the selection, which composite_sectors()
+        adds, so they stay valid while callouts come and go.
+        """
+        size = (box[2] - box[0], box[3] - box[1])
+        fills = Image.new('RGBA', size, (0, 0, 0, 0))
+        self.draw_sectors(ImageDraw.Draw(fills), None, zoom, box[:2], size)
+        labels = Image.new('RGBA', size, (0, 0, 0, 0))
+        self.paste_sector_labels(labels, zoom, box[:2])
+        return fills, labels
+
+    def composite_sectors(self, image, layers, selected_sector=None, zoom=1.0,
+                          origin=(0, 0)):
+        """Blend sector layers onto an image, highlighting the selection"""
+        fills, labels = layers
+        sector = self.sector_index.get(selected_sector)
+        if sector is not None:
+            # Drawn without blending, so red replaces the sector's yellow
+            fills = fills.copy()
+            self.draw_sector(ImageDraw.Draw(fills), sector, True, zoom, origin)
+        image.paste(fills, (0, 0), fills)
+        image.paste(labels, (0, 0), labels)
+
+    def draw_sectors(self, draw, selected_sector=None, zoom=1.0, origin=(0, 0),
+                     size=None):
+        """Draw the sectors scaled by zoom, with origin at the top-left
+
+        With a size, sectors entirely outside that area are skipped, so a
+        tile only draws the few sectors it shows.
+        """
+        origin_x, origin_y = origin
+        # Outlines keep their pixel width at any zoom
+        margin = 4
+
+        for sector in self.sectors:
+            left, top, right, bottom = sector['bbox']
+            if size and (right * zoom - origin_x < -margin
+                         or bottom * zoom - origin_y < -margin
+                         or left * zoom - origin_x > size[0] + margin
+                         or top * zoom - origin_y > size[1] + margin):
+                continue
+            self.draw_sector(draw, sector, selected_sector == sector['number'],
+                             zoom, origin)
+
+    def draw_sector(self, draw, sector, selected, zoom=1.0, origin=(0, 0)):
+        """Draw one sector's fill and outline"""
+        origin_x, origin_y = origin
+        if selected:
+            # Red color for selected sector, more visible
+            outline_color = 'red'
+            fill_color = (255, 0, 0, self.sector_alpha + 50)
+        else:
+            # Default yellow color
+            outline_color = 'yellow'
+            fill_color = (255, 255, 0, self.sector_alpha)
+
+        if 'bounds' in sector:
+            x1, y1, x2, y2 = sector['bounds']
+            draw.rectangle([x1 * zoom - origin_x, y1 * zoom - origin_y,
+                            x2 * zoom - origin_x, y2 * zoom - origin_y],
+                           outline=outline_color, width=3, fill=fill_color)
+        else:
+            points = sector['points']
+            draw.polygon([value * zoom - (origin_y if index % 2 else origin_x)
+                          for index, value in enumerate(points)],
+                         outline=outline_color, width=3, fill=fill_color)
+
+    def label_sprite(self, label):
+        """(RGBA image, offset) of a sector label, rendered once per label
+
+        Adding the offset to the label's centre point gives the sprite's
+        top-left corner, so labels stay centred on their sectors.
+        """
+        stroke_width = 1 if self.sector_mode == "clock" else 2
+        key = (label, stroke_width)
+        sprite = self.label_sprites.get(key)
+        if sprite is None:
+            font = self.sector_font()
+            measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+            text_box = measure.textbbox((0, 0), label, font=font)
+            left, top, right, bottom = measure.textbbox(
+                (0, 0), label, font=font, stroke_width=stroke_width)
+
+            image = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+            ImageDraw.Draw(image).text((-left, -top), label, fill='white',
+                                       font=font, stroke_width=stroke_width,
+                                       stroke_fill='black')
+            offset = (left - (text_box[2] - text_box[0]) // 2,
+                      top - (text_box[3] - text_box[1]) // 2)
+            sprite = self.label_sprites[key] = (image, offset)
+        return sprite
+
+    def paste_sector_labels(self, image, zoom=1.0, origin=(0, 0)):
+        """Composite the label sprites onto an RGBA image, clipped to it
+
+        Labels keep their pixel size at any zoom.
+        """
+        for sector in self.sectors:
+            sprite, (offset_x, offset_y) = self.label_sprite(
+                sector.get('label', str(sector['number'])))
+            x = round(sector['center'][0] * zoom - origin[0]) + offset_x
+            y = round(sector['center'][1] * zoom - origin[1]) + offset_y
+            if (x >= image.width or y >= image.height
+                    or x + sprite.width <= 0 or y + sprite.height <= 0):
+                continue
+            # alpha_composite() only takes non-negative positions
+            skip_x, skip_y = max(0, -x), max(0, -y)
+            image.alpha_composite(sprite, (x + skip_x, y + skip_y),
+                                  (skip_x, skip_y))
+
+    def build_sectors(self):
+        """Compute the sector geometry for the mode, in base-view pixels"""
+        if self.sector_mode == "clock":
+            self.build_clock_sectors()
+        elif self.sector_mode == "custom":
+            self.build_custom_sectors()
+        else:
+            self.build_numpad_sectors()
+
+    def build_clock_sectors(self):
+        """Create 12-hour clock style sectors"""
+        center_x = self.base_size[0] // 2
+        center_y = self.base_size[1] // 2
+        radius = min(center_x, center_y) - 50
+
+        self.sectors = []
+
+        for i in range(12):
+            # Calculate angle (12 o'clock = 0 degrees, clockwise)
+            angle = (i * 30) - 90  # Start at 12 o'clock
+            angle_rad = math.radians(angle)
+
+            # Calculate sector boundaries
+            next_angle_rad = math.radians(angle + 30)
+
+            # Create sector points (triangle from center)
+            points = [
+                center_x, center_y,  # Center point
+                center_x + radius *
+                math.cos(angle_rad), center_y + radius * math.sin(angle_rad),
+                center_x + radius *
+                math.cos(next_angle_rad), center_y +
+                radius * math.sin(next_angle_rad)
+            ]
+
+            # Calculate text position
+            text_angle_rad = math.radians(angle + 15)  # Middle of sector
+            text_radius = radius * 0.7
+            text_x = center_x + text_radius * math.cos(text_angle_rad)
+            text_y = center_y + text_radius * math.sin(text_angle_rad)
+
+            # Store sector info
+            sector_num = 12 if i == 0 else i
+            self.sectors.append({
+                'number': sector_num,
+                'points': points,
+                'bbox': (min(points[0::2]), min(points[1::2]),
+                         max(points[0::2]), max(points[1::2])),
+                'center': (text_x, text_y),
+                'hotkey': f'F{sector_num}'
+            })
+
+    def build_numpad_sectors(self):
+        """Create 9-zone numpad style sectors"""
+        sector_width = self.base_size[0] // 3
+        sector_height = self.base_size[1] // 3
+
+        self.sectors = []
+
+        # Numpad layout (7-8-9 top row, 4-5-6 middle, 1-2-3 bottom)
+        numpad_layout = [
+            [7, 8, 9],
+            [4, 5, 6],
+            [1, 2, 3]
+        ]
+
+        for row in range(3):
+            for col in range(3):
+                sector_num = numpad_layout[row][col]
+
+                # Calculate sector boundaries
+                x1 = col * sector_width
+                y1 = row * sector_height
+                x2 = x1 + sector_width
+                y2 = y1 + sector_height
+
+                # Calculate text position (center of sector)
+                text_x = x1 + sector_width // 2
+                text_y = y1 + sector_height // 2
+
+                # Store sector info
+                self.sectors.append({
+                    'number': sector_num,
+                    'bounds': (x1, y1, x2, y2),
+                    'bbox': (x1, y1, x2, y2),
+                    'center': (text_x, text_y),
+                    'hotkey': str(sector_num)
+                })
+
+    def build_custom_sectors(self):
+        """Scale the map's own polygon sectors to the base view"""
+        width, height = self.base_size
+
+        self.sectors = []
+
+        for entry in self.sector_layout:
+            points = [value * (height if index % 2 else width)
+                      for index, value in enumerate(entry['points'])]
+            if entry['label_point']:
+                center = (entry['label_point'][0] * width,
+                          entry['label_point'][1] * height)
+            else:
+                center = polygon_centroid(points)
+
+            self.sectors.append({
+                'number': entry['number'],
+                'name': entry['name'],
+                'label': entry['label'],
+                'points': points,
+                'bbox': (min(points[0::2]), min(points[1::2]),
+                         max(points[0::2]), max(points[1::2])),
+                'center': center,
+                'hotkey': entry['hotkey']
+            })
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tile pyramid and LRU tile cache for the zoomable map view
+
+A map is reduced by powers of two once when it loads.  Each view tile is
+then resampled from the coarsest level that still has enough pixels, so
+zooming and panning only ever touch tile-sized regions of the image.
+"""
+
+import math
+from collections import OrderedDict
+
+from PIL import Image
+
+
+TILE_SIZE = 256
+
+
+class TilePyramid:
+    """Power-of-two reductions of a map image
+
+    Display coordinates are base-view pixels (the map fitted to a view of
+    base_size) times the zoom factor.  The levels do not depend on the
+    view size, so one pyramid serves every window size.
+    """
+
+    def __init__(self, image, min_size=TILE_SIZE):
+        self.size = image.size
+        self.levels = [image if image.mode == "RGB" else image.convert("RGB")]
+        # Levels below a tile would only serve views smaller than a tile
+        while (self.levels[-1].width // 2 >= min_size
+               and self.levels[-1].height // 2 >= min_size):
+            self.levels.append(self.levels[-1].reduce(2))
+
+    def native_zoom(self, base_size):
+        """Zoom at which one display pixel shows one source pixel"""
+        return max(self.size[0] / base_size[0], self.size[1] / base_size[1])
+
+    @staticmethod
+    def extent(base_size, zoom):
+        """(width, height) of the whole map in display pixels"""
+        return (round(base_size[0] * zoom), round(base_size[1] * zoom))
+
+    def render(self, base_size, zoom, box):
+        """Display-space box (left, top, right, bottom) as an RGB image"""
+        left, top, right, bottom = box
+        # Source pixels per display pixel, at most halved by the resample
+        factor_x = self.size[0] / (base_size[0] * zoom)
+        factor_y = self.size[1] / (base_size[1] * zoom)
+        reduction = min(factor_x, factor_y)
+        level = 0 if reduction < 2 else min(len(self.levels) - 1,
+                                            int(math.log2(reduction)))
+        image = self.levels[level]
+        scale = 2 ** level
+
+        source_box = (left * factor_x / scale, top * factor_y / scale,
+                      min(right * factor_x / scale, image.width),
+                      min(bottom * factor_y / scale, image.height))
+        return image.resize((right - left, bottom - top),
+                            Image.Resampling.BILINEAR, box=source_box)
+
+
+def visible_tiles(view_box, extent, tile_size=TILE_SIZE):
+    """(column, row, box) of the tiles a display-space view box overlaps
+
+    Boxes are clipped to the map extent, so edge tiles can be smaller.
+    """
+    left, top, right, bottom = view_box
+    width, height = extent
+    right, bottom = min(right, width), min(bottom, height)
+
+    for row in range(max(0, top // tile_size), math.ceil(bottom / tile_size)):
+        for column in range(max(0, left // tile_size), math.ceil(right / tile_size)):
+            x, y = column * tile_size, row * tile_size
+            yield column, row, (x, y, min(x + tile_size, width),
+                                min(y + tile_size, height))
+
+
+class TileCache:
+    """Least-recently-used cache of rendered tiles"""
+
+    def __init__(self, capacity=192):
+        self.capacity = capacity
+        self.tiles = OrderedDict()
+
+    def get(self, key):
+        """Cached tile, now most recently used, or None"""
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        """Add a tile, evicting the least recently used beyond capacity"""
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.capacity:
+            self.tiles.popitem(last=False)
+
+    def clear(self):
+        self.tiles.clear()
+
+    def __len__(self):
+        return len(self.tiles)
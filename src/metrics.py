@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Lightweight pipeline metrics: counters and fixed-bucket latency histograms
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Histogram bucket upper bounds in milliseconds, the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Counter:
+    """Monotonic event counter"""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Increase the counter"""
+        with self.lock:
+            self.value += amount
+
+    def snapshot(self):
+        """Return the current value"""
+        return self.value
+
+
+class Histogram:
+    """Latency histogram with fixed millisecond buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one duration given in seconds"""
+        ms = seconds * 1000
+        index = bisect_left(self.buckets, ms)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, fraction):
+        """Estimate a percentile as the upper bound of its bucket"""
+        if not self.count:
+            return 0.0
+
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        """Return summary statistics and raw bucket counts"""
+        with self.lock:
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+                "p50_ms": self.percentile(0.5),
+                "p95_ms": self.percentile(0.95),
+                "max_ms": round(self.max_ms, 3),
+                "buckets_ms": list(self.buckets),
+                "bucket_counts": list(self.counts)
+            }
+
+
+class MetricsRegistry:
+    """Named counters and histograms shared by the whole app"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def counter(self, name):
+        """Get or create a counter"""
+        counter = self.counters.get(name)
+        if counter is None:
+            with self.lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name):
+        """Get or create a latency histogram"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    @contextmanager
+    def timer(self, name):
+        """Time a block into the named histogram"""
+        histogram = self.histogram(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator that times every call into the named histogram"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def items(self):
+        """Return sorted (counters, histograms) name/metric pairs"""
+        with self.lock:
+            return sorted(self.counters.items()), sorted(self.histograms.items())
+
+    def snapshot(self):
+        """Return every metric as a JSON-serializable dict"""
+        counters, histograms = self.items()
+        return {
+            "timestamp": time.time(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "counters": {name: counter.snapshot() for name, counter in counters},
+            "histograms": {name: histogram.snapshot() for name, histogram in histograms}
+        }
+
+    def format_lines(self):
+        """Format the current metrics as fixed-width text lines"""
+        counters, histograms = self.items()
+        lines = [f"{'stage':<22}{'count':>8}{'mean':>10}{'p50':>8}{'p95':>8}{'max':>10}"]
+        for name, histogram in histograms:
+            stats = histogram.snapshot()
+            lines.append(f"{name:<22}{stats['count']:>8}{stats['mean_ms']:>10.2f}"
+                         f"{stats['p50_ms']:>8g}{stats['p95_ms']:>8g}{stats['max_ms']:>10.2f}")
+
+        if counters:
+            lines.append("")
+            for name, counter in counters:
+                lines.append(f"{name:<22}{counter.snapshot():>8}")
+        return lines
+
+
+class SnapshotWriter:
+    """Periodically writes registry snapshots to a JSON file"""
+
+    def __init__(self, registry, path, interval=10.0):
+        self.logger = logging.getLogger(__name__)
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name="metrics-snapshot", daemon=True)
+
+    def start(self):
+        """Start writing snapshots in the background"""
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer after a final snapshot"""
+        self.stop_event.set()
+        self.thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+        self.write()
+
+    def write(self):
+        """Write one snapshot, replacing the previous file atomically"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.registry.snapshot(), f, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.logger.error("Error writing metrics snapshot: %s", e)
+
+
+# Shared registry used by all pipeline stages
+registry = MetricsRegistry()
@@ -3,27 +3,38 @@
 OCR Detector for Dead by Daylight Map Names
 """
 
+import difflib
 import logging
 import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import pyautogui
-import pytesseract
 from PIL import Image, ImageEnhance, ImageFilter
-import json
+
+from config_store import ConfigStore
+from match_state import MatchStateClassifier, create_default_classifier_config
+from text_localizer import localize_text
+from tesseract_lexicon import TesseractLexicon
+from lexicon_decoder import LexiconDecoder, parse_hocr_choices
+from metrics import registry
+
+# Heavy backends are imported on first use, see OCRDetector.load_backends()
+pyautogui = None
+pytesseract = None
 
 
 class OCRDetector:
     """Handles OCR detection of map names from screenshots"""
 
-    def __init__(self, config_path="config/ocr_config.json"):
+    def __init__(self, config_path="config/ocr_config.json", capture_backend="pyautogui"):
         self.logger = logging.getLogger(__name__)
+        # "pyautogui", or "imagegrab" to capture with Pillow only (no Tk import)
+        self.capture_backend = capture_backend
         self.config_path = Path(config_path)
+        self.config_store = ConfigStore(self.config_path, self.create_default_config,
+                                        label="OCR config")
         self.config = self.load_config()
 
-        # Set tesseract path if specified in config
-        if self.config.get("tesseract_path"):
-            pytesseract.pytesseract.tesseract_cmd = self.config["tesseract_path"]
-
         # Screenshot settings
         self.screenshot_region = self.config.get(
             "screenshot_region", (50, 850, 400, 950))
@@ -33,20 +44,97 @@ class OCRDetector:
         # Map name mappings for OCR corrections
         self.map_mappings = self.config.get("map_mappings", {})
 
-    def load_config(self):
-        """Load OCR configuration"""
+        # Match confidence of the last successful detect_map() call
+        self.last_confidence = 0.0
+
+        # "text": normalize the top-1 string; "lexicon": decode the map name
+        # from Tesseract's per-symbol alternatives, see lexicon_decoder.py
+        self.recognition_mode = self.config.get("recognition_mode", "text")
+        self.lexicon_names = set()
+        self.decoder = None
+        if self.recognition_mode == "lexicon":
+            self.decoder = LexiconDecoder(**self.config.get("lexicon_decoder", {}))
+            self.update_decoder()
+
+        # User words/patterns and whitelist generated from the map names
+        lexicon_options = self.config.get("lexicon", {})
+        self.lexicon = None
+        if lexicon_options.get("enabled", True):
+            self.lexicon = TesseractLexicon(lexicon_options.get(
+                "directory", self.config_path.parent / "tesseract"))
+            # Bootstrap only: worker processes reuse what the app generated
+            # from the full map list instead of overwriting it
+            if not self.lexicon.config_path.exists():
+                self.update_lexicon()
+
+        # Labels frames; with gate_ocr, skips OCR outside banner screens
+        self.state_classifier = MatchStateClassifier(self.config.get("state_classifier"))
+
+        # Extra named regions, e.g. the game on a second monitor, each with
+        # its own match state; checked concurrently by detect_map()
+        self.capture_regions = self.config.get("capture_regions", [])
+        self.region_classifiers = {
+            entry["name"]: MatchStateClassifier(self.config.get("state_classifier"))
+            for entry in self.capture_regions}
+        self.capture_pool = None
+        self.last_region = None
+
+    def update_lexicon(self, map_names=()):
+        """Regenerate the Tesseract lexicon for these plus the mapped names"""
+        if map_names:
+            self.lexicon_names = set(map_names)
+            self.update_decoder()
+        if self.lexicon is None:
+            return
         try:
-            if self.config_path.exists():
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                # Create default config
-                default_config = self.create_default_config()
-                self.save_config(default_config)
-                return default_config
+            self.lexicon.update(set(map_names) | set(self.map_mappings.values()))
         except Exception as e:
-            self.logger.error("Error loading OCR config: %s", e)
-            return self.create_default_config()
+            self.logger.error("Error updating Tesseract lexicon: %s", e)
+
+    def update_decoder(self):
+        """Rebuild the decoder trie from the mappings and known map names"""
+        if self.decoder is None:
+            return
+        entries = {name: name for name in self.lexicon_names}
+        entries.update({name: name for name in self.map_mappings.values()})
+        # Misread spellings decode to the name they are mapped to
+        entries.update(self.map_mappings)
+        self.decoder.set_entries(entries)
+
+    @property
+    def match_state(self):
+        """Match state of the last captured frame
+
+        With several capture regions, the most telling state any of them
+        is in: a loading banner anywhere beats a match, a match a lobby.
+        """
+        if not self.region_classifiers:
+            return self.state_classifier.state
+        states = {classifier.state for classifier in self.region_classifiers.values()}
+        for state in ("loading", "in_match", "lobby"):
+            if state in states:
+                return state
+        return "unknown"
+
+    def load_backends(self, capture=True, ocr=True):
+        """Import the screenshot and OCR backends if not loaded yet"""
+        global pyautogui, pytesseract
+
+        if capture and self.capture_backend == "pyautogui" and pyautogui is None:
+            import pyautogui as pyautogui_module
+            pyautogui = pyautogui_module
+
+        if ocr and pytesseract is None:
+            import pytesseract as pytesseract_module
+            pytesseract = pytesseract_module
+
+            # Set tesseract path if specified in config
+            if self.config.get("tesseract_path"):
+                pytesseract.pytesseract.tesseract_cmd = self.config["tesseract_path"]
+
+    def load_config(self):
+        """Load OCR configuration (created from defaults if missing)"""
+        return self.config_store.load()
 
     def create_default_config(self):
         """Create default OCR configuration"""
@@ -54,11 +142,42 @@ class OCRDetector:
             "tesseract_path": "",  # Leave empty for system PATH
             "screenshot_region": [50, 850, 400, 950],  # x1, y1, x2, y2
             "confidence_threshold": 0.7,
+            # Seconds per tesseract call, and before a stuck detection
+            # thread is replaced
+            "ocr_timeout": 2.0,
+            "watchdog_timeout": 10.0,
+            "save_screenshots": True,
+            # Named regions checked concurrently instead of screenshot_region,
+            # e.g. {"name": "second monitor", "region": [1970, 850, 400, 100],
+            # "monitor": 1}; regions off the primary monitor need "monitor"
+            "capture_regions": [],
+            "capture_workers": 4,
+            # "lexicon" decodes names from per-symbol OCR alternatives
+            "recognition_mode": "text",
+            "lexicon_decoder": {
+                "beam_width": 64,
+                "min_confidence": 0.35
+            },
+            # Tesseract user words/patterns generated from the map names,
+            # written to a "tesseract" folder next to this config by default
+            "lexicon": {
+                "enabled": True
+            },
+            "state_classifier": create_default_classifier_config(),
+            # Capture and OCR in their own processes, see frame_pipeline.py
+            "frame_pipeline": {
+                "enabled": False,
+                "interval": 0.5,
+                "slots": 4
+            },
             "preprocessing": {
                 "contrast_factor": 2.0,
                 "brightness_factor": 1.2,
                 "apply_gaussian_blur": True,
-                "blur_radius": 0.5
+                "blur_radius": 0.5,
+                # Crop to the text line and scale it, see text_localizer.py
+                "localize_text": True,
+                "target_text_height": 32
             },
             "tesseract_config": "--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz ",
             "map_mappings": {
@@ -92,31 +211,47 @@ class OCRDetector:
         }
 
     def save_config(self, config):
-        """Save configuration to file"""
-        try:
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.logger.error("Error saving OCR config: %s", e)
+        """Save configuration (debounced, written atomically)"""
+        self.config_store.update(config)
+
+    def flush_config(self):
+        """Write any pending config changes to disk now"""
+        self.config_store.flush()
+
+    def take_screenshot(self, region=None, all_screens=False, label="map_detection"):
+        """Take screenshot of specified region
 
-    def take_screenshot(self, region=None):
-        """Take screenshot of specified region"""
+        all_screens captures in virtual-desktop coordinates, which reach
+        monitors other than the primary one; that always uses Pillow.
+        """
         try:
             if region is None:
                 region = self.screenshot_region
 
-            screenshot = pyautogui.screenshot(region=region)
+            with registry.timer("ocr.capture"):
+                if self.capture_backend == "imagegrab" or all_screens:
+                    from PIL import ImageGrab
+
+                    # Same (left, top, width, height) region semantics as pyautogui
+                    left, top, width, height = region
+                    screenshot = ImageGrab.grab(
+                        bbox=(left, top, left + width, top + height),
+                        all_screens=all_screens)
+                else:
+                    self.load_backends(ocr=False)
+                    screenshot = pyautogui.screenshot(region=region)
 
             # Save screenshot for debugging
-            timestamp = int(time.time())
-            screenshot_path = Path("screenshots") / \
-                f"map_detection_{timestamp}.png"
-            screenshot_path.parent.mkdir(parents=True, exist_ok=True)
-            screenshot.save(screenshot_path)
+            if self.config.get("save_screenshots", True):
+                timestamp = int(time.time())
+                screenshot_path = Path("screenshots") / \
+                    f"{label}_{timestamp}.png"
+                screenshot_path.parent.mkdir(parents=True, exist_ok=True)
+                screenshot.save(screenshot_path)
 
             return screenshot
         except Exception as e:
+            registry.counter("ocr.capture_errors").inc()
             self.logger.error("Error taking screenshot: %s", e)
             return None
 
@@ -152,35 +287,129 @@ class OCRDetector:
             self.logger.error("Error preprocessing image: %s", e)
             return image
 
-    def extract_text_from_image(self, image):
-        """Extract text from image using OCR"""
-        try:
-            # Preprocess image
+    def prepare_for_ocr(self, image):
+        """Preprocessed image cropped to its text line, ready for Tesseract"""
+        with registry.timer("ocr.preprocess"):
             processed_image = self.preprocess_image(image)
 
-            # OCR configuration
-            tesseract_config = self.config.get("tesseract_config", "--psm 8")
+        # Hand Tesseract only the text line, at a consistent glyph height
+        preprocessing = self.config.get("preprocessing", {})
+        if preprocessing.get("localize_text", True):
+            with registry.timer("ocr.localize"):
+                processed_image = localize_text(processed_image, preprocessing)
+        return processed_image
+
+    def run_tesseract(self, function_name, image, extra_config="", **kwargs):
+        """Call a pytesseract function under the OCR deadline
+
+        Returns None if tesseract had to be killed at the deadline.
+        """
+        self.load_backends(capture=False)
+
+        # OCR configuration; -c options must come before the lexicon's
+        # config file name
+        tesseract_config = self.config.get("tesseract_config", "--psm 8")
+        tesseract_config = f"{tesseract_config} {extra_config}".strip()
+        if self.lexicon:
+            tesseract_config = self.lexicon.apply(tesseract_config)
+
+        # Past the deadline pytesseract kills tesseract
+        with registry.timer("ocr.tesseract"):
+            try:
+                function = getattr(pytesseract, function_name)
+                return function(image, config=tesseract_config,
+                                timeout=self.config.get("ocr_timeout", 2.0), **kwargs)
+            except RuntimeError as e:
+                if "timeout" not in str(e).lower():
+                    raise
+                registry.counter("ocr.timeouts").inc()
+                self.logger.warning("Tesseract exceeded its deadline, frame skipped")
+                return None
 
-            # Extract text
-            text = pytesseract.image_to_string(
-                processed_image, config=tesseract_config)
+    @staticmethod
+    def clean_text(text):
+        """Collapse line breaks and runs of whitespace"""
+        text = text.strip().replace('\\n', ' ').replace('\\r', ' ')
+        return ' '.join(text.split())
 
-            # Clean up text
-            text = text.strip().replace('\\n', ' ').replace('\\r', ' ')
-            text = ' '.join(text.split())  # Remove extra whitespace
+    def extract_text_from_image(self, image, strict=False):
+        """Extract text from image using OCR
 
-            return text
+        strict raises OCR failures and deadline timeouts instead of
+        returning empty text, for callers that must tell them apart from
+        frames without text.
+        """
+        try:
+            processed_image = self.prepare_for_ocr(image)
+            text = self.run_tesseract("image_to_string", processed_image)
+            if text is None and strict:
+                raise TimeoutError("tesseract exceeded its deadline")
+            return self.clean_text(text) if text else ""
         except Exception as e:
+            if strict:
+                raise
             self.logger.error("Error extracting text from image: %s", e)
             return ""
 
+    def extract_choices_from_image(self, image, strict=False):
+        """(top-1 text, per-symbol alternatives) from Tesseract's hOCR output
+
+        strict raises failures as in extract_text_from_image().
+        """
+        try:
+            processed_image = self.prepare_for_ocr(image)
+            # lstm_choice_mode=2 lists the alternatives of every symbol
+            hocr = self.run_tesseract("image_to_pdf_or_hocr", processed_image,
+                                      "-c lstm_choice_mode=2", extension='hocr')
+            if hocr is None and strict:
+                raise TimeoutError("tesseract exceeded its deadline")
+            if not hocr:
+                return "", []
+            with registry.timer("ocr.parse_hocr"):
+                text, positions = parse_hocr_choices(hocr)
+            return self.clean_text(text), positions
+        except Exception as e:
+            if strict:
+                raise
+            self.logger.error("Error extracting symbol choices from image: %s", e)
+            return "", []
+
+    def recognize(self, image, strict=False):
+        """(raw text, map name, confidence) for a banner image
+
+        In lexicon mode the name is decoded from the symbol alternatives;
+        when nothing in the lexicon scores high enough the top-1 text goes
+        through normalize_map_name() as in text mode.  strict raises OCR
+        failures instead of treating them as empty text.
+        """
+        if self.decoder is None:
+            raw_text = self.extract_text_from_image(image, strict)
+            map_name = self.normalize_map_name(raw_text)
+        else:
+            raw_text, positions = self.extract_choices_from_image(image, strict)
+            with registry.timer("ocr.decode"):
+                map_name, confidence = self.decoder.decode(positions)
+            if map_name:
+                return raw_text, map_name, confidence
+            registry.counter("ocr.decode_fallbacks").inc()
+            map_name = self.normalize_map_name(raw_text)
+
+        confidence = self.match_confidence(raw_text, map_name) if map_name else 0.0
+        return raw_text, map_name, confidence
+
+    @staticmethod
+    def fold_text(text):
+        """Lowercase text with accents stripped ("LÉRY'S" -> "lery's")"""
+        decomposed = unicodedata.normalize('NFKD', text.lower())
+        return "".join(char for char in decomposed if not unicodedata.combining(char))
+
     def normalize_map_name(self, raw_text):
         """Normalize and correct OCR-detected text to actual map name"""
         if not raw_text:
             return None
 
-        # Convert to lowercase for comparison
-        text_lower = raw_text.lower()
+        # Lowercase without accents, the mapping keys are plain ASCII
+        text_lower = self.fold_text(raw_text)
 
         # Check direct mappings first
         for key, value in self.map_mappings.items():
@@ -195,36 +424,132 @@ class OCRDetector:
         # If no mapping found, return cleaned original
         return raw_text.title()
 
+    def match_confidence(self, raw_text, map_name):
+        """Score 0-1 for how closely raw text matches a mapped map name
+
+        Text that matched no mapping scores 0.
+        """
+        text_lower = self.fold_text(raw_text)
+        keys = [key for key, value in self.map_mappings.items() if value == map_name]
+        if not keys:
+            return 0.0
+        return max(difflib.SequenceMatcher(None, text_lower, key).ratio()
+                   for key in keys)
+
+    def detect_region(self, region=None, classifier=None, all_screens=False,
+                      label="map_detection"):
+        """(map name, confidence) seen in one capture region, or (None, 0.0)"""
+        classifier = classifier or self.state_classifier
+
+        # Take screenshot
+        screenshot = self.take_screenshot(region, all_screens, label)
+        if screenshot is None:
+            return None, 0.0
+
+        # Only OCR frames that can show the banner
+        with registry.timer("ocr.classify"):
+            state = classifier.classify(screenshot)
+        if not classifier.should_ocr(state):
+            registry.counter("ocr.gated").inc()
+            return None, 0.0
+        if not classifier.banner_possible(state):
+            registry.counter("ocr.would_gate").inc()
+
+        # Extract text and resolve the map name
+        with registry.timer("ocr.recognize"):
+            raw_text, map_name, confidence = self.recognize(screenshot)
+        if not raw_text:
+            return None, 0.0
+
+        self.logger.debug("Raw OCR text: '%s'", raw_text)
+        if not map_name:
+            self.logger.debug("No valid map name detected from: '%s'", raw_text)
+        return map_name, confidence
+
+    def detect_in_regions(self):
+        """(map name, confidence, region name) across all capture regions
+
+        Regions are captured and read concurrently; the first hit at or
+        above confidence_threshold wins and regions not started yet are
+        cancelled.  Without one, the best hit that matched a known name
+        is used, so text in a stray region is not taken for a map.
+        """
+        if self.capture_pool is None:
+            workers = min(self.config.get("capture_workers", 4),
+                          len(self.capture_regions))
+            self.capture_pool = ThreadPoolExecutor(
+                max_workers=max(1, workers), thread_name_prefix="capture")
+
+        futures = {}
+        for entry in self.capture_regions:
+            name = entry["name"]
+            future = self.capture_pool.submit(
+                self.detect_region, entry["region"], self.region_classifiers[name],
+                entry.get("monitor", 0) != 0, f"map_detection_{name}")
+            futures[future] = name
+
+        best = (None, 0.0, None)
+        try:
+            for future in as_completed(futures):
+                try:
+                    map_name, confidence = future.result()
+                except Exception as e:
+                    self.logger.error("Error detecting in region %s: %s",
+                                      futures[future], e)
+                    continue
+                if not map_name:
+                    continue
+                if confidence >= self.confidence_threshold:
+                    return map_name, confidence, futures[future]
+                if confidence > best[1]:
+                    best = (map_name, confidence, futures[future])
+        finally:
+            for future in futures:
+                future.cancel()
+        return best
+
     def detect_map(self):
         """Main method to detect current map name"""
         try:
-            # Take screenshot
-            screenshot = self.take_screenshot()
-            if screenshot is None:
-                return None
-
-            # Extract text
-            raw_text = self.extract_text_from_image(screenshot)
-            if not raw_text:
-                return None
-
-            self.logger.debug("Raw OCR text: '%s'", raw_text)
-
-            # Normalize map name
-            map_name = self.normalize_map_name(raw_text)
+            if self.capture_regions:
+                with registry.timer("ocr.detect_regions"):
+                    map_name, confidence, region = self.detect_in_regions()
+            else:
+                map_name, confidence = self.detect_region()
+                region = None
 
             if map_name:
-                self.logger.info("Detected map: %s", map_name)
+                self.last_confidence = confidence
+                self.last_region = region
+                registry.counter("ocr.maps_detected").inc()
+                if region:
+                    self.logger.info("Detected map: %s (region %s)", map_name, region)
+                else:
+                    self.logger.info("Detected map: %s", map_name)
                 return map_name
-            else:
-                self.logger.debug(
-                    "No valid map name detected from: '%s'", raw_text)
-                return None
+            return None
 
         except Exception as e:
             self.logger.error("Error detecting map: %s", e)
             return None
 
+    def restart(self):
+        """Let a new detection thread start clean while a hung one lingers
+
+        Called by the detection watchdog.  The capture pool is replaced,
+        abandoning any stuck workers, and the match-state classifiers are
+        recreated, so a tick that returns late only touches the old objects.
+        """
+        pool, self.capture_pool = self.capture_pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        options = self.config.get("state_classifier")
+        self.state_classifier = MatchStateClassifier(options)
+        self.region_classifiers = {name: MatchStateClassifier(options)
+                                   for name in self.region_classifiers}
+        self.logger.info("OCR detector restarted")
+
     def update_screenshot_region(self, x1, y1, x2, y2):
         """Update the screenshot region coordinates"""
         self.screenshot_region = (x1, y1, x2, y2)
@@ -237,11 +562,10 @@ class OCRDetector:
 
         screenshot = self.take_screenshot()
         if screenshot:
-            raw_text = self.extract_text_from_image(screenshot)
-            map_name = self.normalize_map_name(raw_text)
+            raw_text, map_name, confidence = self.recognize(screenshot)
 
             print(f"Raw text: '{raw_text}'")
-            print(f"Detected map: '{map_name}'")
+            print(f"Detected map: '{map_name}' ({confidence:.2f})")
 
             return map_name
         return None
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Preprocessing auto-tuner over a labelled banner corpus
+
+Grid- or random-searches the "preprocessing" factors and the Tesseract
+page segmentation mode on a process pool.  Each candidate is scored on
+accuracy and per-frame latency over a corpus with a manifest.jsonl (as
+written by the corpus command); the Pareto front of the two is reported
+and the chosen candidate can be written back to the OCR config.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+from logging_config import configure_worker_logging, worker_logging_settings
+
+
+DEFAULT_SEARCH_SPACE = {
+    "contrast_factor": [1.0, 1.5, 2.0, 2.5, 3.0],
+    "brightness_factor": [1.0, 1.2, 1.4],
+    # 0 turns the Gaussian blur off
+    "blur_radius": [0.0, 0.5, 1.0],
+    "psm": [7, 8, 13]
+}
+
+PSM_OPTION = re.compile(r"--psm\s+\d+")
+
+# One detector per worker process, created by _init_worker()
+_worker_detector = None
+
+
+def candidate_key(params):
+    """Stable identity of a candidate, for de-duplication"""
+    return tuple(sorted(params.items()))
+
+
+def grid_candidates(space):
+    """Every combination of the search space values"""
+    candidates = [{}]
+    for name, values in space.items():
+        candidates = [dict(candidate, **{name: value})
+                      for candidate in candidates for value in values]
+    return candidates
+
+
+def random_candidates(space, samples, seed=0):
+    """Candidates drawn at random within the search space
+
+    Numeric parameters are drawn uniformly between their smallest and
+    largest listed value, the PSM from its listed choices.
+    """
+    rng = random.Random(seed)
+    candidates = {}
+    # Bounded, in case the space has fewer distinct points than requested
+    for _ in range(samples * 20):
+        if len(candidates) >= samples:
+            break
+        params = {}
+        for name, values in space.items():
+            if name == "psm":
+                params[name] = rng.choice(values)
+            else:
+                params[name] = round(rng.uniform(min(values), max(values)), 2)
+        candidates.setdefault(candidate_key(params), params)
+    return list(candidates.values())
+
+
+def current_params(config):
+    """The candidate an OCR config currently runs with"""
+    preprocessing = config.get("preprocessing", {})
+    match = PSM_OPTION.search(config.get("tesseract_config", ""))
+    return {
+        "contrast_factor": preprocessing.get("contrast_factor", 2.0),
+        "brightness_factor": preprocessing.get("brightness_factor", 1.2),
+        "blur_radius": preprocessing.get("blur_radius", 0.5)
+        if preprocessing.get("apply_gaussian_blur", True) else 0.0,
+        "psm": int(match.group().split()[1]) if match else 3
+    }
+
+
+def apply_params(config, params):
+    """Set a candidate's values in an OCR config dict (in place)"""
+    preprocessing = config.setdefault("preprocessing", {})
+    preprocessing["contrast_factor"] = params["contrast_factor"]
+    preprocessing["brightness_factor"] = params["brightness_factor"]
+    preprocessing["apply_gaussian_blur"] = params["blur_radius"] > 0
+    if params["blur_radius"] > 0:
+        preprocessing["blur_radius"] = params["blur_radius"]
+
+    tesseract_config = config.get("tesseract_config", "")
+    psm = f"--psm {params['psm']}"
+    if PSM_OPTION.search(tesseract_config):
+        tesseract_config = PSM_OPTION.sub(psm, tesseract_config)
+    else:
+        tesseract_config = f"{psm} {tesseract_config}".strip()
+    config["tesseract_config"] = tesseract_config
+    return config
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, 0 if empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def pareto_front(results):
+    """Results no other result beats on both accuracy and latency
+
+    Sorted fastest first, so accuracy rises along the front.
+    """
+    ranked = sorted(results, key=lambda r: (r["latency_ms"], -r["accuracy"]))
+    front = []
+    for result in ranked:
+        if not front or result["accuracy"] > front[-1]["accuracy"]:
+            front.append(result)
+    return front
+
+
+def choose(front, max_latency_ms=None, min_accuracy=None):
+    """Pick from the front: the fastest reaching min_accuracy, else the
+    most accurate within max_latency_ms, else the most accurate overall"""
+    if not front:
+        return None
+    if min_accuracy is not None:
+        for result in front:
+            if result["accuracy"] >= min_accuracy:
+                return result
+    if max_latency_ms is not None:
+        within = [r for r in front if r["latency_ms"] <= max_latency_ms]
+        if within:
+            return within[-1]
+    return front[-1]
+
+
+def read_manifest(corpus_dir):
+    """(image path, map name) pairs from the corpus manifest"""
+    corpus_dir = Path(corpus_dir)
+    samples = []
+    with open(corpus_dir / "manifest.jsonl", 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            samples.append((str(corpus_dir / entry["file"]), entry["map"]))
+    return samples
+
+
+def _init_worker(config_path, log_settings=None):
+    """Process pool initializer: build the worker's OCRDetector once"""
+    global _worker_detector
+    configure_worker_logging(log_settings)
+    # One tesseract thread per worker, so latencies are not skewed by
+    # workers competing for each other's cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    from ocr_detector import OCRDetector
+
+    _worker_detector = OCRDetector(config_path=config_path,
+                                   capture_backend="imagegrab")
+    _worker_detector.load_backends(capture=False)
+
+
+def _evaluate_chunk(samples, candidates):
+    """Score every candidate on a chunk of samples
+
+    The chunk's images are decoded once and reused for all candidates.
+    Unreadable images and OCR failures count as errors, not misses.
+    Returns per-candidate (correct, frames, errors, latencies in ms).
+    """
+    images = []
+    for path, map_name in samples:
+        try:
+            with Image.open(path) as image:
+                image.load()
+                images.append((image, map_name))
+        except OSError:
+            images.append((None, map_name))
+
+    detector = _worker_detector
+    tallies = []
+    for params in candidates:
+        # Only the in-memory config changes, the worker never saves it
+        apply_params(detector.config, params)
+        correct = errors = 0
+        latencies = []
+        for image, expected in images:
+            if image is None:
+                errors += 1
+                continue
+            start = time.perf_counter()
+            try:
+                _, map_name, _ = detector.recognize(image, strict=True)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            correct += map_name == expected
+        tallies.append((correct, len(images), errors, latencies))
+    return tallies
+
+
+class PreprocessTuner:
+    """Searches preprocessing parameters for accuracy and latency"""
+
+    def __init__(self, corpus_dir, config_path="config/ocr_config.json",
+                 space=None, samples=None, seed=0, workers=None, chunk_size=8):
+        self.logger = logging.getLogger(__name__)
+        self.corpus_dir = Path(corpus_dir)
+        self.config_path = config_path
+        self.space = dict(DEFAULT_SEARCH_SPACE)
+        self.space.update(space or {})
+        # None searches the full grid, a number that many random candidates
+        self.samples = samples
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+
+    def build_candidates(self, config):
+        """Search candidates, with the config's current values first"""
+        if self.samples:
+            searched = random_candidates(self.space, self.samples, self.seed)
+        else:
+            searched = grid_candidates(self.space)
+
+        candidates = {}
+        for params in [current_params(config)] + searched:
+            candidates.setdefault(candidate_key(params), params)
+        return list(candidates.values())
+
+    def run(self, config):
+        """Score all candidates; returns the results, best accuracy first"""
+        samples = read_manifest(self.corpus_dir)
+        candidates = self.build_candidates(config)
+        chunks = [samples[i:i + self.chunk_size]
+                  for i in range(0, len(samples), self.chunk_size)]
+
+        self.logger.info("Tuning %d candidates on %d images, %d workers",
+                         len(candidates), len(samples), self.workers)
+
+        totals = [[0, 0, 0, []] for _ in candidates]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.config_path,
+                                           worker_logging_settings())) as executor:
+            futures = [executor.submit(_evaluate_chunk, chunk, candidates)
+                       for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                for total, (correct, frames, errors, latencies) in zip(
+                        totals, future.result()):
+                    total[0] += correct
+                    total[1] += frames
+                    total[2] += errors
+                    total[3].extend(latencies)
+                self.logger.info("Tuning progress: %d/%d chunks", done, len(chunks))
+
+        results = []
+        for index, (params, (correct, frames, errors, latencies)) in enumerate(
+                zip(candidates, totals)):
+            results.append({
+                "params": params,
+                "current": index == 0,
+                "accuracy": round(correct / frames, 4) if frames else 0.0,
+                "latency_ms": round(sum(latencies) / len(latencies), 2)
+                if latencies else 0.0,
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "errors": errors
+            })
+
+        self.logger.info("Tuning finished in %.1fs",
+                         time.perf_counter() - start)
+        return sorted(results, key=lambda r: (-r["accuracy"], r["latency_ms"]))
+
+    def write_report(self, path, results, front, chosen):
+        """Save every candidate's scores and the front as JSON"""
+        report = {
+            "corpus": str(self.corpus_dir.resolve()),
+            "tuned_at": datetime.now().isoformat(timespec="seconds"),
+            "chosen": chosen,
+            "pareto_front": front,
+            "results": results
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    def write_config(self, ocr_detector, chosen):
+        """Store the chosen candidate, and its scores, in the OCR config"""
+        config = ocr_detector.config
+        apply_params(config, chosen["params"])
+        config["tuning"] = {
+            "corpus": str(self.corpus_dir.resolve()),
+            "tuned_at": datetime.now().isoformat(timespec="seconds"),
+            "accuracy": chosen["accuracy"],
+            "latency_ms": chosen["latency_ms"],
+            "p95_ms": chosen["p95_ms"]
+        }
+        ocr_detector.save_config(config)
+        ocr_detector.flush_config()
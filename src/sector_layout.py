@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Custom per-map sector layouts and a grid index for sector hit tests
+
+A map can define its own named polygon sectors in maps_config.json:
+
+    "sectors": [
+        {"name": "Main Building",
+         "points": [[0.30, 0.25], [0.55, 0.25], [0.55, 0.50], [0.30, 0.50]]},
+        {"number": 14, "name": "Shack", "label": "S", "hotkey": "f11",
+         "points": [[0.70, 0.60], [0.82, 0.58], [0.80, 0.75]]}
+    ]
+
+Points are fractions of the map image's width and height, so a layout
+follows the window size and zoom like the clock and numpad sectors.
+Numbers default to the position in the list and must fit the callout
+relay's byte (1-255); sectors 1-12 get F1-F12 unless a hotkey is given.
+"""
+
+MAX_SECTOR_NUMBER = 255
+# Base-view pixels per side of a SectorIndex cell
+INDEX_CELL_SIZE = 32
+
+
+def parse_sector_layout(entries):
+    """Validated sectors from a map's "sectors" list
+
+    Each sector has number, name, label, hotkey, points (flat, as
+    fractions) and label_point (a fraction pair, or None for the centroid).
+    Raises ValueError for a malformed layout.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("sector layout must be a non-empty list")
+
+    layout = []
+    numbers = set()
+    try:
+        for index, entry in enumerate(entries):
+            number = int(entry.get("number", index + 1))
+            if not 1 <= number <= MAX_SECTOR_NUMBER or number in numbers:
+                raise ValueError(f"invalid or duplicate sector number {number}")
+            numbers.add(number)
+
+            points = [float(value) for point in entry["points"]
+                      for value in point[:2]]
+            if len(points) < 6 or not all(0.0 <= value <= 1.0 for value in points):
+                raise ValueError(f"sector {number} needs at least 3 points "
+                                 "within 0-1")
+
+            label_point = entry.get("label_point")
+            layout.append({
+                "number": number,
+                "name": entry.get("name") or f"Sector {number}",
+                "label": str(entry.get("label", number)),
+                "hotkey": entry.get("hotkey",
+                                    f"f{number}" if number <= 12 else None),
+                "points": tuple(points),
+                "label_point": tuple(float(value) for value in label_point[:2])
+                if label_point else None
+            })
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"malformed sector entry: {e!r}") from e
+    return layout
+
+
+def polygon_centroid(points):
+    """Area centroid of a flat [x1, y1, x2, y2, ...] polygon"""
+    xs, ys = points[0::2], points[1::2]
+    area = cx = cy = 0.0
+    for i in range(len(xs)):
+        j = (i + 1) % len(xs)
+        cross = xs[i] * ys[j] - xs[j] * ys[i]
+        area += cross
+        cx += (xs[i] + xs[j]) * cross
+        cy += (ys[i] + ys[j]) * cross
+    if abs(area) < 1e-9:
+        # Degenerate (zero-area) polygon: average of the vertices
+        return sum(xs) / len(xs), sum(ys) / len(ys)
+    return cx / (3 * area), cy / (3 * area)
+
+
+def point_in_polygon(x, y, points):
+    """Even-odd ray casting test against a flat [x1, y1, ...] polygon"""
+    inside = False
+    count = len(points) // 2
+    x1, y1 = points[-2], points[-1]
+    for i in range(count):
+        x2, y2 = points[2 * i], points[2 * i + 1]
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def sector_contains(sector, x, y):
+    """Whether a base-view point lies in a sector (rectangle or polygon)"""
+    if 'bounds' in sector:
+        x1, y1, x2, y2 = sector['bounds']
+        return x1 <= x <= x2 and y1 <= y <= y2
+    return point_in_polygon(x, y, sector['points'])
+
+
+class SectorIndex:
+    """Uniform grid over the base view mapping cells to the sectors there
+
+    A hit test only runs the exact containment test for the few sectors
+    whose bounding box overlaps the clicked cell, however many sectors
+    the layout has.
+    """
+
+    def __init__(self, sectors, cell_size=INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.by_number = {}
+        for sector in sectors:
+            self.by_number.setdefault(sector['number'], sector)
+            left, top, right, bottom = sector['bbox']
+            for row in range(int(top // cell_size), int(bottom // cell_size) + 1):
+                for column in range(int(left // cell_size),
+                                    int(right // cell_size) + 1):
+                    self.cells.setdefault((column, row), []).append(sector)
+
+    def sector_at(self, x, y):
+        """First sector, in layout order, containing a base-view point"""
+        for sector in self.cells.get((int(x // self.cell_size),
+                                      int(y // self.cell_size)), ()):
+            if sector_contains(sector, x, y):
+                return sector
+        return None
+
+    def get(self, number):
+        """Sector by number, or None"""
+        return self.by_number.get(number)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Startup timing for DbD Communication App
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Records import and initialization timings during startup"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.entries = []  # (phase, name, start, duration, thread name)
+        self.marks = {}
+        self.mark_listeners = {}  # milestone -> callbacks taking its offset
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, phase, name):
+        """Time a block of startup work under the given phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.entries.append((phase, name, start - self.origin, duration,
+                                     threading.current_thread().name))
+
+    def mark(self, name):
+        """Record the first time a startup milestone is reached"""
+        with self.lock:
+            if name in self.marks:
+                return
+            offset = self.marks[name] = time.perf_counter() - self.origin
+            listeners = self.mark_listeners.pop(name, [])
+
+        for callback in listeners:
+            callback(offset)
+
+    def on_mark(self, name, callback):
+        """Call callback(offset in seconds) once a milestone is reached
+
+        Runs right away if it already was, otherwise on the marking thread.
+        """
+        with self.lock:
+            offset = self.marks.get(name)
+            if offset is None:
+                self.mark_listeners.setdefault(name, []).append(callback)
+                return
+        callback(offset)
+
+    def report(self):
+        """Format the recorded timings as report lines"""
+        with self.lock:
+            entries = sorted(self.entries, key=lambda entry: entry[2])
+            marks = sorted(self.marks.items(), key=lambda item: item[1])
+
+        lines = ["Startup report (ms since launch)"]
+        for phase in ("import", "init"):
+            phase_entries = [entry for entry in entries if entry[0] == phase]
+            if not phase_entries:
+                continue
+            lines.append(f"  {phase}:")
+            for _, name, start, duration, thread_name in phase_entries:
+                lines.append(f"    {name:<24} {duration * 1000:8.1f} ms "
+                             f"(at {start * 1000:.1f} ms, {thread_name})")
+
+        if marks:
+            lines.append("  milestones:")
+            for name, offset in marks:
+                lines.append(f"    {name:<24} {offset * 1000:8.1f} ms")
+        return lines
+
+
+# Shared profiler, created as early as the first import of this module
+profiler = StartupProfiler()
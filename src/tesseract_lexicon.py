@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tesseract user-words, user-patterns and whitelist generated from map names
+
+The set of map names is closed, so recognition is steered towards it: a
+words file lists every word of every name, a patterns file their letter
+shapes, and the character whitelist is exactly the characters (in both
+cases) that occur, accents and apostrophes included.  All three are tied
+together by a Tesseract config file, which is passed as a config name
+instead of -c options so no value needs shell quoting.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shlex
+import tempfile
+from pathlib import Path
+
+
+WORDS_FILENAME = "dbd.user-words"
+PATTERNS_FILENAME = "dbd.user-patterns"
+CONFIG_FILENAME = "dbd.lexicon"
+
+# First line of the config file, a Tesseract comment
+DIGEST_PREFIX = "# names-sha1 "
+
+WHITELIST_OPTION = re.compile(r"-c\s*tessedit_char_whitelist=\S*\s?")
+
+
+def name_words(names):
+    """Distinct words of the given names, as written and in upper/lower case"""
+    words = {}
+    for name in names:
+        for word in name.split():
+            for variant in (word, word.upper(), word.lower()):
+                words.setdefault(variant, None)
+    return list(words)
+
+
+def word_pattern(word):
+    """Tesseract user-pattern for a word's shape, e.g. "Léry's" -> \\A\\a\\a\\a's"""
+    pattern = []
+    for char in word:
+        if char.isupper():
+            pattern.append("\\A")
+        elif char.islower():
+            pattern.append("\\a")
+        elif char.isdigit():
+            pattern.append("\\d")
+        elif char == "\\":
+            pattern.append("\\\\")
+        else:
+            pattern.append(char)
+    return "".join(pattern)
+
+
+def name_whitelist(names):
+    """Every character the names use, in both cases, plus the space"""
+    chars = set()
+    for name in names:
+        for char in name:
+            chars.update((char, char.upper(), char.lower()))
+    chars.discard(" ")
+    # Case mapping can produce multi-character strings (e.g. "ß".upper());
+    # the space goes last so a config file line does not swallow it
+    return "".join(sorted(char for char in chars if len(char) == 1)) + " "
+
+
+def strip_whitelist(tesseract_config):
+    """Remove a -c tessedit_char_whitelist option, the lexicon sets its own"""
+    return " ".join(WHITELIST_OPTION.sub("", tesseract_config).split())
+
+
+def _write_text(path, text):
+    """Replace a file atomically"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class TesseractLexicon:
+    """Keeps the generated lexicon files in sync with a set of map names"""
+
+    def __init__(self, directory="config/tesseract"):
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.config_path = self.directory / CONFIG_FILENAME
+        self.digest = None
+
+    def update(self, names):
+        """Regenerate the files if the names changed; returns True if written"""
+        names = sorted({name for name in names if name})
+        digest = hashlib.sha1("\n".join(names).encode('utf-8')).hexdigest()
+        if digest == (self.digest or self.written_digest()):
+            self.digest = digest
+            return False
+
+        words = name_words(names)
+        patterns = list(dict.fromkeys(word_pattern(word) for word in words))
+        whitelist = name_whitelist(names)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        words_path = self.directory / WORDS_FILENAME
+        patterns_path = self.directory / PATTERNS_FILENAME
+        _write_text(words_path, "\n".join(words) + "\n")
+        _write_text(patterns_path, "\n".join(patterns) + "\n")
+        _write_text(self.config_path, "\n".join([
+            f"{DIGEST_PREFIX}{digest}",
+            f"tessedit_char_whitelist {whitelist}",
+            f"user_words_file {words_path.resolve().as_posix()}",
+            f"user_patterns_file {patterns_path.resolve().as_posix()}",
+            ""
+        ]))
+
+        self.digest = digest
+        self.logger.info("Tesseract lexicon updated: %d names, %d words, %d chars",
+                         len(names), len(words), len(whitelist))
+        return True
+
+    def written_digest(self):
+        """Digest recorded in the config file on disk
+
+        Lets other processes sharing the directory skip identical rewrites.
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                first_line = f.readline().strip()
+        except OSError:
+            return None
+        if first_line.startswith(DIGEST_PREFIX):
+            return first_line[len(DIGEST_PREFIX):]
+        return None
+
+    def apply(self, tesseract_config):
+        """Tesseract config string using the lexicon in place of any whitelist
+
+        The config file name goes last, after every option, as Tesseract
+        requires.
+        """
+        if not self.config_path.exists():
+            return tesseract_config
+        return f"{strip_whitelist(tesseract_config)} {self.quoted_config_path()}".strip()
+
+    def quoted_config_path(self):
+        """The config file path, quoted for the way pytesseract splits configs
+
+        pytesseract splits with shlex in POSIX mode except on Windows, where
+        quotes are left in place; there a path is double-quoted only if it
+        contains a space.
+        """
+        path = self.config_path.resolve().as_posix()
+        if os.name != "nt":
+            return shlex.quote(path)
+        return f'"{path}"' if " " in path else path
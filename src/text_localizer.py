@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Text-line localization for preprocessed banner images
+
+Finds the map-name line with projection profiles, crops it tightly and
+rescales it so glyphs reach Tesseract at a consistent height.  Profiles
+are box-resizes of an ink mask, so every pass over the pixels runs in C.
+"""
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+
+def create_default_localizer_config():
+    """Default localization keys of the "preprocessing" OCR config section"""
+    return {
+        "localize_text": True,
+        # Line height handed to Tesseract, roughly its preferred cap height
+        "target_text_height": 32,
+        "text_padding": 8,
+        # Grey-level distance from the local background that counts as ink,
+        # and the blur radius estimating that background
+        "ink_threshold": 40,
+        "background_radius": 8,
+        # Minimum ink share for a row to belong to a text line, and for a
+        # column inside that line to count as glyph rather than noise
+        "min_row_ink": 0.02,
+        "min_column_ink": 0.1,
+        # Rows of blank allowed inside one line (gaps between accents etc.)
+        "max_row_gap": 2,
+        # Widest gap inside the name, in line heights; farther ink is noise
+        "max_word_gap": 1.5
+    }
+
+
+def background_level(image):
+    """Most common grey level, taken as the banner background"""
+    histogram = image.histogram()
+    return max(range(256), key=histogram.__getitem__)
+
+
+def ink_mask(image, threshold, radius):
+    """Binary mask of pixels that stand out from their local background
+
+    Comparing against a box blur instead of one global level keeps
+    gradients and vignettes out of the mask, for either text polarity.
+    """
+    background = image.filter(ImageFilter.BoxBlur(radius))
+    difference = ImageChops.difference(image, background)
+    return difference.point(lambda value: 255 if value >= threshold else 0)
+
+
+def profile(mask, axis):
+    """Ink share (0-1) per row (axis 0) or per column (axis 1)"""
+    width, height = mask.size
+    size = (1, height) if axis == 0 else (width, 1)
+    return [value / 255 for value in mask.resize(size, Image.Resampling.BOX).tobytes()]
+
+
+def find_runs(values, minimum, max_gap=0):
+    """(start, end) index runs where values >= minimum, bridging short gaps"""
+    runs = []
+    start = last = None
+    for index, value in enumerate(values):
+        if value < minimum:
+            continue
+        if start is None:
+            start = index
+        elif index - last - 1 > max_gap:
+            runs.append((start, last + 1))
+            start = index
+        last = index
+    if start is not None:
+        runs.append((start, last + 1))
+    return runs
+
+
+def text_line_bbox(image, options=None):
+    """Bounding box (left, top, right, bottom) of the most inked text line
+
+    Returns None if no line stands out from the background.
+    """
+    config = create_default_localizer_config()
+    config.update(options or {})
+
+    mask = ink_mask(image, config["ink_threshold"], config["background_radius"])
+    rows = profile(mask, 0)
+    runs = find_runs(rows, config["min_row_ink"], config["max_row_gap"])
+    if not runs:
+        return None
+
+    top, bottom = max(runs, key=lambda run: sum(rows[run[0]:run[1]]))
+    line = mask.crop((0, top, mask.width, bottom))
+    columns = profile(line, 1)
+    # Word gaps are narrower than the line is tall; wider gaps split off noise
+    clusters = find_runs(columns, config["min_column_ink"],
+                         round((bottom - top) * config["max_word_gap"]))
+    if not clusters:
+        return None
+
+    left, right = max(clusters, key=lambda run: sum(columns[run[0]:run[1]]))
+
+    # Second row pass over the chosen columns trims noise above and below
+    rows = profile(mask.crop((left, top, right, bottom)), 0)
+    runs = find_runs(rows, config["min_row_ink"] * 4, config["max_row_gap"])
+    if runs:
+        top, bottom = top + runs[0][0], top + runs[-1][1]
+    return (left, top, right, bottom)
+
+
+def localize_text(image, options=None):
+    """Crop a grayscale image to its text line and normalize the line height
+
+    The line is scaled to target_text_height and padded with background,
+    so Tesseract sees fewer pixels at a consistent glyph size.  The input
+    is returned unchanged if no text line is found.
+    """
+    config = create_default_localizer_config()
+    config.update(options or {})
+
+    bbox = text_line_bbox(image, config)
+    if bbox is None:
+        return image
+
+    line = image.crop(bbox)
+    scale = config["target_text_height"] / line.height
+    size = (max(1, round(line.width * scale)), config["target_text_height"])
+    if size != line.size:
+        line = line.resize(size, Image.Resampling.LANCZOS if scale < 1
+                           else Image.Resampling.BICUBIC)
+
+    return ImageOps.expand(line, border=config["text_padding"],
+                           fill=background_level(image))
@@ -3,34 +3,50 @@
 Text-to-Speech Handler for DbD Communication App
 """
 
+import importlib.util
 import logging
 import threading
-from queue import Queue
+import time
+from queue import Queue, Empty
+
+from metrics import registry
 
 
 class TTSHandler:
     """Handles text-to-speech functionality"""
 
-    def __init__(self, voice_rate=200, voice_volume=0.9):
+    def __init__(self, voice_rate=200, voice_volume=0.9, use_process=True):
         self.logger = logging.getLogger(__name__)
         self.voice_rate = voice_rate
         self.voice_volume = voice_volume
+        self.use_process = use_process
         self.tts_engine = None
         self.speech_queue = Queue()
         self.is_running = False
 
+        # Worker-process engine state, updated from its utterance events
+        self.process_engine = False
+        self.status = "idle"  # "idle", "speaking" or "error"
+        self.last_error = None
+        self.utterance_starts = {}  # utterance id -> perf_counter at "started"
+
         self.initialize_tts()
 
     def initialize_tts(self):
         """Initialize text-to-speech engine"""
         try:
-            import pyttsx3
+            if self.use_process and importlib.util.find_spec("pyttsx3"):
+                self.tts_engine = self.create_process_engine()
+                self.process_engine = self.tts_engine is not None
 
-            self.tts_engine = pyttsx3.init()
+            if self.tts_engine is None:
+                import pyttsx3
 
-            # Configure voice settings
-            self.tts_engine.setProperty('rate', self.voice_rate)
-            self.tts_engine.setProperty('volume', self.voice_volume)
+                self.tts_engine = pyttsx3.init()
+
+                # Configure voice settings
+                self.tts_engine.setProperty('rate', self.voice_rate)
+                self.tts_engine.setProperty('volume', self.voice_volume)
 
             # Try to set a preferred voice (optional)
             voices = self.tts_engine.getProperty('voices')
@@ -50,6 +66,43 @@ class TTSHandler:
             self.logger.error("Error initializing TTS engine: %s", e)
             self.tts_engine = None
 
+    def create_process_engine(self):
+        """Create an engine running in a dedicated worker process"""
+        try:
+            from tts_worker import TTSProcessEngine
+
+            return TTSProcessEngine(properties={
+                'rate': self.voice_rate,
+                'volume': self.voice_volume
+            }, event_callback=self.on_engine_event)
+        except Exception as e:
+            self.logger.warning(
+                "TTS worker process unavailable, using in-process engine: %s", e)
+            return None
+
+    def on_engine_event(self, event):
+        """Track a worker-process utterance event (engine listener thread)
+
+        The child speaks between "started" and "done", so that interval is
+        the synthesis time; say() itself only writes to the pipe.
+        """
+        kind = event[0]
+        if kind == "started":
+            self.utterance_starts[event[1]] = time.perf_counter()
+            self.status = "speaking"
+        elif kind == "done":
+            started = self.utterance_starts.pop(event[1], None)
+            if started is not None:
+                registry.histogram("tts.synthesis").observe(
+                    time.perf_counter() - started)
+            registry.counter("tts.utterances").inc()
+            self.status = "idle"
+        elif kind == "error":
+            self.utterance_starts.pop(event[1], None)
+            registry.counter("tts.errors").inc()
+            self.last_error = event[2]
+            self.status = "error"
+
     def start_tts_worker(self):
         """Start TTS worker thread"""
         if not self.is_running and self.tts_engine:
@@ -62,15 +115,31 @@ class TTSHandler:
         """Stop TTS worker thread"""
         self.is_running = False
 
+    def shutdown(self):
+        """Stop the worker thread and release the TTS engine"""
+        self.stop_tts_worker()
+        if self.tts_engine and hasattr(self.tts_engine, 'shutdown'):
+            self.tts_engine.shutdown()
+
     def _tts_worker(self):
         """TTS worker thread that processes speech queue"""
         while self.is_running:
             try:
-                if not self.speech_queue.empty():
-                    text = self.speech_queue.get(timeout=1)
-                    if text and self.tts_engine:
+                text = self.speech_queue.get(timeout=1)
+                if text and self.tts_engine:
+                    if self.process_engine:
+                        # Timed and counted by on_engine_event()
+                        self.tts_engine.say(text)
+                        with registry.timer("tts.playback"):
+                            self.tts_engine.runAndWait()
+                        continue
+                    with registry.timer("tts.synthesis"):
                         self.tts_engine.say(text)
+                    with registry.timer("tts.playback"):
                         self.tts_engine.runAndWait()
+                    registry.counter("tts.utterances").inc()
+            except Empty:
+                continue
             except Exception as e:
                 self.logger.error("Error in TTS worker: %s", e)
 
@@ -96,7 +165,7 @@ class TTSHandler:
             self.logger.debug("TTS not available, would speak: %s", text)
 
     def speak_callout(self, sector_number, callout_type="sector"):
-        """Speak a formatted callout"""
+        """Speak a formatted callout; named sectors are spoken by name"""
         if callout_type == "killer":
             text = f"Killer in {sector_number}"
         elif callout_type == "rescue":
@@ -105,6 +174,8 @@ class TTSHandler:
             text = f"Generator in {sector_number}"
         elif callout_type == "totem":
             text = f"Totem in {sector_number}"
+        elif isinstance(sector_number, str):
+            text = sector_number
         else:
             text = f"Sector {sector_number}"
 
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Out-of-process TTS engine for DbD Communication App
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque, namedtuple
+
+from logging_config import configure_worker_logging, worker_logging_settings
+
+
+VoiceInfo = namedtuple("VoiceInfo", ["id", "name"])
+
+
+def _engine_main(command_conn, event_conn, properties, log_settings=None):
+    """Worker process entry point that owns the pyttsx3 engine"""
+    configure_worker_logging(log_settings)
+    try:
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        for name, value in properties.items():
+            engine.setProperty(name, value)
+
+        voices = engine.getProperty('voices') or []
+        event_conn.send(("ready", [(voice.id, voice.name) for voice in voices]))
+    except Exception as e:
+        event_conn.send(("failed", str(e)))
+        return
+
+    while True:
+        try:
+            command = command_conn.recv()
+        except (EOFError, OSError):
+            break
+
+        kind = command[0]
+        if kind == "speak":
+            _, utterance_id, text = command
+            event_conn.send(("started", utterance_id))
+            try:
+                engine.say(text)
+                engine.runAndWait()
+                event_conn.send(("done", utterance_id))
+            except Exception as e:
+                event_conn.send(("error", utterance_id, str(e)))
+        elif kind == "set":
+            _, name, value = command
+            try:
+                engine.setProperty(name, value)
+            except Exception as e:
+                event_conn.send(("error", None, str(e)))
+        elif kind == "shutdown":
+            break
+
+
+class TTSProcessEngine:
+    """pyttsx3-compatible proxy that runs the real engine in a child process
+
+    Commands go to the child over one pipe and utterance events
+    ("started", "done", "error") come back over another, so a driver that
+    holds the GIL inside runAndWait only ever blocks the child.  If the
+    child dies or hangs past utterance_timeout it is restarted with the
+    last known properties, up to max_restarts times within any
+    restart_window seconds.
+    """
+
+    def __init__(self, properties=None, event_callback=None, max_restarts=5,
+                 start_timeout=10.0, utterance_timeout=30.0, restart_window=600.0):
+        self.logger = logging.getLogger(__name__)
+        self.properties = dict(properties or {})
+        self.event_callback = event_callback
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.start_timeout = start_timeout
+        self.utterance_timeout = utterance_timeout
+
+        self.voices = []
+        self.restart_count = 0
+        self.restart_times = deque()  # monotonic times of recent restarts
+        self.process = None
+        self.command_conn = None
+
+        # Spawn rather than fork so the child never inherits Tk or hook threads
+        self._context = multiprocessing.get_context("spawn")
+        self._send_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._outstanding = set()
+        self._queued = []
+        self._next_id = 0
+        self._closed = False
+
+        self.start()
+
+    def start(self):
+        """Start the engine process and wait until it reports ready"""
+        command_recv, command_send = self._context.Pipe(duplex=False)
+        event_recv, event_send = self._context.Pipe(duplex=False)
+
+        process = self._context.Process(
+            target=_engine_main,
+            args=(command_recv, event_send, self.properties,
+                  worker_logging_settings()),
+            name="tts-engine", daemon=True)
+        process.start()
+
+        # The child owns these ends now
+        command_recv.close()
+        event_send.close()
+
+        if not event_recv.poll(self.start_timeout):
+            process.terminate()
+            raise RuntimeError("TTS engine process did not start in time")
+
+        try:
+            event = event_recv.recv()
+        except EOFError:
+            raise RuntimeError("TTS engine process exited during startup")
+        if event[0] != "ready":
+            process.join(timeout=1)
+            raise RuntimeError(f"TTS engine failed to start: {event[1]}")
+
+        self.voices = [VoiceInfo(*voice) for voice in event[1]]
+        with self._send_lock:
+            self.process = process
+            self.command_conn = command_send
+
+        listener = threading.Thread(
+            target=self._listen, args=(event_recv, process), daemon=True)
+        listener.start()
+
+        self.logger.info("TTS engine process started (pid %s)", process.pid)
+
+    def _listen(self, event_conn, process):
+        """Read engine events until the child process goes away"""
+        while True:
+            try:
+                event = event_conn.recv()
+            except (EOFError, OSError):
+                break
+            self._handle_event(event)
+
+        event_conn.close()
+        process.join(timeout=1)
+        if not self._closed:
+            self._on_engine_exit(process)
+
+    def _handle_event(self, event):
+        """Track utterance completion and forward events to the callback"""
+        kind = event[0]
+        if kind in ("done", "error"):
+            if kind == "error":
+                self.logger.error("TTS engine error: %s", event[2])
+            with self._condition:
+                self._outstanding.discard(event[1])
+                self._condition.notify_all()
+
+        if self.event_callback:
+            try:
+                self.event_callback(event)
+            except Exception as e:
+                self.logger.error("Error in TTS event callback: %s", e)
+
+    def _on_engine_exit(self, process):
+        """Release waiters and restart the engine after a crash"""
+        self.logger.warning(
+            "TTS engine process exited (code %s)", process.exitcode)
+
+        with self._condition:
+            self._outstanding.clear()
+            self._condition.notify_all()
+
+        # Only crashes close together count towards the limit
+        now = time.monotonic()
+        while self.restart_times and now - self.restart_times[0] > self.restart_window:
+            self.restart_times.popleft()
+        if len(self.restart_times) >= self.max_restarts:
+            self.logger.error(
+                "TTS engine restarted %d times in %.0fs, giving up",
+                len(self.restart_times), self.restart_window)
+            return
+
+        self.restart_times.append(now)
+        self.restart_count += 1
+        try:
+            self.start()
+        except Exception as e:
+            self.logger.error("Error restarting TTS engine: %s", e)
+
+    def _send(self, command):
+        """Send a command to the engine process"""
+        with self._send_lock:
+            if self.command_conn is None:
+                return False
+            try:
+                self.command_conn.send(command)
+                return True
+            except (OSError, ValueError) as e:
+                self.logger.error("Error sending TTS command: %s", e)
+                return False
+
+    def is_alive(self):
+        """Check whether the engine process is running"""
+        return self.process is not None and self.process.is_alive()
+
+    def say(self, text):
+        """Queue an utterance in the engine process"""
+        with self._condition:
+            utterance_id = self._next_id
+            self._next_id += 1
+            self._outstanding.add(utterance_id)
+
+        if self._send(("speak", utterance_id, text)):
+            self._queued.append(utterance_id)
+        else:
+            with self._condition:
+                self._outstanding.discard(utterance_id)
+
+    def runAndWait(self):
+        """Block until every queued utterance has finished playing"""
+        queued, self._queued = self._queued, []
+        if not queued:
+            return
+
+        with self._condition:
+            finished = self._condition.wait_for(
+                lambda: not self._outstanding.intersection(queued),
+                timeout=self.utterance_timeout)
+
+        if not finished:
+            # A hung driver is handled the same way as a crashed one
+            self.logger.warning("TTS engine stalled, restarting process")
+            process = self.process
+            if process is not None and process.is_alive():
+                process.terminate()
+
+    def setProperty(self, name, value):
+        """Set an engine property, remembered across restarts"""
+        self.properties[name] = value
+        self._send(("set", name, value))
+
+    def getProperty(self, name):
+        """Get an engine property"""
+        if name == 'voices':
+            return list(self.voices)
+        return self.properties.get(name)
+
+    def shutdown(self, timeout=2.0):
+        """Stop the engine process"""
+        self._closed = True
+        self._send(("shutdown",))
+
+        process = self.process
+        if process is not None:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+
+        with self._send_lock:
+            if self.command_conn is not None:
+                self.command_conn.close()
+                self.command_conn = None